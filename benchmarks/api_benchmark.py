@@ -0,0 +1,266 @@
+"""
+End-to-end API latency benchmark
+
+Starts src.api.app under uvicorn against a synthetic dataset and a local
+file-based MLflow store in a temporary directory, then drives /predict,
+/data/status and /model/info at increasing concurrency. Latency
+percentiles (p50/p95/p99) and throughput are reported per endpoint and
+concurrency level.
+
+Usage:
+    python -m benchmarks.api_benchmark --concurrency 1 4 16 32 --requests 200
+    python -m benchmarks.api_benchmark --baseline bench_api.json
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from benchmarks.synthetic import pollution_frame
+from benchmarks.utils import environment, find_regressions, load_results, write_results
+
+PROJ_ROOT = Path(__file__).resolve().parents[1]
+API_PREFIX = "/api/v1"
+ENDPOINTS = ["/predict", "/data/status", "/model/info"]
+PERCENTILES = [50, 95, 99]
+
+
+def prepare_workdir(workdir, train_hours, predict_hours, n_stations):
+    """Write synthetic datasets and train a model into a local MLflow store
+
+    Returns the environment the API server has to run with.
+    """
+    interim_dir = os.path.join(workdir, "data", "interim")
+    os.makedirs(interim_dir, exist_ok=True)
+    os.makedirs(os.path.join(workdir, "data", "raw"), exist_ok=True)
+
+    train = pollution_frame(train_hours, n_stations, seed=1)
+    predict = pollution_frame(predict_hours, n_stations, seed=2)
+    train.to_parquet(
+        os.path.join(interim_dir, "air_pollution_data_training_total.parquet"),
+        index=False,
+    )
+    predict.to_parquet(
+        os.path.join(interim_dir, "air_pollution_data_predicting_total.parquet"),
+        index=False,
+    )
+
+    env = dict(
+        os.environ,
+        DATA_DIR=os.path.join(workdir, "data"),
+        MLFLOW_TRACKING_URI=Path(workdir, "mlruns").as_uri(),
+        PYTHONPATH=str(PROJ_ROOT),
+    )
+
+    # Train in a child process so that src.config picks up DATA_DIR
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=get_context("spawn"),
+        initializer=_set_environment,
+        initargs=(env,),
+    ) as executor:
+        executor.submit(_train_model).result()
+    return env
+
+
+def _set_environment(env):
+    os.environ.update(env)
+
+
+def _train_model():
+    import contextlib
+
+    from src.data.data_loader import DataLoader
+    from src.models.pollution_predictor import PollutionPredictor
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        PollutionPredictor().train(DataLoader().load_train_dataset())
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env, workdir, timeout=120):
+    """Start the API with uvicorn and wait until it is healthy"""
+    port = _free_port()
+    process = subprocess.Popen(  # nosec B603
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.api.app:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}{API_PREFIX}"
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise TimeoutError("API server did not become healthy")
+
+
+def drive(url, concurrency, n_requests, timeout=60):
+    """Send *n_requests* GETs from *concurrency* threads and time each one"""
+
+    def worker(count):
+        session = requests.Session()
+        latencies, errors = [], 0
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=timeout).status_code == 200
+            except requests.RequestException:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+        return latencies, errors
+
+    counts = [
+        n_requests // concurrency + (i < n_requests % concurrency)
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, counts))
+    wall = time.perf_counter() - start
+
+    latencies = np.concatenate([np.asarray(r[0]) for r in results]) * 1000
+    errors = sum(r[1] for r in results)
+    return {
+        "requests": int(latencies.size),
+        "errors": int(errors),
+        "wall_seconds": wall,
+        "throughput_rps": latencies.size / wall if wall else None,
+        "latency_ms": dict(
+            {f"p{p}": float(np.percentile(latencies, p)) for p in PERCENTILES},
+            mean=float(latencies.mean()),
+            max=float(latencies.max()),
+        ),
+    }
+
+
+def run_benchmarks(
+    concurrency_levels,
+    n_requests,
+    endpoints=ENDPOINTS,
+    train_hours=24 * 14,
+    predict_hours=48,
+    n_stations=8,
+    warmup=5,
+):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = prepare_workdir(workdir, train_hours, predict_hours, n_stations)
+        process, base_url = start_server(env, workdir)
+        try:
+            cases = []
+            for endpoint in endpoints:
+                url = base_url + endpoint
+                drive(url, 1, warmup)
+                for concurrency in concurrency_levels:
+                    case = dict(
+                        endpoint=endpoint,
+                        concurrency=concurrency,
+                        **drive(url, concurrency, n_requests),
+                    )
+                    latency = case["latency_ms"]
+                    print(
+                        f"{endpoint:<14} c={concurrency:<3} "
+                        f"p50={latency['p50']:8.1f}ms p95={latency['p95']:8.1f}ms "
+                        f"p99={latency['p99']:8.1f}ms "
+                        f"{case['throughput_rps']:8.1f} req/s errors={case['errors']}"
+                    )
+                    cases.append(case)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    return {
+        "benchmark": "api",
+        "environment": environment(),
+        "dataset": {
+            "train_hours": train_hours,
+            "predict_hours": predict_hours,
+            "stations": n_stations,
+        },
+        "cases": cases,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests per endpoint and level"
+    )
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    parser.add_argument("--train-hours", type=int, default=24 * 14)
+    parser.add_argument("--predict-hours", type=int, default=48)
+    parser.add_argument("--stations", type=int, default=8)
+    parser.add_argument("--output", default="bench_api.json")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative latency growth before failing",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.concurrency,
+        args.requests,
+        endpoints=args.endpoints,
+        train_hours=args.train_hours,
+        predict_hours=args.predict_hours,
+        n_stations=args.stations,
+    )
+    write_results(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(
+            results["cases"],
+            load_results(args.baseline)["cases"],
+            key_fields=["endpoint", "concurrency"],
+            metrics=[f"latency_ms.p{p}" for p in PERCENTILES],
+            tolerance=args.tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Offline ingestion benchmark
+
+Serves synthetic multipointcoverage responses from a replay directory
+through download_stored_query and times the DataIngestion hot path:
+
+- parse: replayed download, XML parsing and station filtering
+- reshape: raw observations to one DataFrame per station
+- merge: outer join of all stations on Timestamp
+- persist: station and total Parquet files
+
+Each case runs in a fresh process so that peak RSS is per case.
+
+Usage:
+    python -m benchmarks.ingestion_benchmark --weeks 1 8 52 --stations 8 50 200
+    python -m benchmarks.ingestion_benchmark --baseline bench_ingestion.json
+"""
+
+import argparse
+import contextlib
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.utils import (
+    environment,
+    find_regressions,
+    load_results,
+    peak_rss_mb,
+    write_results,
+)
+from scripts.data_from_stations import AIR_QUALITY_QUERY, air_quality_query_args
+from scripts.multipoint import stored_query_url
+from scripts.replay import ReplayStore, build_multipointcoverage, replay
+from src.data.data_ingestion import DataIngestion, time_chunks
+from src.data.station_registry import region_bbox
+
+CENTER = (60.1699, 24.9384)
+SQUARE_SIDE = 20  # km
+CHUNK_HOURS = 168
+END = dt.datetime(2024, 1, 1)
+REGION = "benchmark"
+FIELDS = [
+    ("NO2", "Nitrogen dioxide", "ug/m3"),
+    ("PM10", "Particulate matter < 10 µm", "ug/m3"),
+    ("PM25", "Particulate matter < 2.5 µm", "ug/m3"),
+]
+STAGES = ["parse", "reshape", "merge", "persist"]
+
+
+def synthetic_stations(n_stations, seed=0):
+    """Stations scattered inside the benchmark bbox"""
+    rng = np.random.default_rng(seed)
+    lon_min, lat_min, lon_max, lat_max = region_bbox(*CENTER, SQUARE_SIDE * 0.9)
+    latitudes = rng.uniform(lat_min, lat_max, n_stations).round(5)
+    longitudes = rng.uniform(lon_min, lon_max, n_stations).round(5)
+    return [
+        (f"Station {i:03d}", 100000 + i, float(lat), float(lon))
+        for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+    ]
+
+
+def record_responses(directory, weeks, n_stations, seed=0):
+    """Write one canned response per weekly request DataIngestion will make"""
+    rng = np.random.default_rng(seed)
+    store = ReplayStore(directory)
+    stations = synthetic_stations(n_stations, seed)
+    bbox = region_bbox(*CENTER, SQUARE_SIDE)
+
+    for start, end in time_chunks(CHUNK_HOURS, weeks, END):
+        epoch = int((start - dt.datetime(1970, 1, 1)).total_seconds())
+        epochs = epoch + 3600 * np.arange(1, CHUNK_HOURS + 1)
+        values = rng.gamma(2.0, 8.0, size=(len(stations) * len(epochs), len(FIELDS)))
+        args = air_quality_query_args(
+            bbox,
+            start.isoformat(timespec="seconds") + "Z",
+            end.isoformat(timespec="seconds") + "Z",
+        )
+        store.save(
+            stored_query_url(AIR_QUALITY_QUERY, args),
+            build_multipointcoverage(stations, epochs, FIELDS, values.round(1)),
+        )
+
+
+def run_case(weeks, n_stations, workdir):
+    """Run one benchmark case and return its timings"""
+    replay_dir = os.path.join(workdir, "responses")
+    raw_dir = os.path.join(workdir, "raw")
+    interim_dir = os.path.join(workdir, "interim")
+    os.makedirs(raw_dir, exist_ok=True)
+    os.makedirs(interim_dir, exist_ok=True)
+    record_responses(replay_dir, weeks, n_stations)
+
+    ingestion = DataIngestion(
+        regions={
+            REGION: {
+                "latitude": CENTER[0],
+                "longitude": CENTER[1],
+                "square_side": SQUARE_SIDE,
+            }
+        }
+    )
+    rss_before = peak_rss_mb()
+    seconds = {}
+
+    with replay(replay_dir), mock.patch.multiple(
+        "src.data.data_ingestion", RAW_DATA_DIR=raw_dir, INTERIM_DATA_DIR=interim_dir
+    ), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        observations = ingestion._download_region(REGION, CHUNK_HOURS, weeks, end=END)
+        seconds["parse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        frames = ingestion._build_station_frames(REGION, observations)
+        seconds["reshape"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        total = ingestion._merge_station_frames(frames)
+        seconds["merge"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ingestion._save_station_frames(frames, "benchmark")
+        ingestion._save_total_frame(total, "benchmark", REGION)
+        seconds["persist"] = time.perf_counter() - start
+
+    if len(frames) != n_stations:
+        raise RuntimeError(f"Expected {n_stations} stations, got {len(frames)}")
+
+    rows = weeks * CHUNK_HOURS * n_stations
+    total_seconds = sum(seconds.values())
+    return {
+        "weeks": weeks,
+        "stations": n_stations,
+        "rows": rows,
+        "stages": {
+            stage: {
+                "seconds": seconds[stage],
+                "rows_per_second": rows / seconds[stage] if seconds[stage] else None,
+            }
+            for stage in STAGES
+        },
+        "total_seconds": total_seconds,
+        "rows_per_second": rows / total_seconds if total_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": rss_before,
+    }
+
+
+def _run_isolated(weeks, n_stations):
+    with tempfile.TemporaryDirectory() as workdir:
+        return run_case(weeks, n_stations, workdir)
+
+
+def run_benchmarks(weeks_list, stations_list, isolated=True):
+    cases = []
+    for weeks in weeks_list:
+        for n_stations in stations_list:
+            if isolated:
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=get_context("spawn")
+                ) as executor:
+                    case = executor.submit(_run_isolated, weeks, n_stations).result()
+            else:
+                case = _run_isolated(weeks, n_stations)
+            print(
+                f"weeks={weeks:>3} stations={n_stations:>4} rows={case['rows']:>9} "
+                + " ".join(
+                    f"{stage}={case['stages'][stage]['seconds']:.3f}s"
+                    for stage in STAGES
+                )
+                + f" total={case['total_seconds']:.3f}s"
+                f" ({case['rows_per_second']:.0f} rows/s)"
+                f" peak_rss={case['peak_rss_mb']:.0f}MB"
+            )
+            cases.append(case)
+    return {"benchmark": "ingestion", "environment": environment(), "cases": cases}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--weeks", type=int, nargs="+", default=[1, 8, 52])
+    parser.add_argument("--stations", type=int, nargs="+", default=[8, 50, 200])
+    parser.add_argument("--output", default="bench_ingestion.json")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown or RSS growth before failing",
+    )
+    parser.add_argument(
+        "--in-process", action="store_true", help="do not isolate cases"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.weeks, args.stations, isolated=not args.in_process)
+    write_results(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(
+            results["cases"],
+            load_results(args.baseline)["cases"],
+            key_fields=["weeks", "stations"],
+            metrics=[f"stages.{stage}.seconds" for stage in STAGES] + ["peak_rss_mb"],
+            tolerance=args.tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
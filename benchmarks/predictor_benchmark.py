@@ -0,0 +1,254 @@
+"""
+PollutionPredictor micro-benchmarks
+
+Times create_features, prepare_sequences, train and predict on synthetic
+frames in the merged ingestion layout. MLflow logging is stubbed so only
+the model path itself is measured. Cases are the product of history
+length, station and pollutant counts, training_hours, n_steps and
+precision. Each case also records the validation error of the trained
+model, so float32 runs report their accuracy delta against float64.
+
+Usage:
+    python -m benchmarks.predictor_benchmark --hours 720 8760 --stations 8 50
+    python -m benchmarks.predictor_benchmark --precision float64 float32
+    python -m benchmarks.predictor_benchmark --baseline bench_predictor.json
+"""
+
+import argparse
+import contextlib
+import itertools
+import os
+import statistics
+import sys
+import time
+import warnings
+from unittest import mock
+
+from sklearn.exceptions import ConvergenceWarning
+
+from benchmarks.synthetic import pollution_frame
+from benchmarks.utils import environment, find_regressions, load_results, write_results
+from src.models.pollution_predictor import PRECISIONS, PollutionPredictor
+
+OPERATIONS = ["create_features", "prepare_sequences", "train", "predict"]
+KEY_FIELDS = ["hours", "stations", "pollutants", "training_hours", "n_steps"]
+
+
+@contextlib.contextmanager
+def stub_mlflow():
+    """Replace MLflow tracking calls made by PollutionPredictor with no-ops"""
+    run = mock.MagicMock()
+    run.__enter__.return_value = run
+    run.info.run_id = "benchmark"
+    run.info.experiment_id = "0"
+    with mock.patch.multiple(
+        "mlflow",
+        set_tracking_uri=mock.DEFAULT,
+        get_experiment_by_name=mock.DEFAULT,
+        set_experiment=mock.DEFAULT,
+        start_run=mock.Mock(return_value=run),
+        set_tag=mock.DEFAULT,
+        log_param=mock.DEFAULT,
+        log_metric=mock.DEFAULT,
+        log_artifact=mock.DEFAULT,
+    ), mock.patch("mlflow.sklearn.log_model"), mock.patch("boto3.client"):
+        yield
+
+
+def _time(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"median": statistics.median(timings), "min": min(timings)}
+
+
+def run_case(
+    hours,
+    n_stations,
+    n_pollutants,
+    training_hours,
+    n_steps,
+    repeats=5,
+    precision="float64",
+):
+    """Time every operation for one dataset shape and model configuration"""
+    df = pollution_frame(hours, n_stations, n_pollutants)
+    seconds = {}
+    metrics = {}
+
+    with warnings.catch_warnings(), stub_mlflow(), open(
+        os.devnull, "w"
+    ) as devnull, contextlib.redirect_stdout(devnull):
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        predictor = PollutionPredictor(
+            training_hours=training_hours, n_steps=n_steps, precision=precision
+        )
+        seconds["create_features"] = _time(
+            lambda: predictor.create_features(df), repeats
+        )
+        seconds["prepare_sequences"] = _time(
+            lambda: predictor.prepare_sequences(df), repeats
+        )
+        X, _ = predictor.prepare_sequences(df)
+        seconds["train"] = _time(
+            lambda: metrics.update(predictor.train(df)), max(1, min(repeats, 3))
+        )
+        recent = df.tail(training_hours + n_steps)
+        seconds["predict"] = _time(lambda: predictor.predict(recent), repeats)
+
+    return {
+        "hours": hours,
+        "stations": n_stations,
+        "pollutants": n_pollutants,
+        "columns": n_stations * n_pollutants,
+        "training_hours": training_hours,
+        "n_steps": n_steps,
+        "precision": precision,
+        "matrix_mb": X.nbytes / (1024 * 1024),
+        "mae": metrics["mae"],
+        "rmse": metrics["rmse"],
+        "seconds": seconds,
+    }
+
+
+def accuracy_deltas(cases, reference="float64"):
+    """Validation MAE and RMSE change of each case against *reference*
+
+    Cases are compared with the *reference* precision case of the same
+    dataset shape and window configuration.
+    """
+    baseline = {
+        tuple(case[field] for field in KEY_FIELDS): case
+        for case in cases
+        if case["precision"] == reference
+    }
+    deltas = []
+    for case in cases:
+        key = tuple(case[field] for field in KEY_FIELDS)
+        if case["precision"] == reference or key not in baseline:
+            continue
+        deltas.append(
+            dict(
+                zip(KEY_FIELDS, key),
+                precision=case["precision"],
+                mae_delta=case["mae"] - baseline[key]["mae"],
+                rmse_delta=case["rmse"] - baseline[key]["rmse"],
+                train_speedup=baseline[key]["seconds"]["train"]["median"]
+                / case["seconds"]["train"]["median"],
+            )
+        )
+    return deltas
+
+
+def run_benchmarks(
+    hours_list,
+    stations_list,
+    pollutants_list,
+    training_hours_list,
+    n_steps_list,
+    repeats,
+    precisions=("float64",),
+):
+    cases = []
+    for (
+        hours,
+        n_stations,
+        n_pollutants,
+        training_hours,
+        n_steps,
+        precision,
+    ) in itertools.product(
+        hours_list,
+        stations_list,
+        pollutants_list,
+        training_hours_list,
+        n_steps_list,
+        precisions,
+    ):
+        case = run_case(
+            hours, n_stations, n_pollutants, training_hours, n_steps, repeats, precision
+        )
+        print(
+            f"hours={hours:>5} columns={case['columns']:>4} "
+            f"training_hours={training_hours:>3} n_steps={n_steps:>2} "
+            f"{precision} X={case['matrix_mb']:.1f}MB mae={case['mae']:.4f} "
+            + " ".join(
+                f"{operation}={case['seconds'][operation]['median'] * 1000:.1f}ms"
+                for operation in OPERATIONS
+            )
+        )
+        cases.append(case)
+    return {
+        "benchmark": "predictor",
+        "environment": environment(),
+        "cases": cases,
+        "accuracy_deltas": accuracy_deltas(cases),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hours", type=int, nargs="+", default=[720, 2160])
+    parser.add_argument("--stations", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--pollutants", type=int, nargs="+", default=[3])
+    parser.add_argument("--training-hours", type=int, nargs="+", default=[24])
+    parser.add_argument("--n-steps", type=int, nargs="+", default=[6])
+    parser.add_argument(
+        "--precision",
+        nargs="+",
+        choices=PRECISIONS,
+        default=["float64"],
+        help="feature and model precisions to compare",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="bench_predictor.json")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown before failing",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.hours,
+        args.stations,
+        args.pollutants,
+        args.training_hours,
+        args.n_steps,
+        args.repeats,
+        args.precision,
+    )
+    for delta in results["accuracy_deltas"]:
+        print(
+            f"{delta['precision']} vs float64 hours={delta['hours']} "
+            f"stations={delta['stations']}: MAE {delta['mae_delta']:+.2e} "
+            f"RMSE {delta['rmse_delta']:+.2e} train x{delta['train_speedup']:.2f}"
+        )
+    write_results(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        # Baselines from before the precision option ran in float64
+        baseline_cases = [
+            dict({"precision": "float64"}, **case)
+            for case in load_results(args.baseline)["cases"]
+        ]
+        regressions = find_regressions(
+            results["cases"],
+            baseline_cases,
+            key_fields=KEY_FIELDS + ["precision"],
+            metrics=[f"seconds.{operation}.median" for operation in OPERATIONS],
+            tolerance=args.tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+Synthetic pollution datasets for benchmarks
+
+Frames follow the layout of the merged ingestion output (and of the
+sample_pollution_data test fixture): a Timestamp column followed by one
+"<pollutant>_<station>" column per station and pollutant.
+"""
+
+import numpy as np
+import pandas as pd
+
+POLLUTANTS = [
+    "Nitrogen dioxide",
+    "Particulate matter < 10 µm",
+    "Particulate matter < 2.5 µm",
+]
+
+
+def pollution_frame(hours, n_stations=8, n_pollutants=3, end=None, seed=0):
+    """Hourly frame with daily cycles, noise and a few missing values"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now().floor("h") if end is None else pd.Timestamp(end)
+    timestamps = pd.date_range(end=end, periods=hours, freq="h")
+
+    hour_of_day = timestamps.hour.to_numpy()
+    daily_cycle = 1 + 0.4 * np.sin(2 * np.pi * (hour_of_day - 8) / 24)
+
+    data = {"Timestamp": timestamps}
+    for station in range(n_stations):
+        for pollutant in POLLUTANTS[:n_pollutants]:
+            base = rng.uniform(5, 30)
+            values = base * daily_cycle + rng.normal(0, base * 0.15, hours)
+            values[rng.random(hours) < 0.01] = np.nan
+            data[f"{pollutant}_Station {station:03d}"] = np.clip(values, 0, None)
+    return pd.DataFrame(data)
@@ -0,0 +1,75 @@
+"""
+Shared helpers for the benchmark suites
+"""
+
+import json
+import platform
+import resource
+import sys
+from datetime import datetime
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def environment():
+    """Describe the machine a benchmark ran on"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def write_results(results, path):
+    """Write benchmark results as JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_regressions(cases, baseline_cases, key_fields, metrics, tolerance):
+    """Compare matching cases against a baseline run
+
+    A metric regresses when it grew by more than *tolerance* (a fraction)
+    over the baseline value. Metrics are dotted paths into each case.
+    """
+    baseline = {
+        tuple(case[field] for field in key_fields): case for case in baseline_cases
+    }
+    regressions = []
+    for case in cases:
+        key = tuple(case[field] for field in key_fields)
+        if key not in baseline:
+            continue
+        for metric in metrics:
+            current = _lookup(case, metric)
+            previous = _lookup(baseline[key], metric)
+            if current is None or not previous:
+                continue
+            if current > previous * (1 + tolerance):
+                regressions.append(
+                    f"{dict(zip(key_fields, key))} {metric}: "
+                    f"{previous:.4g} -> {current:.4g} (+{current / previous - 1:.0%})"
+                )
+    return regressions
+
+
+def _lookup(case, metric):
+    value = case
+    for part in metric.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
@@ -0,0 +1,59 @@
+"""
+Content-addressed cache keys for Prefect tasks
+
+A task's key is built from the digests of the datasets it reads, the
+registered model version it would load and its parameters. While those
+are unchanged, Prefect returns the persisted result of an earlier run of
+the task, within one flow run or across runs, instead of reloading data
+and models. Results expire after TASK_CACHE_MINUTES (default 60); set it
+to 0 to disable caching.
+"""
+
+import hashlib
+import os
+from datetime import timedelta
+
+from src.config import USE_S3
+from src.data.data_loader import DataLoader
+from src.models.pollution_predictor import latest_model_version
+
+TASK_CACHE_MINUTES = float(os.getenv("TASK_CACHE_MINUTES", "60"))
+TASK_CACHE_EXPIRATION = (
+    timedelta(minutes=TASK_CACHE_MINUTES) if TASK_CACHE_MINUTES > 0 else None
+)
+
+
+def _cache_key(context, parameters, data_types, model):
+    if TASK_CACHE_EXPIRATION is None:
+        return None
+
+    parts = [context.task.name]
+    loader = DataLoader(use_s3=USE_S3)
+    for data_type in data_types:
+        digest = loader.dataset_digest(data_type)
+        if digest is None:
+            # Nothing to address, let the task run and report the problem
+            return None
+        parts.append(f"{data_type}={digest}")
+    if model:
+        version, run_id = latest_model_version()
+        if version is None:
+            return None
+        parts.append(f"model={version}:{run_id}")
+    parts.extend(f"{name}={value!r}" for name, value in sorted(parameters.items()))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def input_cache_key(*data_types, model=False):
+    """Cache key function over the given datasets and, optionally, the model"""
+
+    def cache_key_fn(context, parameters):
+        return _cache_key(context, parameters, data_types, model)
+
+    return cache_key_fn
+
+
+def dataset_cache_key(context, parameters):
+    """Cache key over the dataset named by the task's data_type parameter"""
+    data_type = parameters.get("data_type", "training")
+    return _cache_key(context, parameters, [data_type], model=False)
@@ -6,11 +6,13 @@ from prefect.deployments import Deployment
 from prefect.server.schemas.schedules import CronSchedule
 
 from flows.main_flows import (
+    drift_monitoring_flow,
     full_mlops_pipeline_flow,
     monitoring_pipeline_flow,
     prediction_pipeline_flow,
     training_pipeline_flow,
 )
+from flows.monitoring_flow import batch_monitoring_flow
 
 # Training pipeline deployment - runs weekly on Sundays at 2 AM
 training_deployment = Deployment.build_from_flow(
@@ -21,6 +23,11 @@ training_deployment = Deployment.build_from_flow(
         "chunk_size_hours": 168,  # 1 week
         "week_number": 2,
         "force_refresh": True,
+        # Full Lasso refits. Incremental updates only apply to sgd models:
+        # register one with a manual run of model_type="sgd", then set
+        # incremental=True here. A Lasso model is always refit as Lasso
+        "incremental": False,
+        "model_type": "lasso",
     },
     tags=["training", "ml", "weekly"],
     description="Weekly training pipeline for air pollution prediction model",
@@ -45,6 +52,25 @@ monitoring_deployment = Deployment.build_from_flow(
     description="Continuous model monitoring and drift detection",
 )
 
+# Drift monitoring deployment - runs every hour
+drift_deployment = Deployment.build_from_flow(
+    flow=drift_monitoring_flow,
+    name="hourly-drift-monitoring",
+    schedule=CronSchedule(cron="15 * * * *"),  # Every hour, after ingestion
+    tags=["monitoring", "drift-detection", "hourly"],
+    description="Hourly streaming drift check on new prediction data",
+)
+
+# Batch monitoring deployment - runs every hour, after the drift check
+batch_monitoring_deployment = Deployment.build_from_flow(
+    flow=batch_monitoring_flow,
+    name="hourly-batch-monitoring",
+    schedule=CronSchedule(cron="30 * * * *"),  # Every hour at half past
+    parameters={"backfill": False},
+    tags=["monitoring", "metrics", "hourly"],
+    description="Per-hour drift and prediction-error metrics in the metrics store",
+)
+
 # Full pipeline deployment - runs weekly on Saturdays at midnight
 full_pipeline_deployment = Deployment.build_from_flow(
     flow=full_mlops_pipeline_flow,
@@ -66,6 +92,8 @@ if __name__ == "__main__":
     training_deployment.apply()
     prediction_deployment.apply()
     monitoring_deployment.apply()
+    drift_deployment.apply()
+    batch_monitoring_deployment.apply()
     full_pipeline_deployment.apply()
 
     print("✅ All Prefect deployments have been applied!")
@@ -73,4 +101,6 @@ if __name__ == "__main__":
     print("- weekly-training-pipeline (Sundays at 2 AM)")
     print("- daily-prediction-data-refresh (Daily at 6 AM)")
     print("- model-monitoring (Every 6 hours)")
+    print("- hourly-drift-monitoring (Every hour)")
+    print("- hourly-batch-monitoring (Every hour)")
     print("- weekly-full-mlops-pipeline (Saturdays at midnight)")
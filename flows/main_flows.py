@@ -3,32 +3,79 @@ Main Prefect flows for MLOps pipeline
 """
 
 import logging
+import os
 from datetime import datetime
 
 from prefect import flow
-from prefect.task_runners import SequentialTaskRunner
+from prefect.task_runners import ConcurrentTaskRunner, SequentialTaskRunner
 
 from flows.tasks import (
     check_data_quality_task,
+    check_drift_task,
     collect_prediction_data_task,
     collect_training_data_task,
+    compact_prediction_archive_task,
+    evaluate_model_task,
+    fingerprint_task,
+    load_monitoring_state,
+    save_monitoring_state,
+    track_forecast_accuracy_task,
     train_model_task,
+    update_model_task,
     validate_model_task,
 )
+from src.config import USE_S3
+from src.data.dataset_handle import open_dataset
+from src.monitoring.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+FLOW_TASK_RUNNER = os.getenv("FLOW_TASK_RUNNER", "concurrent").strip().lower()
+
+
+def build_task_runner(name=FLOW_TASK_RUNNER):
+    """Task runner for submitted tasks: concurrent, dask or sequential
+
+    concurrent runs tasks in threads, which suits these I/O bound tasks.
+    dask runs them in worker processes and needs prefect-dask.
+    """
+    if name == "sequential":
+        return SequentialTaskRunner()
+    if name == "dask":
+        try:
+            from prefect_dask import DaskTaskRunner
+        except ImportError:
+            logger.warning("FLOW_TASK_RUNNER=dask needs prefect-dask, using threads")
+        else:
+            return DaskTaskRunner()
+    return ConcurrentTaskRunner()
+
+
+def _prediction_summary(data_collection_result, quality_check):
+    return {
+        "data_collection": data_collection_result,
+        "quality_check": quality_check,
+        "pipeline_status": (
+            "success" if quality_check.get("passed", False) else "failed_quality_check"
+        ),
+        "timestamp": datetime.now().isoformat(),
+    }
+
 
 @flow(
     name="training_pipeline",
     description="Complete training pipeline: data collection → training → validation",
-    task_runner=SequentialTaskRunner(),
+    task_runner=build_task_runner(),
     retries=1,
 )
+@traced("flow.training_pipeline")
 def training_pipeline_flow(
     chunk_size_hours: int = 168,  # 1 week
     week_number: int = 2,
     force_refresh: bool = True,
+    incremental: bool = False,
+    drift_threshold: float = 1.0,
+    model_type: str = "lasso",
 ):
     """
     Complete training pipeline flow
@@ -37,6 +84,12 @@ def training_pipeline_flow(
         chunk_size_hours: Size of data chunks in hours (default: 168 = 1 week)
         week_number: Which week of data to collect (1-8)
         force_refresh: Whether to force fresh data collection
+        incremental: Update the current model with new windows only, keep
+            it when there are none, and fall back to a full refit when no
+            model exists, it cannot be updated or on drift
+        drift_threshold: Mean standardized input shift that forces a refit
+        model_type: Estimator of a full (non-incremental) training, "lasso"
+            or "sgd". Only sgd models can later be updated incrementally
     """
     logger.info(
         "Starting training pipeline: week=%s, chunk_size=%sh",
@@ -51,12 +104,33 @@ def training_pipeline_flow(
         force_refresh=force_refresh,
     )
 
+    # The collected frame is shared by the tasks below instead of reloaded
+    dataset = data_collection_result.get("dataset")
+
     # Step 2: Check data quality
-    quality_check = check_data_quality_task(data_type="training")
+    quality_check = check_data_quality_task(data_type="training", dataset=dataset)
 
     # Step 3: Train model (only if data quality is good)
     if quality_check.get("passed", False):
-        training_result = train_model_task()
+        if incremental:
+            training_result = update_model_task(
+                drift_threshold=drift_threshold, dataset=dataset
+            )
+            if training_result.get("reason") == "no_new_data":
+                # Nothing the current model has not seen, keep it as it is
+                logger.info("No new training windows, keeping the current model")
+            elif not training_result.get("updated", False):
+                logger.info(
+                    f"Full refit instead of update: {training_result.get('reason')}"
+                )
+                # Keep the current model family; only a first model is SGD,
+                # so later runs can update it
+                training_result = train_model_task(
+                    model_type=training_result.get("model_type", "sgd"),
+                    dataset=dataset,
+                )
+        else:
+            training_result = train_model_task(model_type=model_type, dataset=dataset)
 
         # Step 4: Validate the trained model
         validation_result = validate_model_task()
@@ -82,13 +156,17 @@ def training_pipeline_flow(
 @flow(
     name="prediction_pipeline",
     description="Prediction pipeline: collect fresh data → generate predictions",
-    task_runner=SequentialTaskRunner(),
+    task_runner=build_task_runner(),
     retries=1,
 )
+@traced("flow.prediction_pipeline")
 def prediction_pipeline_flow(chunk_size_hours: int = 48, week_number: int = 1):
     """
     Prediction pipeline flow
 
+    After a clean ingestion, earlier forecasts are scored against the new
+    observations and a new forecast is issued.
+
     Args:
         chunk_size_hours: Size of data chunks in hours (default: 48)
         week_number: Which week of data to collect (default: 1 = most recent)
@@ -103,39 +181,79 @@ def prediction_pipeline_flow(chunk_size_hours: int = 48, week_number: int = 1):
         chunk_size_hours=chunk_size_hours, week_number=week_number
     )
 
+    return _process_prediction_data(data_collection_result)
+
+
+def _process_prediction_data(data_collection_result):
+    """Quality check, forecast scoring and archive compaction of new data"""
+    dataset = data_collection_result.get("dataset")
+
     # Step 2: Check data quality
-    quality_check = check_data_quality_task(data_type="predicting")
+    quality_check = check_data_quality_task(data_type="predicting", dataset=dataset)
 
-    return {
-        "data_collection": data_collection_result,
-        "quality_check": quality_check,
-        "pipeline_status": (
-            "success" if quality_check.get("passed", False) else "failed_quality_check"
-        ),
-        "timestamp": datetime.now().isoformat(),
-    }
+    summary = _prediction_summary(data_collection_result, quality_check)
+
+    # Step 3: Score forecasts whose target hours have now been observed
+    if quality_check.get("passed", False):
+        summary["forecast_accuracy"] = track_forecast_accuracy_task(dataset=dataset)
+
+    # Step 4: Merge the prediction archive files of finished days
+    summary["archive_compaction"] = compact_prediction_archive_task()
+
+    return summary
 
 
 @flow(
     name="monitoring_pipeline",
     description="Model monitoring and drift detection pipeline",
-    task_runner=SequentialTaskRunner(),
+    task_runner=build_task_runner(),
 )
-def monitoring_pipeline_flow():
+@traced("flow.monitoring_pipeline")
+def monitoring_pipeline_flow(degradation_factor: float = 1.5):
     """
     Monitoring pipeline for model performance and data drift
+
+    The training and prediction data and the current model version are
+    fingerprinted. When none changed since the last run, the previous
+    evaluation is reused.
+    Otherwise the existing model is evaluated on new data, without
+    refitting, and retraining runs only when something is wrong.
     """
 
     logger.info("Starting monitoring pipeline")
 
-    # Check data quality for both datasets
-    training_quality = check_data_quality_task(data_type="training")
-    prediction_quality = check_data_quality_task(data_type="predicting")
+    # Each dataset is read once and shared by the tasks that use it
+    training_dataset = open_dataset("training", use_s3=USE_S3)
+    predicting_dataset = open_dataset("predicting", use_s3=USE_S3)
 
-    train_result = train_model_task()
+    # Both quality checks and the fingerprint are independent, run them
+    # concurrently and only wait where a result is needed
+    training_quality = check_data_quality_task.submit(
+        data_type="training", dataset=training_dataset
+    )
+    prediction_quality = check_data_quality_task.submit(
+        data_type="predicting", dataset=predicting_dataset
+    )
 
-    # Validate current model
-    model_validation = validate_model_task()
+    fingerprint = fingerprint_task.submit().result()
+    previous = load_monitoring_state()
+    unchanged = (
+        fingerprint.get("model_version") is not None
+        and previous.get("fingerprint") == fingerprint
+    )
+
+    if unchanged:
+        logger.info("Datasets and model unchanged, reusing last evaluation")
+        model_validation = previous["model_validation"]
+    else:
+        model_validation = evaluate_model_task.submit(
+            degradation_factor=degradation_factor,
+            training_dataset=training_dataset,
+            predicting_dataset=predicting_dataset,
+        ).result()
+
+    training_quality = training_quality.result()
+    prediction_quality = prediction_quality.result()
 
     # Determine if retraining is needed
     retrain_needed = False
@@ -152,17 +270,31 @@ def monitoring_pipeline_flow():
         retrain_needed = True
         reasons.append("No model available")
 
+    if model_validation.get("degraded", False):
+        retrain_needed = True
+        reasons.append("Model performance degraded on new data")
+
     monitoring_result = {
         "training_quality": training_quality,
         "prediction_quality": prediction_quality,
+        "fingerprint": fingerprint,
+        "unchanged": unchanged,
         "model_validation": model_validation,
         "retrain_needed": retrain_needed,
         "retrain_reasons": reasons,
         "timestamp": datetime.now().isoformat(),
     }
 
+    save_monitoring_state(
+        {
+            "fingerprint": fingerprint,
+            "model_validation": model_validation,
+            "timestamp": monitoring_result["timestamp"],
+        }
+    )
+
     logger.info(
-        f"Monitoring completed. Model metrics: {train_result}. "
+        f"Monitoring completed. Evaluation: {model_validation.get('evaluation')}. "
         f"Retrain needed: {retrain_needed}"
     )
 
@@ -175,11 +307,36 @@ def monitoring_pipeline_flow():
     return monitoring_result
 
 
+@flow(
+    name="drift_monitoring",
+    description="Hourly streaming drift check on new prediction data",
+    task_runner=build_task_runner(),
+)
+@traced("flow.drift_monitoring")
+def drift_monitoring_flow():
+    """
+    Add the latest prediction data to the drift sketches and test for drift
+
+    Cheap enough to run every hour; the monitoring pipeline decides on
+    retraining.
+    """
+    logger.info("Starting drift monitoring")
+
+    result = check_drift_task()
+    if result.get("dataset_drift"):
+        logger.warning(
+            f"Data drift detected in {result['drifted_features']} of "
+            f"{result['evaluated_features']} features"
+        )
+    return result
+
+
 @flow(
     name="full_mlops_pipeline",
     description="Complete MLOps pipeline with monitoring and automatic retraining",
-    task_runner=SequentialTaskRunner(),
+    task_runner=build_task_runner(),
 )
+@traced("flow.full_mlops_pipeline")
 def full_mlops_pipeline_flow(
     training_chunk_hours: int = 168,
     training_week_number: int = 2,
@@ -202,7 +359,9 @@ def full_mlops_pipeline_flow(
 
     results = {"pipeline_start": datetime.now().isoformat()}
 
-    # Step 1: Run monitoring to check current state
+    # Step 1: Run monitoring to check current state. It evaluates the
+    # model on the predicting dataset it opened, so that file is only
+    # refreshed once monitoring is done
     if not force_retrain:
         monitoring_result = monitoring_pipeline_flow()
         results["monitoring"] = monitoring_result
@@ -216,6 +375,12 @@ def full_mlops_pipeline_flow(
     else:
         train_performed = False
 
+    # The prediction data refresh does not depend on training, so it runs
+    # in the background while the model is trained
+    prediction_collection = collect_prediction_data_task.submit(
+        chunk_size_hours=prediction_chunk_hours, week_number=prediction_week_number
+    )
+
     # Step 2: Run training pipeline if needed
     if force_retrain or not train_performed:
         training_result = training_pipeline_flow(
@@ -225,11 +390,11 @@ def full_mlops_pipeline_flow(
         )
         results["training"] = training_result
 
-    # Step 3: Always refresh prediction data
-    prediction_result = prediction_pipeline_flow(
-        chunk_size_hours=prediction_chunk_hours, week_number=prediction_week_number
+    # Step 3: Check the refreshed prediction data, score earlier forecasts
+    # and compact the archive, as the prediction pipeline does
+    results["prediction_data"] = _process_prediction_data(
+        prediction_collection.result()
     )
-    results["prediction_data"] = prediction_result
 
     results["pipeline_end"] = datetime.now().isoformat()
     results["status"] = "completed"
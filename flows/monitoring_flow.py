@@ -0,0 +1,41 @@
+"""
+Batch monitoring flow: per-hour drift and prediction-error metrics
+"""
+
+import logging
+
+from prefect import flow
+
+from flows.tasks import record_batch_metrics_task
+from src.config import USE_S3
+from src.data.dataset_handle import open_dataset
+from src.monitoring.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+@flow(
+    name="batch_monitoring",
+    description="Per-hour drift and prediction-error metrics in the metrics store",
+)
+@traced("flow.batch_monitoring")
+def batch_monitoring_flow(backfill: bool = False):
+    """
+    Record monitoring metrics for the hours added since the last run
+
+    Args:
+        backfill: Recompute and rewrite the metrics of the whole history
+    """
+    logger.info(f"Starting batch monitoring (backfill={backfill})")
+
+    result = record_batch_metrics_task(
+        backfill=backfill,
+        training_dataset=open_dataset("training", use_s3=USE_S3),
+        predicting_dataset=open_dataset("predicting", use_s3=USE_S3),
+    )
+    logger.info(f"Recorded {result['rows']} metrics for {result['hours']} hours")
+    return result
+
+
+if __name__ == "__main__":
+    batch_monitoring_flow()
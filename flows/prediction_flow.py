@@ -1,4 +1,3 @@
-import json
 import os
 import time
 from datetime import datetime, timedelta
@@ -7,6 +6,7 @@ import boto3
 from prefect import flow, task
 
 from src.data.data_loader import DataLoader
+from src.data.prediction_archive import PredictionArchive
 from src.models.pollution_predictor import PollutionPredictor
 from src.monitoring.cloudwatch_metrics import CloudWatchMetrics
 
@@ -79,23 +79,12 @@ def make_predictions(df, model_version):
 
 
 @task
-def save_predictions_to_s3(predictions):
-    """Save predictions to S3 for later analysis"""
-    s3_client = boto3.client("s3")
-    bucket = os.environ.get("S3_BUCKET", "air-pollution-models")
+def archive_predictions(predictions, model_version):
+    """Append predictions to the partitioned archive on S3 for later analysis"""
+    paths = PredictionArchive(use_s3=True).append(predictions, model_version)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    key = f"predictions/predictions_{timestamp}.json"
-
-    s3_client.put_object(
-        Bucket=bucket,
-        Key=key,
-        Body=json.dumps(predictions, indent=2),
-        ContentType="application/json",
-    )
-
-    print(f"Saved predictions to s3://{bucket}/{key}")
-    return f"s3://{bucket}/{key}"
+    print(f"Archived predictions to {', '.join(f's3://{path}' for path in paths)}")
+    return f"s3://{paths[0]}" if paths else None
 
 
 @task
@@ -135,7 +124,7 @@ def prediction_flow():
         predictions = make_predictions(df, model_version)
 
         # Save and distribute predictions
-        s3_path = save_predictions_to_s3(predictions)
+        s3_path = archive_predictions(predictions, model_version)
         send_predictions_to_api(predictions)
 
         # Log metrics to CloudWatch
@@ -3,7 +3,7 @@ from prefect import flow, task
 
 from src.data.data_loader import DataLoader
 from src.models.pollution_predictor import PollutionPredictor
-from src.monitoring.evidently_monitor import ModelMonitor
+from src.monitoring.evidently_monitoring import ModelMonitor
 
 
 @task
@@ -17,9 +17,10 @@ def load_training_data():
 
 @task
 def check_data_drift(df):
-    """Check for data drift before training"""
+    """Check the latest prediction data for drift against the training data"""
     monitor = ModelMonitor()
-    drift_results = monitor.detect_drift(df)
+    current = DataLoader().load_predicting_dataset()
+    drift_results = {"dataset_drift_detected": monitor.check_drift(df, current)}
     print(f"Data drift detected: {drift_results['dataset_drift_detected']}")
     return drift_results
 
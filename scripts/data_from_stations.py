@@ -2,10 +2,46 @@ import datetime as dt
 
 import numpy as np
 
+from .spatial_index import StationIndex
 from .wfs import download_stored_query
 
 # import time
 
+AIR_QUALITY_QUERY = "urban::observations::airquality::hourly::multipointcoverage"
+
+
+def air_quality_query_args(bbox, start_time_iso, end_time_iso):
+    """Stored query arguments for a bbox and an ISO time interval"""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    return [
+        f"bbox={lon_min},{lat_min},{lon_max},{lat_max}",
+        "starttime=" + start_time_iso,
+        "endtime=" + end_time_iso,
+    ]
+
+
+def _locations_in_bbox(obs, lon_min, lat_min, lon_max, lat_max):
+    """Select station metadata inside the bbox through a spatial index"""
+    index = StationIndex(obs.location_metadata)
+    return {
+        key: obs.location_metadata[key]
+        for key in index.within_bbox(lon_min, lat_min, lon_max, lat_max)
+    }
+
+
+def _filter_observations(obs, locations):
+    """Group observations by selected station in time order
+
+    Only the stations present at each time step are intersected with the
+    selection, so the cost no longer scales with times x selected stations.
+    """
+    selected = set(locations)
+    filtered_observations = {}
+    for key, value in obs.data.items():
+        for loc_key in value.keys() & selected:
+            filtered_observations.setdefault(loc_key, []).append({key: value[loc_key]})
+    return filtered_observations
+
 
 def get_air_pollution_data(latitude_city, longitude_city, square_side=100, time=None):
     """
@@ -77,24 +113,12 @@ def get_air_pollution_data(latitude_city, longitude_city, square_side=100, time=
     #  'fmi::observations::airquality::hourly::multipointcoverage',
 
     # Filter locations within the specified square area
-    locations = {
-        key: value
-        for key, value in obs.location_metadata.items()
-        if lat_min <= value["latitude"] <= lat_max
-        and lon_min <= value["longitude"] <= lon_max
-    }
+    locations = _locations_in_bbox(obs, lon_min, lat_min, lon_max, lat_max)
 
     # print("Privet!")
 
     # Filter observations for selected locations
-    filtered_observations = {}
-    for key in obs.data.keys():
-        value = obs.data[key]
-        for loc_key in locations.keys():
-            if loc_key in value:
-                if loc_key not in filtered_observations:
-                    filtered_observations[loc_key] = []
-                filtered_observations[loc_key].append({key: value[loc_key]})
+    filtered_observations = _filter_observations(obs, locations)
 
     # Extract latest observations for each location
     filtered_latest_observations = {
@@ -173,33 +197,19 @@ def get_air_pollution_data_timeInterval(
     #                              "endtime=" + end_time_iso])
 
     obs = download_stored_query(
-        "urban::observations::airquality::hourly::multipointcoverage",
-        args=[
-            f"bbox={lon_min},{lat_min},{lon_max},{lat_max}",
-            "starttime=" + start_time_iso,
-            "endtime=" + end_time_iso,
-        ],
+        AIR_QUALITY_QUERY,
+        args=air_quality_query_args(
+            (lon_min, lat_min, lon_max, lat_max), start_time_iso, end_time_iso
+        ),
     )
 
     # Filter locations within the specified square area
-    locations = {
-        key: value
-        for key, value in obs.location_metadata.items()
-        if lat_min <= value["latitude"] <= lat_max
-        and lon_min <= value["longitude"] <= lon_max
-    }
+    locations = _locations_in_bbox(obs, lon_min, lat_min, lon_max, lat_max)
 
     # print(lat_max, lat_min, lon_max, lon_min)
 
     # Filter observations for selected locations
-    filtered_observations = {}
-    for key in obs.data.keys():
-        value = obs.data[key]
-        for loc_key in locations.keys():
-            if loc_key in value:
-                if loc_key not in filtered_observations:
-                    filtered_observations[loc_key] = []
-                filtered_observations[loc_key].append({key: value[loc_key]})
+    filtered_observations = _filter_observations(obs, locations)
 
     # Extract latest observations for each location
     filtered_latest_observations = {
@@ -274,24 +284,12 @@ def get_weather_data(latitude_city, longitude_city, square_side=5, time=None):
     )
 
     # Filter locations within the specified square area
-    locations = {
-        key: value
-        for key, value in obs.location_metadata.items()
-        if lat_min <= value["latitude"] <= lat_max
-        and lon_min <= value["longitude"] <= lon_max
-    }
+    locations = _locations_in_bbox(obs, lon_min, lat_min, lon_max, lat_max)
 
     # print("Privet!")
 
     # Filter observations for selected locations
-    filtered_observations = {}
-    for key in obs.data.keys():
-        value = obs.data[key]
-        for loc_key in locations.keys():
-            if loc_key in value:
-                if loc_key not in filtered_observations:
-                    filtered_observations[loc_key] = []
-                filtered_observations[loc_key].append({key: value[loc_key]})
+    filtered_observations = _filter_observations(obs, locations)
 
     # Extract latest observations for each location
     filtered_latest_observations = {
@@ -376,24 +374,12 @@ def get_weather_data_timeInterval(
     # print(obs)
 
     # Filter locations within the specified square area
-    locations = {
-        key: value
-        for key, value in obs.location_metadata.items()
-        if lat_min <= value["latitude"] <= lat_max
-        and lon_min <= value["longitude"] <= lon_max
-    }
+    locations = _locations_in_bbox(obs, lon_min, lat_min, lon_max, lat_max)
 
     # print(lat_max, lat_min, lon_max, lon_min)
 
     # Filter observations for selected locations
-    filtered_observations = {}
-    for key in obs.data.keys():
-        value = obs.data[key]
-        for loc_key in locations.keys():
-            if loc_key in value:
-                if loc_key not in filtered_observations:
-                    filtered_observations[loc_key] = []
-                filtered_observations[loc_key].append({key: value[loc_key]})
+    filtered_observations = _filter_observations(obs, locations)
 
     # Extract latest observations for each location
     filtered_latest_observations = {
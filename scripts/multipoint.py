@@ -31,7 +31,11 @@ TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
 
 class MultiPoint(object):
-    """Class for holding multipoint data."""
+    """Class for holding multipoint data.
+
+    In timeseries mode ``data`` maps station names to ``datetime64[s]`` times
+    and NumPy value arrays, otherwise time steps to per-station observations.
+    """
 
     def __init__(self, xml, query_id, timeseries=False):
         """Initialize class."""
@@ -88,36 +92,82 @@ class MultiPoint(object):
             )
 
     def _collect_timeseries(self, type2obs, latitudes, longitudes, times, measurements):
-        for i, tim in enumerate(times):
-            loc = (latitudes[i], longitudes[i])
-            name = self._location2name[loc]
+        station_names, inverse = self._row_locations(latitudes, longitudes)
+        groups = _group_rows(inverse, len(station_names))
+
+        # Keep stations in order of first appearance, like the XML
+        for k in sorted(range(len(groups)), key=lambda k: groups[k][0]):
+            rows = _as_slice(groups[k])
+            series = dict(times=times[rows])
+            for j, obs in enumerate(type2obs.values()):
+                series[obs["name"]] = {
+                    "values": measurements[rows, j],
+                    "unit": obs["units"],
+                }
+
+            name = station_names[k]
             if name not in self.data:
-                self.data[name] = dict(times=[])
-            self.data[name]["times"].append(tim)
-            for j, key in enumerate(type2obs.keys()):
-                if type2obs[key]["name"] not in self.data[name]:
-                    self.data[name][type2obs[key]["name"]] = {
-                        "values": [],
-                        "unit": type2obs[key]["units"],
-                    }
-                self.data[name][type2obs[key]["name"]]["values"].append(
-                    measurements[i, j]
-                )
+                self.data[name] = series
+                continue
+            for key, value in series.items():
+                if key == "times":
+                    self.data[name]["times"] = np.concatenate(
+                        (self.data[name]["times"], value)
+                    )
+                elif key not in self.data[name]:
+                    self.data[name][key] = value
+                else:
+                    self.data[name][key]["values"] = np.concatenate(
+                        (self.data[name][key]["values"], value["values"])
+                    )
 
     def _collect_non_timeseries(
         self, type2obs, latitudes, longitudes, times, measurements
     ):
-        for i, tim in enumerate(times):
+        station_names, inverse = self._row_locations(latitudes, longitudes)
+        names = station_names[inverse]
+        fields = [
+            (j, obs["name"], obs["units"]) for j, obs in enumerate(type2obs.values())
+        ]
+
+        # Group rows by time with one sort; datetimes are created once per
+        # unique time step when they become keys of the public data dict
+        unique_times, time_inverse = np.unique(times, return_inverse=True)
+        groups = _group_rows(time_inverse, len(unique_times))
+
+        for tim, rows in zip(unique_times.tolist(), groups):
             if tim not in self.data:
                 self.data[tim] = dict()
-            loc = (latitudes[i], longitudes[i])
-            name = self._location2name[loc]
-            if name not in self.data[tim]:
-                self.data[tim][name] = dict()
-            for j, key in enumerate(type2obs.keys()):
-                self.data[tim][name][type2obs[key]["name"]] = dict(
-                    {"value": measurements[i, j], "units": type2obs[key]["units"]}
-                )
+            for i in rows:
+                self.data[tim][names[i]] = {
+                    name: dict({"value": measurements[i, j], "units": units})
+                    for j, name, units in fields
+                }
+
+    def _row_locations(self, latitudes, longitudes):
+        """Return unique station names and the index of each row into them."""
+        locations, inverse = np.unique(
+            np.column_stack((latitudes, longitudes)), axis=0, return_inverse=True
+        )
+        station_names = np.array(
+            [self._location2name[tuple(loc)] for loc in locations.tolist()],
+            dtype=object,
+        )
+        return station_names, inverse.ravel()
+
+
+def _group_rows(inverse, n_groups):
+    """Split row indices into one stably ordered array per group."""
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse, minlength=n_groups))[:-1]
+    return np.split(order, bounds)
+
+
+def _as_slice(rows):
+    """Use a slice for contiguous rows so that indexing returns views."""
+    if rows[-1] - rows[0] + 1 == len(rows):
+        return slice(rows[0], rows[-1] + 1)
+    return rows
 
 
 def _parse_positions(xml):
@@ -125,12 +175,12 @@ def _parse_positions(xml):
 
 
 def _parse_times(xml, positions):
-    times = np.array(
-        [dt.datetime(1970, 1, 1) + dt.timedelta(seconds=t) for t in positions[2::3]]
-    )
+    """Parse observation times as a datetime64[s] array of UTC epochs."""
+    times = positions[2::3].astype("int64").astype("datetime64[s]")
     if times.size == 0:
         times = np.array(
-            [dt.datetime.strptime(xml.findtext(wfs.GML_TIME_POSITION), TIME_FORMAT)]
+            [dt.datetime.strptime(xml.findtext(wfs.GML_TIME_POSITION), TIME_FORMAT)],
+            dtype="datetime64[s]",
         )
     return times
 
@@ -171,9 +221,13 @@ def download_and_parse(query_id, args=None):
     if "timeseries=True" in args:
         timeseries = True
         args.remove("timeseries=True")
+    xml = read_url(stored_query_url(query_id, args))
+    return MultiPoint(xml, query_id, timeseries=timeseries)
+
+
+def stored_query_url(query_id, args=None):
+    """Build the request URL of a stored query."""
     url = wfs.STORED_QUERY_URL + query_id
     if args:
         url = url + "&" + "&".join(args)
-    xml = read_url(url)
-    # print(url)
-    return MultiPoint(xml, query_id, timeseries=timeseries)
+    return url
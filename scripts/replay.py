@@ -0,0 +1,123 @@
+"""Offline replay of recorded FMI WFS responses.
+
+While a replay store is active, :func:`scripts.utils.read_url` serves
+responses from disk instead of the FMI endpoint, so everything built on
+``download_stored_query`` runs offline. Responses are stored as one file
+per request URL. In record mode missing responses are fetched (from the
+live endpoint or a custom responder) and written to the store first.
+
+A store can also be activated with the ``FMI_REPLAY_DIR`` environment
+variable, and ``FMI_REPLAY_RECORD=1`` to record missing responses.
+"""
+
+import hashlib
+import os
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+
+_active_store = None
+
+
+class ReplayStore(object):
+    """Directory of recorded responses keyed by request URL."""
+
+    def __init__(self, directory, record=False, responder=None):
+        """Initialize class."""
+        self.directory = directory
+        self.record = record
+        self.responder = responder
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, url):
+        """Return the file holding the response for *url*."""
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".xml")
+
+    def save(self, url, content):
+        """Store *content* as the response for *url*."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        with open(self.path_for(url), "wb") as fid:
+            fid.write(content)
+
+    def read(self, url):
+        """Return the recorded response for *url*."""
+        path = self.path_for(url)
+        if not os.path.exists(path):
+            if not self.record:
+                raise FileNotFoundError("No recorded response for %s" % url)
+            self.save(url, self._fetch(url))
+        with open(path, "rb") as fid:
+            return fid.read()
+
+    def _fetch(self, url):
+        if self.responder is not None:
+            return self.responder(url)
+        import requests
+
+        return requests.get(url).content
+
+
+@contextmanager
+def replay(directory, record=False, responder=None):
+    """Serve FMI requests from *directory* inside the ``with`` block."""
+    global _active_store
+    previous = _active_store
+    _active_store = ReplayStore(directory, record=record, responder=responder)
+    try:
+        yield _active_store
+    finally:
+        _active_store = previous
+
+
+def active_store():
+    """Return the replay store in use, if any."""
+    global _active_store
+    if _active_store is None and os.environ.get("FMI_REPLAY_DIR"):
+        _active_store = ReplayStore(
+            os.environ["FMI_REPLAY_DIR"],
+            record=os.environ.get("FMI_REPLAY_RECORD", "") == "1",
+        )
+    return _active_store
+
+
+def build_multipointcoverage(stations, epochs, fields, values=None):
+    """Build a multipointcoverage response in the layout FMI returns.
+
+    *stations* is a sequence of ``(name, fmisid, latitude, longitude)``,
+    *epochs* the observation times in seconds since 1970 and *fields* a
+    sequence of ``(parameter, label, unit)``. Rows are station-major. When
+    *values* is None, measurements are derived from the row and field index.
+    """
+    points = "".join(
+        '<gml:Point gml:id="point-%d"><gml:name>%s</gml:name>'
+        "<gml:pos>%r %r </gml:pos></gml:Point>" % (fmisid, escape(name), lat, lon)
+        for name, fmisid, lat, lon in stations
+    )
+    records = "".join(
+        '<swe:field name="%s"><swe:Quantity><swe:label>%s</swe:label>'
+        '<swe:uom code="%s"/></swe:Quantity></swe:field>'
+        % (escape(typ), escape(label), escape(unit))
+        for typ, label, unit in fields
+    )
+    positions = []
+    rows = []
+    for s, (_, _, lat, lon) in enumerate(stations):
+        for t, epoch in enumerate(epochs):
+            positions.append("%r %r %d" % (lat, lon, epoch))
+            if values is None:
+                row = [float(s * len(epochs) + t + j / 10) for j in range(len(fields))]
+            else:
+                row = values[s * len(epochs) + t]
+            rows.append(" ".join(repr(float(v)) for v in row))
+    return (
+        '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+        'xmlns:gml="http://www.opengis.net/gml/3.2" '
+        'xmlns:gmlcov="http://www.opengis.net/gmlcov/1.0" '
+        'xmlns:swe="http://www.opengis.net/swe/2.0">'
+        "%s<swe:DataRecord>%s</swe:DataRecord>"
+        "<gmlcov:positions>%s</gmlcov:positions>"
+        "<gml:doubleOrNilReasonTupleList>%s</gml:doubleOrNilReasonTupleList>"
+        "</wfs:FeatureCollection>"
+        % (points, records, "\n".join(positions), "\n".join(rows))
+    ).encode("utf-8")
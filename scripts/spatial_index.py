@@ -0,0 +1,88 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vectors(latitudes, longitudes):
+    """Convert lat/lon in degrees to points on the unit sphere."""
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    return np.column_stack(
+        (np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat))
+    )
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def _km_to_chord(distance_km):
+    return 2 * np.sin(min(distance_km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+class StationIndex(object):
+    """KD-tree index over station coordinates.
+
+    Built from a ``MultiPoint.location_metadata`` style mapping of
+    ``{name: {"latitude": ..., "longitude": ..., ...}}``.
+    """
+
+    def __init__(self, location_metadata):
+        """Initialize class."""
+        self.metadata = dict(location_metadata)
+        self.names = np.array(list(self.metadata), dtype=object)
+        self.latitudes = np.array(
+            [m["latitude"] for m in self.metadata.values()], dtype=float
+        )
+        self.longitudes = np.array(
+            [m["longitude"] for m in self.metadata.values()], dtype=float
+        )
+        # Planar tree for bbox candidates, spherical tree for distances
+        self._planar = cKDTree(
+            np.column_stack((self.latitudes, self.longitudes)).reshape(-1, 2)
+        )
+        self._sphere = cKDTree(
+            _unit_vectors(self.latitudes, self.longitudes).reshape(-1, 3)
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def within_bbox(self, lon_min, lat_min, lon_max, lat_max):
+        """Return names of stations inside the bounding box."""
+        if not len(self):
+            return []
+        center = ((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+        half_extent = max(lat_max - lat_min, lon_max - lon_min) / 2
+        candidates = np.array(
+            self._planar.query_ball_point(center, half_extent, p=np.inf), dtype=int
+        )
+        mask = (
+            (self.latitudes[candidates] >= lat_min)
+            & (self.latitudes[candidates] <= lat_max)
+            & (self.longitudes[candidates] >= lon_min)
+            & (self.longitudes[candidates] <= lon_max)
+        )
+        return list(self.names[np.sort(candidates[mask])])
+
+    def nearest(self, latitude, longitude, k=1, max_distance_km=None):
+        """Return up to *k* (name, distance_km) pairs sorted by distance."""
+        if not len(self) or k < 1:
+            return []
+        k = min(k, len(self))
+        upper_bound = np.inf
+        if max_distance_km is not None:
+            upper_bound = _km_to_chord(max_distance_km)
+
+        distances, indices = self._sphere.query(
+            _unit_vectors([latitude], [longitude])[0],
+            k=k,
+            distance_upper_bound=upper_bound,
+        )
+        distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+        found = np.isfinite(distances)
+        return [
+            (self.names[i], float(d))
+            for i, d in zip(indices[found], _chord_to_km(distances[found]))
+        ]
@@ -25,12 +25,17 @@ from urllib.request import urlretrieve
 import defusedxml.ElementTree as ET
 import requests
 
+from .replay import active_store
+
 EXCEPTION_TEXT = ".//{http://www.opengis.net/ows/1.1}ExceptionText"
 
 
 def read_url(url):
-    """Read url."""
-    # print("Reading url: %s" % url)
+    """Read url, or its recorded response while a replay store is active."""
+    store = active_store()
+    if store is not None:
+        return store.read(url)
+
     req = requests.get(url)
     if not req.ok:
         _give_warning(req.content)
@@ -1,14 +1,22 @@
 # from pydantic import BaseModel
 # import pandas as pd
+import time
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 # from src.models.predict import predict
 from src.api.routes import (
     data_ingestion_endpoint,
     health_check_endpoint,
+    metrics_endpoint,
     predictions_endpoint,
+    profiler_endpoint,
+    stations_endpoint,
 )
+from src.config import PROFILER_ENABLED
+from src.monitoring.prometheus_metrics import observe_request
+from src.monitoring.tracing import attach_context, span
 
 # Create FastAPI app
 app = FastAPI(
@@ -17,12 +25,40 @@ app = FastAPI(
     version="1.0.0",
 )
 
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe request latency per route template and trace the request"""
+    start = time.perf_counter()
+    status = 500
+    with attach_context(dict(request.headers)), span(
+        f"{request.method} {request.url.path}", **{"http.method": request.method}
+    ) as current:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            observe_request(request.method, route, status, time.perf_counter() - start)
+            if current is not None:
+                current.set_attribute("http.route", route)
+                current.set_attribute("http.status_code", status)
+
+
 # Include routers
 app.include_router(health_check_endpoint.router, prefix="/api/v1", tags=["health"])
 app.include_router(predictions_endpoint.router, prefix="/api/v1", tags=["predictions"])
 app.include_router(
     data_ingestion_endpoint.router, prefix="/api/v1", tags=["data_ingestion"]
 )
+app.include_router(stations_endpoint.router, prefix="/api/v1", tags=["stations"])
+app.include_router(metrics_endpoint.router, tags=["monitoring"])
+
+# The profiler is only mounted when enabled, so it costs nothing otherwise
+if PROFILER_ENABLED:
+    app.middleware("http")(profiler_endpoint.profile_request)
+    app.include_router(profiler_endpoint.router, prefix="/api/v1", tags=["admin"])
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -5,6 +5,7 @@ from fastapi import APIRouter, BackgroundTasks, HTTPException
 
 from src.config import USE_S3
 from src.data.data_ingestion import DataIngestion
+from src.monitoring.tracing import attach_context, inject_context, span
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -19,15 +20,18 @@ async def collect_training_data(
 ):
     """Collect and prepare training data"""
     try:
+        # Background tasks run after the request span has ended
+        trace_context = inject_context()
 
         def run_training_data_collection():
-            ingestion = DataIngestion(use_s3=USE_S3)
+            with attach_context(trace_context), span("background.collect_data"):
+                ingestion = DataIngestion(use_s3=USE_S3)
 
-            ingestion.fetch_pollution_data(
-                data_type="training",
-                chunk_size_hours=chunk_size_hours,
-                week_number=week_number,
-            )
+                ingestion.fetch_pollution_data(
+                    data_type="training",
+                    chunk_size_hours=chunk_size_hours,
+                    week_number=week_number,
+                )
 
             # logger.info(f"Training data collection completed: {len(df)} records")
 
@@ -56,15 +60,18 @@ async def collect_testing_data(
 ):
     """Collect and prepare training data"""
     try:
+        # Background tasks run after the request span has ended
+        trace_context = inject_context()
 
         def run_training_data_collection():
-            ingestion = DataIngestion(use_s3=USE_S3)
-
-            ingestion.fetch_pollution_data(
-                data_type="training",
-                chunk_size_hours=chunk_size_hours,
-                week_number=week_number,
-            )
+            with attach_context(trace_context), span("background.collect_data"):
+                ingestion = DataIngestion(use_s3=USE_S3)
+
+                ingestion.fetch_pollution_data(
+                    data_type="training",
+                    chunk_size_hours=chunk_size_hours,
+                    week_number=week_number,
+                )
 
             # logger.info(f"Training data collection completed: {len(df)} records")
 
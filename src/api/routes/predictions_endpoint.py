@@ -10,6 +10,11 @@ from src.config import USE_S3
 from src.data.data_ingestion import DataIngestion
 from src.data.data_loader import DataLoader
 from src.models.pollution_predictor import PollutionPredictor
+from src.monitoring.prometheus_metrics import (
+    observe_dataset,
+    stage_timer,
+    track_model_version,
+)
 
 # Set MLflow tracking URI based on USE_S3
 if USE_S3:
@@ -27,6 +32,7 @@ logger = logging.getLogger(__name__)
 predictor = PollutionPredictor()
 data_loader = DataLoader(use_s3=USE_S3)
 data_ingestion = DataIngestion(use_s3=USE_S3)
+track_model_version(predictor)
 
 # Try to load the latest model on startup
 try:
@@ -96,7 +102,8 @@ async def predict_pollution(fetch_fresh_data: bool = False):  # noqa: C901
 
         # Load prediction dataset and check if it exists
         try:
-            df = data_loader.load_predicting_dataset()
+            with stage_timer("data_load"):
+                df = data_loader.load_predicting_dataset()
         except FileNotFoundError:
             # If no prediction data exists, try to fetch it automatically
             try:
@@ -111,6 +118,9 @@ async def predict_pollution(fetch_fresh_data: bool = False):  # noqa: C901
                     detail=f"No prediction data available and failed to fetch fresh data: {str(fetch_error)}",
                 )
 
+        if df is not None:
+            observe_dataset("predicting", df)
+
         # Check if dataframe is empty or has insufficient data
         if df is None or df.empty:
             raise HTTPException(
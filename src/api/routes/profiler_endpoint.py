@@ -0,0 +1,82 @@
+import asyncio
+import hmac
+import os
+import re
+import threading
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from src.config import PROFILER_TOKEN
+from src.monitoring.profiler import PROFILE_DIR, SamplingProfiler
+
+PROFILE_HEADER = "x-profile"
+MAX_PROFILE_SECONDS = 60
+
+router = APIRouter()
+_profile_lock = threading.Lock()
+
+
+def is_admin(token):
+    return bool(PROFILER_TOKEN) and hmac.compare_digest(token or "", PROFILER_TOKEN)
+
+
+async def require_admin(x_admin_token: str = Header(None)):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_process(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Sample all threads for a while and return collapsed stacks"""
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        profiler = SamplingProfiler(interval=interval_ms / 1000).start()
+        try:
+            # Sleep on the event loop so the requests being profiled keep running
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+    finally:
+        _profile_lock.release()
+
+    filename = profiler.save()
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(profiler.sample_count),
+        },
+    )
+
+
+@router.get("/admin/profiles/{filename}", dependencies=[Depends(require_admin)])
+async def get_profile(filename: str):
+    """Download a saved profile"""
+    if not re.fullmatch(r"[\w.-]+\.folded", filename):
+        raise HTTPException(status_code=400, detail="Invalid profile name")
+    path = os.path.join(PROFILE_DIR, filename)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=filename)
+
+
+async def profile_request(request: Request, call_next):
+    """Profile a single request when an admin sends the X-Profile header
+
+    The sampler sees every thread, so requests served concurrently show up
+    in the same profile.
+    """
+    if PROFILE_HEADER not in request.headers or not is_admin(
+        request.headers.get("x-admin-token")
+    ):
+        return await call_next(request)
+
+    with SamplingProfiler() as profiler:
+        response = await call_next(request)
+    response.headers["X-Profile-File"] = profiler.save()
+    return response
@@ -0,0 +1,39 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.data.station_registry import StationRegistry
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/stations")
+async def list_stations(region: Optional[str] = None):
+    """List registered stations and their coordinates"""
+    registry = StationRegistry.load()
+
+    if region is not None and region not in registry.regions:
+        raise HTTPException(status_code=404, detail=f"Unknown region: {region}")
+
+    return {
+        "regions": registry.region_names(),
+        "stations": registry.station_metadata(region),
+    }
+
+
+@router.get("/stations/nearest")
+async def nearest_stations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100),
+    max_distance_km: Optional[float] = Query(None, gt=0),
+):
+    """Find the registered stations closest to a point"""
+    registry = StationRegistry.load()
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "stations": registry.nearest(lat, lon, k=k, max_distance_km=max_distance_km),
+    }
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -8,7 +9,7 @@ load_dotenv()
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parents[1]
 
-DATA_DIR = PROJ_ROOT / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", PROJ_ROOT / "data"))
 RAW_DATA_DIR = DATA_DIR / "raw"
 INTERIM_DATA_DIR = DATA_DIR / "interim"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
@@ -20,3 +21,7 @@ REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
 SPLIT_DATE = "2023-01-01"
 USE_S3 = False
+
+# Admin-only sampling profiler, see src/api/routes/profiler_endpoint.py
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
@@ -3,10 +3,14 @@ import io
 import logging
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import boto3
 import pandas as pd
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from geopy.geocoders import Nominatim
 
 from scripts.data_from_stations import get_air_pollution_data_timeInterval
@@ -15,185 +19,326 @@ from src.config import (  # DO NOT MODIFY: Required for imports
     PROJ_ROOT,
     RAW_DATA_DIR,
 )
+from src.data.data_loader import total_dataset_filename
+from src.data.station_registry import (
+    AIR_POLLUTION_INDICATORS,
+    REGISTRY_FILE,
+    StationRegistry,
+)
+from src.monitoring.tracing import span
 
 sys.path.append(PROJ_ROOT)  # DO NOT MODIFY: Required for imports
 
 
 sys.path.append(PROJ_ROOT)
 
+# Uploads larger than this are split into concurrent multipart chunks
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+
+def time_chunks(chunk_size_hours, week_number, end=None):
+    """Return (start, end) windows stepping back from *end*, newest first"""
+    if end is None:
+        end = dt.datetime.now()
+    chunk = dt.timedelta(hours=chunk_size_hours)
+    return [(end - (n + 1) * chunk, end - n * chunk) for n in range(week_number)]
+
 
 class DataIngestion:
-    def __init__(self, use_s3=False, address="Helsinki"):
+    def __init__(self, use_s3=False, address=None, max_workers=8, regions=None):
+        """Ingest the configured station registry, or only *address* or *regions*
+
+        The registry file is updated with discovered stations only when it
+        is the one being ingested, so ad-hoc runs never replace it.
+        """
         self.logger = logging.getLogger(__name__)
-        self.address = address
         self.use_s3 = use_s3
-
-        print(
-            f"DataIngestion initialized with use_s3={self.use_s3}, address={self.address}"
+        self.max_workers = max_workers
+        self._s3_client_lock = threading.Lock()
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=max_workers,
         )
+
         if use_s3:
-            self.s3_client = boto3.client("s3")
+            self.s3_client = boto3.client(
+                "s3", config=Config(max_pool_connections=max_workers)
+            )
             self.bucket = os.environ.get("AWS_S3_DATA_BUCKET", "air-pollution-data")
         self.logger = logging.getLogger(__name__)
 
         self.square_side = 20  # km
 
-        self.air_pollution_stations = [
-            "Helsinki Kallio 2",
-            "Espoo Leppävaara Läkkisepänkuja",
-            "Espoo Luukki",
-            "Helsinki Mannerheimintie",
-            "Vantaa Tikkurila Neilikkatie",
-            "Helsinki Vartiokylä Huivipolku",
-            "Vantaa Kehä III Viinikkala",
-            "Helsinki Kustaa Vaasan tie",
-        ]
-
-        self.air_pollution_indicators = [
-            "Nitrogen dioxide",
-            "Particulate matter < 10 µm",
-            "Particulate matter < 2.5 µm",
-        ]
-
-    def fetch_pollution_data(
-        self, data_type="training", chunk_size_hours=24 * 7, week_number=8
-    ):  # noqa: C901
-        """Fetch latest pollution data from APIs (from your notebook logic)"""
-        try:
-            geolocator = Nominatim(user_agent="ny_explorer")
-            location = geolocator.geocode(self.address)
-            latitude_city = location.latitude
-            longitude_city = location.longitude
+        self.registry_file = None
+        if regions is not None:
+            self.registry = (
+                regions
+                if isinstance(regions, StationRegistry)
+                else StationRegistry(regions)
+            )
+        elif address is not None:
+            self.registry = StationRegistry.for_address(address, self.square_side)
+        else:
+            self.registry_file = REGISTRY_FILE
+            self.registry = StationRegistry.load(self.registry_file)
 
-            air_pollution_total = {}
+        default_region = self.registry.regions.get(self.registry.default_region, {})
+        self.address = address or default_region.get("address")
+        print(
+            f"DataIngestion initialized with use_s3={self.use_s3}, address={self.address}"
+        )
 
-            for n in range(week_number):
-                start = dt.datetime.now() - (n + 1) * dt.timedelta(
-                    hours=chunk_size_hours
-                )
-                end = dt.datetime.now() - n * dt.timedelta(hours=chunk_size_hours)
+        self.air_pollution_stations = self.registry.stations()
+        self.air_pollution_indicators = list(AIR_POLLUTION_INDICATORS)
 
-                air_pollution_week = get_air_pollution_data_timeInterval(
+    def fetch_pollution_data(
+        self, data_type="training", chunk_size_hours=24 * 7, week_number=8, end=None
+    ):
+        """Fetch pollution data for every registered region
+
+        One WFS request per region bbox and time chunk covers all stations of
+        the region. Station files and one total file per region are written.
+        The chunks end at *end*, or at the current time when it is None.
+        Returns the total frame of each region.
+        """
+        with span(
+            "ingestion.fetch_pollution_data",
+            data_type=data_type,
+            chunk_size_hours=chunk_size_hours,
+            week_number=week_number,
+        ):
+            region_totals = {}
+            try:
+                station_frames = {}
+                for region in self.registry.region_names():
+                    with span("ingestion.region", region=region):
+                        observations = self._download_region(
+                            region, chunk_size_hours, week_number, end=end
+                        )
+                        with span("ingestion.reshape", region=region):
+                            frames = self._build_station_frames(region, observations)
+                        with span("ingestion.merge", stations=len(frames)):
+                            region_totals[region] = self._merge_station_frames(frames)
+                        station_frames.update(frames)
+
+                self.air_pollution_stations = self.registry.stations()
+
+                # Persist the per-station files concurrently, then the totals once
+                with span("ingestion.write_stations", stations=len(station_frames)):
+                    self._save_station_frames(station_frames, data_type)
+
+            except Exception as e:
+                self.logger.error(f"Failed to fetch data: {e}")
+                raise
+
+            with span("ingestion.write_totals", regions=len(region_totals)):
+                for region, df_air_pollution_total in region_totals.items():
+                    self._save_total_frame(df_air_pollution_total, data_type, region)
+
+            if self.registry_file is not None:
+                self.registry.save(self.registry_file)
+            return region_totals
+
+    def _region_center(self, region):
+        """Return the region centre, geocoding its address on first use"""
+        config = self.registry.regions[region]
+        if config["latitude"] is None or config["longitude"] is None:
+            with span("ingestion.geocode", address=config["address"]):
+                geolocator = Nominatim(user_agent="ny_explorer")
+                location = geolocator.geocode(config["address"])
+            self.registry.set_center(region, location.latitude, location.longitude)
+        return config["latitude"], config["longitude"]
+
+    def _download_region(self, region, chunk_size_hours, week_number, end=None):
+        """Download all time chunks for one region bbox"""
+        latitude_city, longitude_city = self._region_center(region)
+        square_side = self.registry.regions[region]["square_side"]
+
+        air_pollution_total = {}
+        for chunk_start, chunk_end in time_chunks(chunk_size_hours, week_number, end):
+            # Download and multipointcoverage parsing of one time chunk
+            with span(
+                "ingestion.download_chunk",
+                region=region,
+                start=chunk_start.isoformat(),
+                end=chunk_end.isoformat(),
+            ):
+                air_pollution_week, locations = get_air_pollution_data_timeInterval(
                     latitude_city,
                     longitude_city,
-                    square_side=self.square_side,
-                    start=start,
-                    end=end,
+                    square_side=square_side,
+                    start=chunk_start,
+                    end=chunk_end,
                 )
+            self.registry.update_from_metadata(region, locations)
 
-                air_pollution_week = list(air_pollution_week)[0]
+            for key in air_pollution_week.keys():
+                if key not in air_pollution_total.keys():
+                    air_pollution_total[key] = air_pollution_week[key]
+                else:
+                    air_pollution_total[key] = (
+                        air_pollution_total[key] + air_pollution_week[key]
+                    )
 
-                for key in air_pollution_week.keys():
-                    if key not in air_pollution_total.keys():
-                        air_pollution_total[key] = air_pollution_week[key]
-                    else:
-                        air_pollution_total[key] = (
-                            air_pollution_total[key] + air_pollution_week[key]
-                        )
+        return air_pollution_total
 
-            df_air_pollution_total = pd.DataFrame()
-            # Loop through all air pollution stations
-            for station in self.air_pollution_stations:
-                merged_df_list = []
-                timestamp = []
+    def _build_station_frames(self, region, air_pollution_total):
+        """Convert raw observations into one DataFrame per registered station"""
+        station_frames = {}
+        for station in self.registry.stations(region):
+            if station not in air_pollution_total:
+                self.logger.warning(f"No observations for station {station}")
+                continue
 
-                # Process data for the current station
-                for x in air_pollution_total[station]:
-                    df = pd.DataFrame(x.values())
+            merged_df_list = []
+            timestamp = []
 
-                    # Convert nested values to floats
-                    for col in df.columns:
-                        if col != "Timestamp":
-                            df[col] = df[col].apply(lambda x: x["value"])
-                            df[col] = df[col].astype(float)
+            # Process data for the current station
+            for x in air_pollution_total[station]:
+                df = pd.DataFrame(x.values())
 
-                    merged_df_list.append(df)
-                    timestamp.append(list(x.keys())[0])
+                # Convert nested values to floats
+                for col in df.columns:
+                    if col != "Timestamp":
+                        df[col] = df[col].apply(lambda x: x["value"])
+                        df[col] = df[col].astype(float)
 
-                # Combine all data for the current station
-                merged_df = pd.concat(merged_df_list, ignore_index=True)
-                merged_df["Timestamp"] = timestamp
-                merged_df["Timestamp"] = pd.to_datetime(merged_df["Timestamp"])
-                # merged_df["Station"] = station
+                merged_df_list.append(df)
+                timestamp.append(list(x.keys())[0])
 
-                # Select relevant columns
-                merged_df = merged_df[["Timestamp"] + self.air_pollution_indicators]
-                merged_df = merged_df.drop_duplicates(subset=["Timestamp"])
-                merged_df.sort_values(by="Timestamp", inplace=True)
+            # Combine all data for the current station
+            merged_df = pd.concat(merged_df_list, ignore_index=True)
+            merged_df["Timestamp"] = timestamp
+            merged_df["Timestamp"] = pd.to_datetime(merged_df["Timestamp"])
 
-                ###############
-                df_air_pollution = merged_df.copy()
+            # Select relevant columns; discovered stations may not report
+            # every indicator, those are left empty
+            merged_df = merged_df.reindex(
+                columns=["Timestamp"] + self.air_pollution_indicators
+            )
+            merged_df = merged_df.drop_duplicates(subset=["Timestamp"])
+            merged_df.sort_values(by="Timestamp", inplace=True)
 
-                df_air_pollution = df_air_pollution.rename(
-                    columns={
-                        "Particulate matter < 10 µm": f"Particulate matter < 10 µm_{station}",
-                        "Particulate matter < 2.5 µm": f"Particulate matter < 2.5 µm_{station}",
-                        "Nitrogen dioxide": f"Nitrogen dioxide_{station}",
-                    }
-                )
-                if df_air_pollution_total.empty:
-                    df_air_pollution_total = df_air_pollution.copy()
-                else:
-                    df_air_pollution_total = df_air_pollution_total.merge(
-                        df_air_pollution, how="outer", on="Timestamp"
-                    )  # , suffixes=('', f'_{station}'))
+            station_frames[station] = merged_df
 
-                # Save to parquet file with station name in the filename
-                if self.use_s3:
-                    filename = f"training_data/{station.replace(' ', '_')}_air_pollution_data_{data_type}.parquet"
-                    self.upload_to_s3(merged_df, filename)
+        return station_frames
 
-                    print(
-                        f"Saved data for station: {station} to {filename}, length: {len(merged_df)} in s3"
-                    )
-                else:
-                    filename = f"{station.replace(' ', '_')}_air_pollution_data_{data_type}.parquet"
-                    full_path = os.path.join(RAW_DATA_DIR, filename)
+    def _merge_station_frames(self, station_frames):
+        """Outer-join station frames on Timestamp with station-suffixed columns"""
+        df_air_pollution_total = pd.DataFrame()
+        for station, merged_df in station_frames.items():
+            df_air_pollution = merged_df.rename(
+                columns={
+                    indicator: f"{indicator}_{station}"
+                    for indicator in self.air_pollution_indicators
+                }
+            )
+            if df_air_pollution_total.empty:
+                df_air_pollution_total = df_air_pollution.copy()
+            else:
+                df_air_pollution_total = df_air_pollution_total.merge(
+                    df_air_pollution, how="outer", on="Timestamp"
+                )
+        return df_air_pollution_total
 
-                    merged_df.to_parquet(full_path, index=False)
-                    print(
-                        f"Saved data for station: {station} to {filename}, length: {len(merged_df)} in {full_path}"
+    def _save_station_frame(self, station, df, data_type):
+        """Save a single station DataFrame locally or to S3"""
+        filename = f"{station.replace(' ', '_')}_air_pollution_data_{data_type}.parquet"
+        if self.use_s3:
+            key = f"training_data/{filename}"
+            self.upload_to_s3(df, key)
+            print(
+                f"Saved data for station: {station} to {key}, length: {len(df)} in s3"
+            )
+            return key
+
+        full_path = os.path.join(RAW_DATA_DIR, filename)
+        df.to_parquet(full_path, index=False)
+        print(
+            f"Saved data for station: {station} to {filename}, length: {len(df)} in {full_path}"
+        )
+        return full_path
+
+    def _save_station_frames(self, station_frames, data_type):
+        """Save all station DataFrames in parallel, sharing one S3 client"""
+        if not station_frames:
+            return []
+
+        saved = []
+        max_workers = min(self.max_workers, len(station_frames))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._save_station_frame, station, df, data_type
+                ): station
+                for station, df in station_frames.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    saved.append(future.result())
+                except Exception as e:
+                    self.logger.error(
+                        f"Failed to save data for station {futures[future]}: {e}"
                     )
+                    raise
+        return saved
 
-        except Exception as e:
-            self.logger.error(f"Failed to fetch data: {e}")
-            raise
+    def _save_total_frame(self, df_air_pollution_total, data_type, region=None):
+        """Save the merged DataFrame of all stations of a region"""
+        # The default region keeps the unsuffixed name read by DataLoader
+        if region == self.registry.default_region:
+            region = None
+        filename = total_dataset_filename(data_type, region)
 
-        # Save to parquet file with station name in the filename
         if self.use_s3:
-            filename = f"{data_type}_data/air_pollution_data_{data_type}_total.parquet"
+            filename = f"{data_type}_data/{filename}"
             self.upload_to_s3(df_air_pollution_total, filename)
-            print(f"Saved total data: to {filename}, length: {len(merged_df)} in s3")
+            print(
+                f"Saved total data: to {filename}, length: {len(df_air_pollution_total)} in s3"
+            )
 
         else:
-            filename = f"air_pollution_data_{data_type}_total.parquet"
             full_path = os.path.join(INTERIM_DATA_DIR, filename)
 
-            df_air_pollution_total.to_parquet(full_path, index=False)
+            # Flows may read the previous file while this one is written
+            tmp_path = f"{full_path}.tmp"
+            df_air_pollution_total.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, full_path)
             print(
-                f"Saved total data: to {filename}, length: {len(merged_df)} in {full_path}"
+                f"Saved total data: to {filename}, length: {len(df_air_pollution_total)} in {full_path}"
             )
 
+    def _get_s3_client(self):
+        """Return the S3 client shared by all uploads of this instance"""
+        with self._s3_client_lock:
+            if getattr(self, "s3_client", None) is None:
+                self.s3_client = boto3.client(
+                    "s3", config=Config(max_pool_connections=self.max_workers)
+                )
+        return self.s3_client
+
     def upload_to_s3(self, df, key):
         """Upload DataFrame to S3 as parquet file"""
         try:
-            s3_client = boto3.client("s3")
+            s3_client = self._get_s3_client()
 
             bucket = os.environ.get("AWS_S3_BUCKET_NAME", "air-pollution-models")
             bucket = bucket.replace("s3://", "").strip()
 
-            # print(credentials.access_key, credentials.secret_key, credentials.token)
-            # print(f"Uploading data to s3://{bucket}/{key}")
             # Convert DataFrame to parquet in memory
             buffer = io.BytesIO()
             df.to_parquet(buffer, index=False)
             buffer.seek(0)
 
-            s3_client.put_object(
-                Bucket=bucket,
-                Key=key,
-                Body=buffer.getvalue(),
-                ContentType="application/octet-stream",
+            # upload_fileobj switches to multipart above the threshold
+            s3_client.upload_fileobj(
+                buffer,
+                bucket,
+                key,
+                ExtraArgs={"ContentType": "application/octet-stream"},
+                Config=self.transfer_config,
             )
 
             self.logger.info(f"Uploaded data to s3://{bucket}/{key}")
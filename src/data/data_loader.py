@@ -1,14 +1,71 @@
+import hashlib
 import logging
 import os
 import tempfile
 
 import boto3
 import pandas as pd
+import pyarrow.parquet as pq
 from botocore.exceptions import ClientError
 
 from src.config import INTERIM_DATA_DIR
 
 
+def total_dataset_filename(data_type, region=None):
+    """Filename of the merged all-station dataset, partitioned by region"""
+    if region is None:
+        return f"air_pollution_data_{data_type}_total.parquet"
+    return f"air_pollution_data_{data_type}_total_{region}.parquet"
+
+
+_file_digests = {}
+
+
+def file_digest(path):
+    """sha256 of a file, recomputed only when its size or mtime changes
+
+    Returns None when the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _file_digests.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    digest = sha256.hexdigest()
+    _file_digests[path] = (signature, digest)
+    return digest
+
+
+class ParquetChunks:
+    """Frames of at most *chunk_rows* rows of a Parquet file, in file order
+
+    Every iteration reads the file again, one row batch at a time, so the
+    dataset can be passed over several times without holding it in memory.
+    """
+
+    def __init__(self, path, chunk_rows):
+        self.path = path
+        self.chunk_rows = chunk_rows
+
+    @property
+    def rows(self):
+        """Row count, from the file footer"""
+        return pq.ParquetFile(self.path).metadata.num_rows
+
+    def __iter__(self):
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=self.chunk_rows):
+            df = batch.to_pandas()
+            df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+            yield df
+
+
 class DataLoader:
     def __init__(self, use_s3=False):
         self.use_s3 = use_s3
@@ -83,6 +140,28 @@ class DataLoader:
             self.logger.error(f"❌ Failed to load data from S3: {e}")
             raise
 
+    def dataset_location(self, data_type, region=None):
+        """Local path, or S3 key, of a total dataset"""
+        filename = total_dataset_filename(data_type, region)
+        if self.use_s3:
+            return f"{data_type}_data/{filename}"
+        return os.path.join(INTERIM_DATA_DIR, filename)
+
+    def dataset_digest(self, data_type, region=None):
+        """Content digest of a total dataset, without loading it
+
+        Local files are hashed, S3 objects are identified by their ETag.
+        Returns None when the dataset does not exist.
+        """
+        location = self.dataset_location(data_type, region)
+        if not self.use_s3:
+            return file_digest(location)
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket, Key=location)
+        except ClientError:
+            return None
+        return head["ETag"].strip('"')
+
     def load_time_range(self, start_time, end_time):
         """Load data for specific time range"""
         try:
@@ -105,15 +184,14 @@ class DataLoader:
             self.logger.error(f"Failed to load time range data: {e}")
             raise
 
-    def load_train_dataset(self):
+    def load_train_dataset(self, region=None):
         """Load the training dataset"""
         try:
+            filename = total_dataset_filename("training", region)
             if self.use_s3:
-                df = self.load_from_s3(
-                    "training_data/air_pollution_data_training_total.parquet"
-                )
+                df = self.load_from_s3(f"training_data/{filename}")
             else:
-                df = self.load_from_local("air_pollution_data_training_total.parquet")
+                df = self.load_from_local(filename)
 
             df["Timestamp"] = pd.to_datetime(df["Timestamp"])
             self.logger.info(f"Loaded full dataset with {len(df)} records")
@@ -122,15 +200,14 @@ class DataLoader:
             self.logger.error(f"Failed to load full dataset: {e}")
             raise
 
-    def load_predicting_dataset(self):
+    def load_predicting_dataset(self, region=None):
         """Load the predicting dataset"""
         try:
+            filename = total_dataset_filename("predicting", region)
             if self.use_s3:
-                df = self.load_from_s3(
-                    "predicting_data/air_pollution_data_predicting_total.parquet"
-                )
+                df = self.load_from_s3(f"predicting_data/{filename}")
             else:
-                df = self.load_from_local("air_pollution_data_predicting_total.parquet")
+                df = self.load_from_local(filename)
 
             df["Timestamp"] = pd.to_datetime(df["Timestamp"])
             self.logger.info(f"Loaded predicting dataset with {len(df)} records")
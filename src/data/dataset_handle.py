@@ -0,0 +1,198 @@
+"""
+Handles to datasets shared by the tasks of a flow run
+
+A DatasetHandle names one version of a total dataset by its content
+digest. The first load() materializes the frame into a small process-wide
+registry, and tasks given the same handle share that frame instead of
+reloading the file (or, on S3, downloading it again). A frame evicted from
+the registry is read back from local disk, memory mapped: the dataset file
+itself, or for S3 a copy spilled to DATASET_SPILL_DIR. chunks() streams
+the same file in row batches for datasets too large to load. Handles are
+small and pickle without their frame.
+"""
+
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from src.config import INTERIM_DATA_DIR
+from src.data.data_loader import DataLoader, ParquetChunks, file_digest
+
+SPILL_DIR = Path(os.getenv("DATASET_SPILL_DIR", INTERIM_DATA_DIR / "spill"))
+MAX_FRAMES = int(os.getenv("DATASET_CACHE_FRAMES", "4"))
+
+logger = logging.getLogger(__name__)
+
+_frames = OrderedDict()
+_key_locks = {}
+_lock = threading.Lock()
+# Handles in use, whose spilled versions must survive pruning
+_live_handles = weakref.WeakValueDictionary()
+
+
+def _remember(key, frame):
+    with _lock:
+        _frames[key] = frame
+        _frames.move_to_end(key)
+        while len(_frames) > MAX_FRAMES:
+            evicted, _ = _frames.popitem(last=False)
+            _key_locks.pop(evicted, None)
+
+
+def _lookup(key):
+    with _lock:
+        frame = _frames.get(key)
+        if frame is not None:
+            _frames.move_to_end(key)
+        return frame
+
+
+def clear_datasets():
+    """Drop all materialized frames"""
+    with _lock:
+        _frames.clear()
+        _key_locks.clear()
+
+
+class DatasetHandle:
+    """One version of a total dataset, identified by its content digest"""
+
+    def __init__(self, data_type, digest, location, use_s3=False):
+        self.data_type = data_type
+        self.digest = digest
+        self.location = location
+        self.use_s3 = use_s3
+        _live_handles[id(self)] = self
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _live_handles[id(self)] = self
+
+    @property
+    def key(self):
+        return (self.data_type, self.digest)
+
+    def __repr__(self):
+        # Stable across processes, so it can take part in task cache keys
+        return f"DatasetHandle({self.data_type!r}, {self.digest!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, DatasetHandle) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def load(self):
+        """The dataset as a DataFrame, shared by every holder of the handle
+
+        The frame is shared, so treat it as read-only.
+        """
+        with _lock:
+            key_lock = _key_locks.setdefault(self.key, threading.Lock())
+        # Concurrent tasks loading the same handle wait for one read
+        with key_lock:
+            frame = _lookup(self.key)
+            if frame is None:
+                frame = self._read()
+                _remember(self.key, frame)
+        return frame
+
+    def chunks(self, chunk_rows):
+        """The dataset as ParquetChunks, read from disk and never held whole"""
+        return ParquetChunks(self._local_path(), chunk_rows)
+
+    def _local_path(self):
+        if self.use_s3:
+            path = self._spill_path()
+            if not path.exists():
+                self._download(path)
+            return path
+        if file_digest(self.location) != self.digest:
+            raise ValueError(
+                f"{self.location} changed since it was opened, open the dataset again"
+            )
+        return self.location
+
+    def _read(self):
+        path = self._local_path()
+        logger.info(f"Reading {self.data_type} dataset from {path}")
+        df = pd.read_parquet(path, memory_map=True)
+        df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+        return df
+
+    def _spill_path(self):
+        return SPILL_DIR / f"{self.data_type}_{self.digest}.parquet"
+
+    def _download(self, path):
+        loader = DataLoader(use_s3=True)
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        try:
+            # Only the version this handle was opened on, never a newer one
+            loader.s3_client.download_file(
+                loader.bucket,
+                self.location,
+                tmp_path,
+                ExtraArgs={"IfMatch": f'"{self.digest}"'},
+            )
+        except ClientError as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if e.response["Error"]["Code"] in ("PreconditionFailed", "412"):
+                raise ValueError(
+                    f"s3://{loader.bucket}/{self.location} changed since it was "
+                    "opened, open the dataset again"
+                ) from e
+            raise
+        os.replace(tmp_path, path)
+        self._prune_spill()
+
+    def _spill(self, frame):
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        path = self._spill_path()
+        tmp_path = f"{path}.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self._prune_spill()
+
+    def _prune_spill(self):
+        """Drop spilled versions of this dataset that no live handle uses"""
+        keep = {self._spill_path()}
+        keep.update(handle._spill_path() for handle in list(_live_handles.values()))
+        for path in SPILL_DIR.glob(f"{self.data_type}_*.parquet"):
+            if path not in keep:
+                path.unlink(missing_ok=True)
+
+
+def open_dataset(data_type, use_s3=False, region=None):
+    """Handle to the current version of a total dataset, None if missing"""
+    loader = DataLoader(use_s3=use_s3)
+    digest = loader.dataset_digest(data_type, region)
+    if digest is None:
+        return None
+    return DatasetHandle(
+        data_type, digest, loader.dataset_location(data_type, region), use_s3
+    )
+
+
+def register_dataset(df, data_type, use_s3=False, region=None):
+    """Handle to a dataset that was just written from *df*
+
+    The frame is kept so that no task has to read the file back.
+    """
+    handle = open_dataset(data_type, use_s3=use_s3, region=region)
+    if handle is None:
+        return None
+    # Match what reading the written file back would return
+    frame = df.reset_index(drop=True)
+    frame["Timestamp"] = pd.to_datetime(frame["Timestamp"])
+    if use_s3:
+        handle._spill(frame)
+    _remember(handle.key, frame)
+    return handle
@@ -0,0 +1,202 @@
+"""
+Partitioned Parquet archive of predictions
+
+Every prediction run is appended as one small Parquet file with a row per
+target hour, station and pollutant, under a run_date=YYYY-MM-DD
+partition. compact() merges the files of each finished day into one, so
+a month of forecasts is about thirty files to scan. The archive lives in
+data/processed/prediction_archive, or with use_s3 under
+s3://<S3_BUCKET>/predictions/archive (needs s3fs), next to the JSON
+predictions written before the archive existed.
+"""
+
+import os
+import uuid
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.config import PROCESSED_DATA_DIR
+
+PREDICTION_ARCHIVE_DIR = os.getenv(
+    "PREDICTION_ARCHIVE_DIR", str(PROCESSED_DATA_DIR / "prediction_archive")
+)
+SCHEMA = pa.schema(
+    [
+        ("run_time", pa.timestamp("ns")),
+        ("target_time", pa.timestamp("ns")),
+        ("horizon", pa.int16()),
+        ("station", pa.string()),
+        ("pollutant", pa.string()),
+        ("value", pa.float64()),
+        ("model_version", pa.string()),
+    ]
+)
+ARCHIVE_COLUMNS = SCHEMA.names
+PARTITIONING = ds.partitioning(pa.schema([("run_date", pa.string())]), flavor="hive")
+
+
+def short_pollutant(name):
+    """Pollutant name as used in prediction keys, e.g. PM10"""
+    return name.replace("Particulate matter < ", "PM").replace(" µm", "")
+
+
+def split_key(key):
+    """(pollutant, station) of a prediction key or dataset column"""
+    pollutant, _, station = key.partition("_")
+    return short_pollutant(pollutant), station
+
+
+def _naive_utc(values):
+    timestamps = pd.to_datetime(pd.Series(values))
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    return timestamps.astype("datetime64[ns]")
+
+
+def prediction_frame(prediction, model_version=None):
+    """Long frame of the output of PollutionPredictor.predict()"""
+    rows = []
+    for key, hours in prediction.get("predictions", {}).items():
+        pollutant, station = split_key(key)
+        for hour, forecast in hours.items():
+            rows.append(
+                (
+                    forecast["timestamp"],
+                    int(hour.rsplit("_", 1)[-1]),
+                    station,
+                    pollutant,
+                    float(forecast["value"]),
+                )
+            )
+    frame = pd.DataFrame(rows, columns=ARCHIVE_COLUMNS[1:-1])
+    frame.insert(
+        0, "run_time", _naive_utc([prediction.get("prediction_timestamp")] * len(frame))
+    )
+    frame["target_time"] = _naive_utc(frame["target_time"])
+    frame["horizon"] = frame["horizon"].astype("int16")
+    frame["model_version"] = None if model_version is None else str(model_version)
+    return frame
+
+
+class PredictionArchive:
+    """Append-only prediction archive with daily compaction"""
+
+    def __init__(self, use_s3=False, root=None):
+        if use_s3:
+            self.fs = fsspec.filesystem("s3")
+            # The bucket predictions were always saved to, not the data bucket
+            bucket = os.environ.get("S3_BUCKET", "air-pollution-models")
+            bucket = bucket.replace("s3://", "").strip()
+            self.root = root or f"{bucket}/predictions/archive"
+        else:
+            self.fs = fsspec.filesystem("file")
+            self.root = str(root or PREDICTION_ARCHIVE_DIR)
+
+    def _partition(self, run_date):
+        return f"{self.root}/run_date={run_date}"
+
+    def _write(self, frame, path):
+        table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+        self.fs.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.fs.open(path, "wb") as f:
+            pq.write_table(table, f, compression="zstd")
+
+    def append(self, prediction, model_version=None):
+        """Add one run, a predict() result or a prediction_frame()
+
+        Returns the paths written, one per run date.
+        """
+        if isinstance(prediction, pd.DataFrame):
+            frame = prediction
+        else:
+            frame = prediction_frame(prediction, model_version)
+        paths = []
+        if frame.empty:
+            return paths
+        run_dates = frame["run_time"].dt.strftime("%Y-%m-%d")
+        for run_date, part in frame.groupby(run_dates):
+            run_time = part["run_time"].min().strftime("%Y%m%dT%H%M%S")
+            path = (
+                f"{self._partition(run_date)}/"
+                f"part-{run_time}-{uuid.uuid4().hex[:8]}.parquet"
+            )
+            self._write(part[ARCHIVE_COLUMNS], path)
+            paths.append(path)
+        return paths
+
+    def partitions(self):
+        """Run dates present in the archive, oldest first"""
+        if not self.fs.exists(self.root):
+            return []
+        names = [
+            os.path.basename(path.rstrip("/"))
+            for path in self.fs.ls(self.root, detail=False)
+        ]
+        return sorted(
+            name.split("=", 1)[1] for name in names if name.startswith("run_date=")
+        )
+
+    def _files(self, run_date):
+        return sorted(self.fs.glob(f"{self._partition(run_date)}/*.parquet"))
+
+    def compact(self, before=None):
+        """Merge the files of each run date before *before* (default today)
+
+        Returns the number of files that were merged away.
+        """
+        before = pd.Timestamp(before or pd.Timestamp.now(tz="UTC").date()).strftime(
+            "%Y-%m-%d"
+        )
+        merged = 0
+        for run_date in self.partitions():
+            files = self._files(run_date)
+            if run_date >= before or len(files) < 2:
+                continue
+            frame = pd.concat(
+                [pq.read_table(path, filesystem=self.fs).to_pandas() for path in files],
+                ignore_index=True,
+            ).sort_values(["run_time", "target_time", "station", "pollutant"])
+            # Written under an ignored name first so readers never see a
+            # half-written file
+            name = f"compacted-{uuid.uuid4().hex[:8]}.parquet"
+            staging = f"{self._partition(run_date)}/_{name}"
+            self._write(frame, staging)
+            self.fs.mv(staging, f"{self._partition(run_date)}/{name}")
+            self.fs.rm(files)
+            merged += len(files) - 1
+        return merged
+
+    def read(self, start=None, end=None, columns=None):
+        """Archived predictions with run_time between *start* and *end*"""
+        if not self.fs.exists(self.root):
+            return pd.DataFrame(columns=columns or ARCHIVE_COLUMNS)
+        dataset = ds.dataset(
+            self.root,
+            filesystem=self.fs,
+            format="parquet",
+            partitioning=PARTITIONING,
+        )
+        # The run_date clauses prune whole partitions before files are opened
+        condition = ds.scalar(True)
+        if start is not None:
+            start = _naive_utc([start]).iloc[0]
+            condition &= (ds.field("run_date") >= start.strftime("%Y-%m-%d")) & (
+                ds.field("run_time") >= pa.scalar(start, pa.timestamp("ns"))
+            )
+        if end is not None:
+            end = _naive_utc([end]).iloc[0]
+            condition &= (ds.field("run_date") <= end.strftime("%Y-%m-%d")) & (
+                ds.field("run_time") <= pa.scalar(end, pa.timestamp("ns"))
+            )
+        table = dataset.to_table(columns=columns or ARCHIVE_COLUMNS, filter=condition)
+        return (
+            table.to_pandas()
+            .sort_values(
+                [c for c in ("run_time", "target_time") if c in table.column_names]
+            )
+            .reset_index(drop=True)
+        )
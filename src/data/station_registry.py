@@ -0,0 +1,251 @@
+"""
+Registry of air quality stations grouped by region
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from scripts.spatial_index import StationIndex
+from src.config import INTERIM_DATA_DIR
+
+AIR_POLLUTION_INDICATORS = [
+    "Nitrogen dioxide",
+    "Particulate matter < 10 µm",
+    "Particulate matter < 2.5 µm",
+]
+
+DEFAULT_REGION = "helsinki"
+
+# Regions ingested when no registry is configured. A region without an
+# explicit station list registers every station found inside its bbox.
+DEFAULT_REGIONS = {
+    DEFAULT_REGION: {
+        "address": "Helsinki",
+        "square_side": 20,
+        "stations": {
+            "Helsinki Kallio 2": {"latitude": 60.1878, "longitude": 24.9508},
+            "Espoo Leppävaara Läkkisepänkuja": {
+                "latitude": 60.2191,
+                "longitude": 24.8130,
+            },
+            "Espoo Luukki": {"latitude": 60.1625, "longitude": 24.6683},
+            "Helsinki Mannerheimintie": {"latitude": 60.1699, "longitude": 24.9384},
+            "Vantaa Tikkurila Neilikkatie": {
+                "latitude": 60.2925,
+                "longitude": 25.0442,
+            },
+            "Helsinki Vartiokylä Huivipolku": {
+                "latitude": 60.2243,
+                "longitude": 25.1040,
+            },
+            "Vantaa Kehä III Viinikkala": {"latitude": 60.2708, "longitude": 24.8875},
+            "Helsinki Kustaa Vaasan tie": {"latitude": 60.1985, "longitude": 24.9675},
+        },
+    }
+}
+
+REGISTRY_FILE = os.getenv(
+    "STATION_REGISTRY_FILE", os.path.join(INTERIM_DATA_DIR, "station_registry.json")
+)
+
+
+def region_bbox(latitude, longitude, square_side):
+    """Return (lon_min, lat_min, lon_max, lat_max) of a square around a point"""
+    lat_delta = square_side / 111
+    lon_delta = square_side / (111 * np.cos(latitude * np.pi / 180))
+    return (
+        longitude - lon_delta,
+        latitude - lat_delta,
+        longitude + lon_delta,
+        latitude + lat_delta,
+    )
+
+
+def region_name(address):
+    """Derive a region key from a geocodable address"""
+    return address.strip().lower().replace(" ", "_")
+
+
+class StationRegistry:
+    def __init__(self, regions=None):
+        self.logger = logging.getLogger(__name__)
+        self.regions = {}
+        self._index = None
+
+        for name, config in (DEFAULT_REGIONS if regions is None else regions).items():
+            self.add_region(name, **config)
+
+    @classmethod
+    def for_address(cls, address, square_side=20):
+        """Registry with a single region centred on *address*"""
+        if region_name(address) == DEFAULT_REGION:
+            return cls()
+        return cls(
+            {region_name(address): {"address": address, "square_side": square_side}}
+        )
+
+    @classmethod
+    def load(cls, path=REGISTRY_FILE):
+        """Load a registry saved by save(), falling back to the defaults"""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                regions = json.load(f)
+        except ValueError as e:
+            logging.getLogger(__name__).warning(
+                f"Unreadable station registry {path}, using defaults: {e}"
+            )
+            return cls()
+        return cls(regions)
+
+    def save(self, path=REGISTRY_FILE):
+        """Persist the registry, including discovered stations, as JSON"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Readers, e.g. the stations endpoint, never see a partial file
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False
+        ) as f:
+            try:
+                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+    def to_dict(self):
+        return {
+            name: {
+                "address": region["address"],
+                "latitude": region["latitude"],
+                "longitude": region["longitude"],
+                "square_side": region["square_side"],
+                "discover": region["discover"],
+                "stations": {
+                    station: dict(metadata)
+                    for station, metadata in region["stations"].items()
+                },
+            }
+            for name, region in self.regions.items()
+        }
+
+    def add_region(
+        self,
+        name,
+        address=None,
+        latitude=None,
+        longitude=None,
+        square_side=20,
+        stations=None,
+        discover=None,
+    ):
+        """Register a region by address or centre coordinates"""
+        if address is None and (latitude is None or longitude is None):
+            raise ValueError(f"Region {name} needs an address or lat/lon centre")
+
+        if isinstance(stations, (list, tuple)):
+            stations = {station: {} for station in stations}
+        stations = dict(stations or {})
+
+        self._index = None
+        self.regions[name] = {
+            "address": address,
+            "latitude": latitude,
+            "longitude": longitude,
+            "square_side": square_side,
+            # Without a fixed station list every station in the bbox is used
+            "discover": not stations if discover is None else discover,
+            "stations": stations,
+        }
+
+    @property
+    def default_region(self):
+        return next(iter(self.regions), None)
+
+    def region_names(self):
+        return list(self.regions)
+
+    def set_center(self, region, latitude, longitude):
+        self.regions[region]["latitude"] = latitude
+        self.regions[region]["longitude"] = longitude
+
+    def bbox(self, region):
+        config = self.regions[region]
+        if config["latitude"] is None or config["longitude"] is None:
+            raise ValueError(f"Region {region} has no resolved centre")
+        return region_bbox(
+            config["latitude"], config["longitude"], config["square_side"]
+        )
+
+    def update_from_metadata(self, region, location_metadata):
+        """Merge MultiPoint.location_metadata into the stations of *region*
+
+        Returns the names of the stations registered for the region.
+        """
+        config = self.regions[region]
+        in_bbox = StationIndex(location_metadata).within_bbox(*self.bbox(region))
+
+        for name in in_bbox:
+            metadata = location_metadata[name]
+            if name in config["stations"] or config["discover"]:
+                config["stations"].setdefault(name, {}).update(metadata)
+                self._index = None
+
+        return self.stations(region)
+
+    def stations(self, region=None):
+        """Station names of one region, or of all regions in order"""
+        regions = self.regions if region is None else [region]
+        names = {}
+        for name in regions:
+            names.update(dict.fromkeys(self.regions[name]["stations"]))
+        return list(names)
+
+    def station_metadata(self, region=None):
+        """Station name -> metadata including the owning region"""
+        regions = self.regions if region is None else [region]
+        return {
+            station: dict(metadata, region=name)
+            for name in regions
+            for station, metadata in self.regions[name]["stations"].items()
+        }
+
+    def coordinates(self, region=None):
+        """Station coordinates in the {"lat", "lon"} form used by the dashboard"""
+        return {
+            station: {"lat": metadata["latitude"], "lon": metadata["longitude"]}
+            for station, metadata in self.station_metadata(region).items()
+            if "latitude" in metadata and "longitude" in metadata
+        }
+
+    @property
+    def index(self):
+        """Spatial index over all stations with known coordinates"""
+        if self._index is None:
+            self._index = StationIndex(
+                {
+                    station: metadata
+                    for station, metadata in self.station_metadata().items()
+                    if "latitude" in metadata and "longitude" in metadata
+                }
+            )
+        return self._index
+
+    def nearest(self, latitude, longitude, k=5, max_distance_km=None):
+        """Nearest registered stations to a point, closest first"""
+        return [
+            dict(self.index.metadata[station], name=station, distance_km=distance)
+            for station, distance in self.index.nearest(
+                latitude, longitude, k=k, max_distance_km=max_distance_km
+            )
+        ]
+
+    def within_bbox(self, lon_min, lat_min, lon_max, lat_max):
+        """Registered stations inside a bounding box"""
+        return self.index.within_bbox(lon_min, lat_min, lon_max, lat_max)
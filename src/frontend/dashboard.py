@@ -16,17 +16,8 @@ class AirPollutionDashboard:
 
         self.api_base_url = os.getenv("API_BASE_URL", "http://localhost:8000/api/v1")
 
-        # Station coordinates from your data collection
-        self.station_coordinates = {
-            "Helsinki Kallio 2": {"lat": 60.1878, "lon": 24.9508},
-            "Espoo Leppävaara Läkkisepänkuja": {"lat": 60.2191, "lon": 24.8130},
-            "Espoo Luukki": {"lat": 60.1625, "lon": 24.6683},
-            "Helsinki Mannerheimintie": {"lat": 60.1699, "lon": 24.9384},
-            "Vantaa Tikkurila Neilikkatie": {"lat": 60.2925, "lon": 25.0442},
-            "Helsinki Vartiokylä Huivipolku": {"lat": 60.2243, "lon": 25.1040},
-            "Vantaa Kehä III Viinikkala": {"lat": 60.2708, "lon": 24.8875},
-            "Helsinki Kustaa Vaasan tie": {"lat": 60.1985, "lon": 24.9675},
-        }
+        # Station coordinates from the API station registry
+        self.station_coordinates = self.get_station_coordinates()
 
     def check_api_health(self):
         """Check if API is running"""
@@ -37,6 +28,34 @@ class AirPollutionDashboard:
             st.write(f"🔍 DEBUG: API connection error: {e}")
             return False
 
+    def get_station_coordinates(self):
+        """Get coordinates of all registered stations"""
+        try:
+            response = requests.get(f"{self.api_base_url}/stations", timeout=5)
+            if response.status_code == 200:
+                return {
+                    station: {"lat": meta["latitude"], "lon": meta["longitude"]}
+                    for station, meta in response.json()["stations"].items()
+                    if "latitude" in meta and "longitude" in meta
+                }
+        except Exception as e:
+            st.write(f"🔍 DEBUG: Station registry error: {e}")
+        return {}
+
+    def get_nearest_stations(self, latitude, longitude, k=3):
+        """Get the registered stations closest to a point"""
+        try:
+            response = requests.get(
+                f"{self.api_base_url}/stations/nearest",
+                params={"lat": latitude, "lon": longitude, "k": k},
+                timeout=5,
+            )
+            if response.status_code == 200:
+                return response.json()["stations"]
+        except Exception as e:
+            st.write(f"🔍 DEBUG: Nearest stations error: {e}")
+        return []
+
     def get_model_info(self):
         """Get current model information"""
         try:
@@ -573,6 +592,25 @@ class AirPollutionDashboard:
             ) / len(station_data)
             st.metric("Avg PM10", f"{avg_pm10:.1f} μg/m³")
 
+        # Nearest stations lookup
+        st.subheader("📌 Nearest Stations")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            latitude = st.number_input("Latitude", value=60.1699, format="%.4f")
+        with col2:
+            longitude = st.number_input("Longitude", value=24.9384, format="%.4f")
+        with col3:
+            k = st.slider("Number of stations", min_value=1, max_value=10, value=3)
+
+        nearest = self.get_nearest_stations(latitude, longitude, k=k)
+        if nearest:
+            st.dataframe(
+                pd.DataFrame(nearest)[["name", "distance_km", "latitude", "longitude"]],
+                use_container_width=True,
+            )
+        else:
+            st.info("No stations found near this location")
+
     # PREDICTION PLOTTING FUNCTIONS
     def plot_predictions(self, predictions_data):  # noqa: C901
         """Create prediction plots with historical context"""
@@ -0,0 +1,202 @@
+"""
+Memory-mapped store of windowed training matrices
+
+The windowed matrices X (training_hours x features + 4 temporal columns)
+and y (n_steps x features) are far larger than the hourly frame they come
+from. FeatureStore writes them once, chunk by chunk, into .npy files under
+FEATURE_STORE_DIR, keyed by the dataset digest and the window
+configuration. Later retrains and hyper-parameter trials on the same
+dataset open them memory mapped instead of rebuilding them. Entries are
+stored in the predictor's precision unless FEATURE_STORE_DTYPE overrides
+it; only the FEATURE_STORE_ENTRIES most recently used entries are kept. Training
+tasks use the store when FEATURE_STORE_ENABLED is set.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.config import INTERIM_DATA_DIR
+
+FEATURE_STORE_DIR = Path(
+    os.getenv("FEATURE_STORE_DIR", INTERIM_DATA_DIR / "feature_store")
+)
+MAX_ENTRIES = int(os.getenv("FEATURE_STORE_ENTRIES", "4"))
+FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE_ENABLED", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+FEATURE_STORE_DTYPE = os.getenv("FEATURE_STORE_DTYPE")
+CHUNK_ROWS = 4096
+
+logger = logging.getLogger(__name__)
+
+
+def window_count(rows, training_hours, n_steps):
+    return max(rows - training_hours - n_steps + 1, 0)
+
+
+def write_windows(target, additional, training_hours, n_steps, X, y):
+    """Fill X and y with the sliding windows of *target*, CHUNK_ROWS at a time
+
+    Row i of X is target[i : i + training_hours] flattened followed by
+    additional[i + training_hours]; row i of y is the n_steps target rows
+    after that window.
+    """
+    n_samples = len(X)
+    if n_samples == 0:
+        raise ValueError(
+            f"Not enough data: {len(target)} rows, windows need "
+            f"{training_hours + n_steps}"
+        )
+    n_features = target.shape[1]
+    history = sliding_window_view(target, (training_hours, n_features))[:, 0]
+    horizon = sliding_window_view(target, (n_steps, n_features))[:, 0]
+    split = training_hours * n_features
+    for start in range(0, n_samples, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, n_samples)
+        X[start:stop, :split] = history[start:stop].reshape(stop - start, -1)
+        X[start:stop, split:] = additional[
+            start + training_hours : stop + training_hours
+        ]
+        y[start:stop] = horizon[start + training_hours : stop + training_hours].reshape(
+            stop - start, -1
+        )
+    return X, y
+
+
+def frame_digest(df):
+    """Content digest of a DataFrame, for frames without a dataset digest"""
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha256(hashed.tobytes())
+    digest.update(json.dumps(list(map(str, df.columns))).encode())
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """Windowed X and y matrices on disk, one entry per dataset and window"""
+
+    def __init__(self, root=None, dtype=None, max_entries=None):
+        self.root = Path(root or FEATURE_STORE_DIR)
+        dtype = dtype or FEATURE_STORE_DTYPE
+        self.dtype = np.dtype(dtype) if dtype else None
+        self.max_entries = max_entries or MAX_ENTRIES
+
+    def key(self, digest, training_hours, n_steps, features, dtype):
+        config = {
+            "digest": digest,
+            "training_hours": training_hours,
+            "n_steps": n_steps,
+            "features": list(features),
+            "dtype": dtype.name,
+        }
+        return hashlib.sha256(json.dumps(config).encode()).hexdigest()[:32]
+
+    def matrices(self, predictor, df, digest=None):
+        """Memory-mapped (X, y) for *predictor*'s window config on *df*
+
+        *digest* identifies the dataset version, e.g. a DatasetHandle
+        digest; without it the frame contents are hashed.
+        """
+        df_features = predictor.create_features(df)
+        features = predictor.features_pollution + predictor.features_additional
+        dtype = self.dtype or predictor.dtype
+        key = self.key(
+            digest or frame_digest(df),
+            predictor.training_hours,
+            predictor.n_steps,
+            features,
+            dtype,
+        )
+        path = self.root / key
+        if not (path / "meta.json").exists():
+            logger.info(f"Building feature matrices {key}")
+            self._build(path, df_features, predictor, dtype)
+        else:
+            logger.info(f"Reusing feature matrices {key}")
+            os.utime(path / "meta.json")
+        self._prune(keep=path)
+        return (
+            np.load(path / "X.npy", mmap_mode="r"),
+            np.load(path / "y.npy", mmap_mode="r"),
+        )
+
+    def _build(self, path, df_features, predictor, dtype):
+        target = df_features[predictor.features_pollution].to_numpy(dtype)
+        additional = df_features[predictor.features_additional].to_numpy(dtype)
+        n_samples = window_count(
+            len(target), predictor.training_hours, predictor.n_steps
+        )
+        n_features = target.shape[1]
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Built in a sibling directory and renamed, so readers never open
+        # a half-written entry
+        staging = Path(tempfile.mkdtemp(prefix=".build-", dir=self.root))
+        try:
+            X = np.lib.format.open_memmap(
+                staging / "X.npy",
+                mode="w+",
+                dtype=dtype,
+                shape=(
+                    n_samples,
+                    predictor.training_hours * n_features + additional.shape[1],
+                ),
+            )
+            y = np.lib.format.open_memmap(
+                staging / "y.npy",
+                mode="w+",
+                dtype=dtype,
+                shape=(n_samples, predictor.n_steps * n_features),
+            )
+            write_windows(
+                target, additional, predictor.training_hours, predictor.n_steps, X, y
+            )
+            X.flush()
+            y.flush()
+            del X, y
+            with open(staging / "meta.json", "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "samples": n_samples,
+                        "features_pollution": predictor.features_pollution,
+                        "dtype": dtype.name,
+                    },
+                    f,
+                )
+            try:
+                os.replace(staging, path)
+            except OSError:
+                # Another process built the same entry first
+                shutil.rmtree(staging, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def _prune(self, keep):
+        entries = sorted(
+            (
+                entry
+                for entry in self.root.iterdir()
+                if not entry.name.startswith(".")
+                and (entry / "meta.json").exists()
+                and entry != keep
+            ),
+            key=lambda entry: (entry / "meta.json").stat().st_mtime,
+            reverse=True,
+        )
+        for entry in entries[max(self.max_entries - 1, 0) :]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def clear(self):
+        """Remove every stored entry"""
+        shutil.rmtree(self.root, ignore_errors=True)
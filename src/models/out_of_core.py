@@ -0,0 +1,99 @@
+"""
+Sufficient statistics for fitting Lasso on data streamed in chunks
+
+The Lasso objective (1 / 2n) ||y - Xw||^2 + alpha ||w||_1 depends on the
+data only through X^T X, X^T y and the column means. GramAccumulator sums
+those over chunks of windows in float64, so the training set never has to
+be in memory at once, and lasso_from_gram() solves the problem by
+coordinate descent on the p x p Gram matrix instead of on X.
+"""
+
+import numpy as np
+from sklearn.linear_model import Lasso
+from sklearn.multioutput import MultiOutputRegressor
+
+
+class GramAccumulator:
+    """Running X^T X, X^T y and column sums of chunks of (X, y)"""
+
+    def __init__(self):
+        self.n_samples = 0
+        self.shift_x = None
+        self.shift_y = None
+
+    def update(self, X, y):
+        # Sums are taken around the first chunk's means, which keeps the
+        # centered Gram matrix free of cancellation for large offsets
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if self.shift_x is None:
+            self.shift_x = X.mean(axis=0)
+            self.shift_y = y.mean(axis=0)
+            self.sum_x = np.zeros(X.shape[1])
+            self.sum_y = np.zeros(y.shape[1])
+            self.xtx = np.zeros((X.shape[1], X.shape[1]))
+            self.xty = np.zeros((X.shape[1], y.shape[1]))
+        X = X - self.shift_x
+        y = y - self.shift_y
+        self.n_samples += len(X)
+        self.sum_x += X.sum(axis=0)
+        self.sum_y += y.sum(axis=0)
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+
+    @property
+    def mean_x(self):
+        return self.shift_x + self.sum_x / self.n_samples
+
+    @property
+    def mean_y(self):
+        return self.shift_y + self.sum_y / self.n_samples
+
+    def standardized(self, scale):
+        """Gram matrix and X^T y of the centered data divided by *scale*"""
+        offset_x = self.sum_x / self.n_samples
+        offset_y = self.sum_y / self.n_samples
+        gram = self.xtx - self.n_samples * np.outer(offset_x, offset_x)
+        xy = self.xty - self.n_samples * np.outer(offset_x, offset_y)
+        return gram / np.outer(scale, scale), xy / scale[:, None]
+
+
+def lasso_from_gram(gram, xy, n_samples, alpha=1.0, max_iter=1000, tol=1e-4):
+    """Lasso coefficients (features x targets) of centered data
+
+    Cyclic coordinate descent on the Gram matrix, all targets at once.
+    Stops when no coefficient moved by more than *tol* times the largest
+    coefficient in a sweep.
+    """
+    coef = np.zeros_like(xy)
+    diag = np.diag(gram)
+    threshold = alpha * n_samples
+    features = np.flatnonzero(diag > 0)
+    for n_iter in range(1, max_iter + 1):
+        max_change = 0.0
+        for j in features:
+            rho = xy[j] - gram[j] @ coef + diag[j] * coef[j]
+            updated = np.sign(rho) * np.maximum(np.abs(rho) - threshold, 0) / diag[j]
+            max_change = max(max_change, np.abs(updated - coef[j]).max())
+            coef[j] = updated
+        if max_change <= tol * np.abs(coef).max():
+            break
+    return coef, n_iter
+
+
+def fitted_lasso(coef, intercept, alpha, n_iter, dtype=np.float64):
+    """MultiOutputRegressor of Lasso models with the given coefficients
+
+    Predicts, scores, pickles and registers like one fitted on the data.
+    """
+    model = MultiOutputRegressor(Lasso(alpha=alpha))
+    model.estimators_ = []
+    for target in range(coef.shape[1]):
+        estimator = Lasso(alpha=alpha)
+        estimator.coef_ = coef[:, target].astype(dtype)
+        estimator.intercept_ = np.dtype(dtype).type(intercept[target])
+        estimator.n_features_in_ = coef.shape[0]
+        estimator.n_iter_ = n_iter
+        model.estimators_.append(estimator)
+    model.n_features_in_ = coef.shape[0]
+    return model
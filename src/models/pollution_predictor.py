@@ -10,24 +10,63 @@ import mlflow.sklearn
 import numpy as np
 import pandas as pd
 from mlflow.tracking import MlflowClient
-from sklearn.linear_model import Lasso
+from sklearn.linear_model import Lasso, SGDRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.multioutput import MultiOutputRegressor
 from sklearn.preprocessing import StandardScaler
 
 from src.config import USE_S3
+from src.models.feature_store import window_count, write_windows
+from src.models.out_of_core import GramAccumulator, fitted_lasso, lasso_from_gram
+from src.monitoring.prometheus_metrics import stage_timer
+from src.monitoring.tracing import span, traced
+
+# float32 halves the feature, scaled input and coefficient memory; sensor
+# readings carry about three significant digits, well within its precision
+PRECISIONS = ("float64", "float32")
+PREDICTOR_PRECISION = os.getenv("PREDICTOR_PRECISION", "float64")
+# Rows per chunk for out-of-core training, 0 loads the dataset whole
+TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "0"))
+
+MODEL_TYPES = {
+    "lasso": "Lasso Regression with MultiOutput",
+    # Supports partial_fit, so it can be updated with new windows only
+    "sgd": "SGD Regression (L1) with MultiOutput",
+}
+
+
+def latest_model_version(name="pollution_predictor"):
+    """(version, run_id) that load_model_from_mlflow() would load, or Nones"""
+    client = MlflowClient()
+    try:
+        versions = client.get_latest_versions(name, stages=["Production"])
+        if not versions:
+            versions = client.get_latest_versions(name, stages=["None"])
+    except mlflow.exceptions.MlflowException:
+        versions = []
+    if not versions:
+        return None, None
+    return versions[0].version, versions[0].run_id
 
 
 class PollutionPredictor:
-    def __init__(self, training_hours=24, n_steps=6):
+    def __init__(
+        self, training_hours=24, n_steps=6, model_type="lasso", precision=None
+    ):
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f"Unknown model type: {model_type}")
         self.training_hours = training_hours
         self.n_steps = n_steps
+        self.model_type = model_type
+        self.set_precision(precision or PREDICTOR_PRECISION)
+        self.last_timestamp = None
         self.model = None
         self.scaler = None
         self.features_pollution = None
         self.features_additional = ["hour_sin", "hour_cos", "day_sin", "day_cos"]
         self.run_id = None
+        self.model_version = None
 
         # Initialize MLflow
         self.setup_mlflow()
@@ -37,6 +76,13 @@ class PollutionPredictor:
         self.s3_client = boto3.client("s3")
         self.s3_bucket = os.environ.get("AWS_S3_BUCKET_NAME", "air-pollution-models")
 
+    def set_precision(self, precision):
+        """Float type of the features, scaled inputs and model coefficients"""
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        self.precision = precision
+        self.dtype = np.dtype(precision)
+
     def setup_mlflow(self):
         """Setup MLflow tracking URI and S3 endpoint if available"""
         if USE_S3:
@@ -69,6 +115,7 @@ class PollutionPredictor:
         except (mlflow.exceptions.MlflowException, ValueError) as e:
             print(f"Failed to setup MLflow: {e}")
 
+    @traced("predictor.create_features")
     def create_features(self, df):
         """Create temporal features as in your notebook"""
         df = df.copy()
@@ -100,52 +147,73 @@ class PollutionPredictor:
 
         # print(f"nan values in df: {df.isna().sum().sum()}")
 
+        features = self.features_pollution + self.features_additional
+        df[features] = df[features].astype(self.dtype)
         return df
 
+    @traced("predictor.prepare_sequences")
     def prepare_sequences(self, df):
         """Prepare training sequences exactly as in your notebook"""
         df_features = self.create_features(df)
 
         # print(f"nan values in df_features: {df_features.isna().sum().sum()}")
 
-        set_pollution_additional = np.array(
-            df_features[self.features_additional].values
-        )
-        set_pollution_target = np.array(df_features[self.features_pollution].values)
-
-        # Prepare training data (your exact logic)
-        X = []
-        X_additional = []
-        y = []
-
-        for i in range(
-            self.training_hours, len(set_pollution_additional) - self.n_steps + 1
-        ):
-            X.append(set_pollution_target[i - self.training_hours : i])
-            X_additional.append(set_pollution_additional[i])
-            y.append(set_pollution_target[i : i + self.n_steps])
+        return self._sequences(df_features)
 
-        X, X_additional, y = np.array(X), np.array(X_additional), np.array(y)
+    def _sequences(self, df_features):
+        set_pollution_additional = df_features[self.features_additional].to_numpy(
+            self.dtype
+        )
+        set_pollution_target = df_features[self.features_pollution].to_numpy(self.dtype)
 
-        # Reshape as in your notebook
-        X = X.reshape(X.shape[0], X.shape[1] * X.shape[2])
-        y = y.reshape(y.shape[0], y.shape[1] * y.shape[2])
-        X = np.concatenate((X, X_additional), axis=1)
+        # Window i: the training_hours rows before row i + training_hours
+        # flattened with that row's temporal features, and the n_steps
+        # rows from it as targets (your exact logic, without the loop)
+        n_samples = window_count(
+            len(set_pollution_target), self.training_hours, self.n_steps
+        )
+        n_features = len(self.features_pollution)
+        X = np.empty(
+            (
+                n_samples,
+                self.training_hours * n_features + len(self.features_additional),
+            ),
+            dtype=self.dtype,
+        )
+        y = np.empty((n_samples, self.n_steps * n_features), dtype=self.dtype)
+        return write_windows(
+            set_pollution_target,
+            set_pollution_additional,
+            self.training_hours,
+            self.n_steps,
+            X,
+            y,
+        )
 
-        return X, y
+    @traced("predictor.train")
+    def train(self, df, feature_store=None, dataset_digest=None):
+        """Train model using your exact approach
 
-    def train(self, df):
-        """Train model using your exact approach"""
+        With a FeatureStore the windowed matrices are memory mapped from
+        disk, built only the first time this dataset version
+        (*dataset_digest*) and window configuration are trained on.
+        """
         # print(f"Training model with data shape: {df.shape}")
 
         # Prepare sequences
         with mlflow.start_run() as run:
-            mlflow.set_tag("model_type", "Lasso Regression with MultiOutput")
+            mlflow.set_tag("model_type", MODEL_TYPES[self.model_type])
+            mlflow.set_tag("training_mode", "full")
             mlflow.log_param("training_hours", self.training_hours)
             mlflow.log_param("n_steps", self.n_steps)
             mlflow.log_param("alpha", 1.0)
+            mlflow.log_param("precision", self.precision)
 
-            X, y = self.prepare_sequences(df)
+            if feature_store is not None:
+                X, y = feature_store.matrices(self, df, digest=dataset_digest)
+            else:
+                X, y = self.prepare_sequences(df)
+            self.last_timestamp = pd.to_datetime(df["Timestamp"]).max()
 
             # Time series split (your exact logic)
             tscv = TimeSeriesSplit(n_splits=3)
@@ -156,24 +224,29 @@ class PollutionPredictor:
             if train_index is None or val_index is None:
                 raise ValueError("TimeSeriesSplit did not produce train/val indices.")
 
-            X_train, X_val = X[train_index], X[val_index]
-            y_train, y_val = y[train_index], y[val_index]
+            # The splits are contiguous, slicing keeps memory-mapped
+            # matrices on disk until they are scaled
+            train_slice = slice(train_index[0], train_index[-1] + 1)
+            val_slice = slice(val_index[0], val_index[-1] + 1)
+            X_train, X_val = X[train_slice], X[val_slice]
+            y_train, y_val = y[train_slice], y[val_slice]
 
             # Scale features
             self.scaler = StandardScaler()
             X_train = self.scaler.fit_transform(X_train)
             X_val = self.scaler.transform(X_val)
 
-            # Lasso Regression
-            self.model = MultiOutputRegressor(Lasso(alpha=1.0))  # Adjust alpha
-            self.model.fit(X_train, y_train)
+            with span("train.fit", samples=len(X_train), features=X_train.shape[1]):
+                self.model = self._build_model()
+                self.model.fit(X_train, y_train)
 
             # Evaluate
             y_pred = self.model.predict(X_val)
-            mae = mean_absolute_error(y_val, y_pred)
-            mse = mean_squared_error(y_val, y_pred)
+            # Plain floats, float32 scalars are not JSON serializable
+            mae = float(mean_absolute_error(y_val, y_pred))
+            mse = float(mean_squared_error(y_val, y_pred))
             rmse = np.sqrt(mse)
-            accuracy_score = self.model.score(X_val, y_val)
+            accuracy_score = float(self.model.score(X_val, y_val))
 
             # Log metrics
             mlflow.log_metric("mae", mae)
@@ -183,38 +256,8 @@ class PollutionPredictor:
             mlflow.log_metric("training_samples", len(X_train))
             mlflow.log_metric("validation_samples", len(X_val))
 
-            # Log model and artifacts to S3
-            mlflow.sklearn.log_model(
-                self.model, "model", registered_model_name="pollution_predictor"
-            )
-
-            # Create temporary files for artifacts
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Save scaler
-                scaler_path = os.path.join(temp_dir, "scaler.pkl")
-                joblib.dump(self.scaler, scaler_path)
-                mlflow.log_artifact(scaler_path, "artifacts")
-
-                # Save features
-                features_path = os.path.join(temp_dir, "features.pkl")
-                joblib.dump(self.features_pollution, features_path)
-                mlflow.log_artifact(features_path, "artifacts")
-
-                # Save model metadata
-                metadata = {
-                    "training_hours": self.training_hours,
-                    "n_steps": self.n_steps,
-                    "features_pollution": self.features_pollution,
-                    "features_additional": self.features_additional,
-                    "model_type": "Lasso Regression with MultiOutput",
-                    "created_at": datetime.now().isoformat(),
-                }
-
-                metadata_path = os.path.join(temp_dir, "model_metadata.json")
-
-                with open(metadata_path, "w", encoding="utf-8") as f:
-                    json.dump(metadata, f, indent=2)
-                mlflow.log_artifact(metadata_path, "artifacts")
+            with span("train.mlflow_log"):
+                self._log_model_to_mlflow()
 
             self.run_id = run.info.run_id
 
@@ -236,6 +279,360 @@ class PollutionPredictor:
         print("Artifacts stored in S3")
         return metrics
 
+    def _chunk_windows(self, chunks, start=0, stop=None):
+        """(X, y, newest timestamp) of windows start..stop, chunk by chunk
+
+        Window i starts at row i, as in prepare_sequences(). The last rows
+        of each chunk, already forward filled, are carried into the next
+        one, so windows spanning chunk boundaries are not lost.
+        """
+        overlap = self.training_hours + self.n_steps - 1
+        carry = None
+        offset = 0  # window index of the first row of the current chunk
+        for chunk in chunks:
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            n_windows = window_count(len(chunk), self.training_hours, self.n_steps)
+            if n_windows == 0:
+                carry = chunk
+                continue
+            df_features = self.create_features(chunk)
+            if offset + n_windows > start:
+                X, y = self._sequences(df_features)
+                first = max(start - offset, 0)
+                last = n_windows if stop is None else min(stop - offset, n_windows)
+                if first < last:
+                    yield X[first:last], y[first:last], df_features["Timestamp"].max()
+            offset += n_windows
+            if stop is not None and offset >= stop:
+                return
+            carry = df_features[self.features_pollution + ["Timestamp"]].iloc[-overlap:]
+
+    @traced("predictor.train_chunked")
+    def train_chunked(self, chunks, epochs=1):
+        """Train on a dataset read one chunk of rows at a time
+
+        *chunks* is re-iterable and has a ``rows`` count, such as
+        DatasetHandle.chunks(). Memory is bounded by the chunk size: the
+        scaler is fit with partial_fit, Lasso is solved from the X^T X and
+        X^T y of the scaled training windows, and SGD is fit with
+        partial_fit, *epochs* passes over the chunks. The validation
+        windows are the last split of train()'s TimeSeriesSplit.
+        """
+        n_samples = window_count(chunks.rows, self.training_hours, self.n_steps)
+        n_val = n_samples // 4
+        if n_val == 0:
+            raise ValueError(
+                f"Not enough data: {chunks.rows} rows for out-of-core training"
+            )
+        n_train = n_samples - n_val
+        estimator = self._build_model().estimator
+
+        with mlflow.start_run() as run:
+            mlflow.set_tag("model_type", MODEL_TYPES[self.model_type])
+            mlflow.set_tag("training_mode", "out_of_core")
+            mlflow.log_param("training_hours", self.training_hours)
+            mlflow.log_param("n_steps", self.n_steps)
+            mlflow.log_param("alpha", estimator.alpha)
+            mlflow.log_param("precision", self.precision)
+            mlflow.log_param("chunk_rows", getattr(chunks, "chunk_rows", None))
+
+            self.scaler = StandardScaler()
+            gram = GramAccumulator()
+            incremental = hasattr(estimator, "partial_fit")
+            with span("train_chunked.statistics", samples=n_train):
+                for X, y, _ in self._chunk_windows(chunks, stop=n_train):
+                    self.scaler.partial_fit(X)
+                    if not incremental:
+                        gram.update(X, y)
+
+            with span("train_chunked.fit", samples=n_train):
+                if incremental:
+                    self.model = self._build_model()
+                    for epoch in range(epochs):
+                        for X, y, _ in self._chunk_windows(chunks, stop=n_train):
+                            self.model.partial_fit(self.scaler.transform(X), y)
+                else:
+                    matrix, xy = gram.standardized(self.scaler.scale_)
+                    coef, n_iter = lasso_from_gram(
+                        matrix,
+                        xy,
+                        gram.n_samples,
+                        alpha=estimator.alpha,
+                        max_iter=estimator.max_iter,
+                        tol=estimator.tol,
+                    )
+                    mean_scaled = (gram.mean_x - self.scaler.mean_) / self.scaler.scale_
+                    intercept = gram.mean_y - mean_scaled @ coef
+                    self.model = fitted_lasso(
+                        coef, intercept, estimator.alpha, n_iter, self.dtype
+                    )
+
+            # Errors of the validation windows, summed per target. They run
+            # to the end of the dataset, so newest is its last timestamp
+            abs_error = squared_error = sum_y = sum_y2 = 0.0
+            for X, y, newest in self._chunk_windows(chunks, start=n_train):
+                errors = self.model.predict(self.scaler.transform(X)) - y
+                abs_error += np.abs(errors).sum(axis=0, dtype=np.float64)
+                squared_error += (errors**2).sum(axis=0, dtype=np.float64)
+                sum_y += y.sum(axis=0, dtype=np.float64)
+                sum_y2 += (y.astype(np.float64) ** 2).sum(axis=0)
+            self.last_timestamp = newest
+            total = sum_y2 - sum_y**2 / n_val
+            r2 = 1 - squared_error / np.where(total > 0, total, np.inf)
+
+            mae = float(abs_error.mean() / n_val)
+            mse = float(squared_error.mean() / n_val)
+            rmse = np.sqrt(mse)
+            accuracy_score = float(r2.mean())
+
+            mlflow.log_metric("mae", mae)
+            mlflow.log_metric("mse", mse)
+            mlflow.log_metric("rmse", rmse)
+            mlflow.log_metric("r2_score", accuracy_score)
+            mlflow.log_metric("training_samples", n_train)
+            mlflow.log_metric("validation_samples", n_val)
+
+            with span("train.mlflow_log"):
+                self._log_model_to_mlflow()
+
+            self.run_id = run.info.run_id
+
+            metrics = {
+                "mae": mae,
+                "mse": mse,
+                "rmse": rmse,
+                "r2_score": accuracy_score,
+                "training_samples": n_train,
+                "validation_samples": n_val,
+                "mlflow_run_id": self.run_id,
+                "mlflow_experiment_id": run.info.experiment_id,
+            }
+
+        print(
+            f"Model trained out of core - MAE: {mae:.3f}, RMSE: {rmse:.3f}, "
+            f"R2: {accuracy_score:.3f}"
+        )
+        return metrics
+
+    def _build_model(self):
+        if self.model_type == "sgd":
+            return MultiOutputRegressor(
+                SGDRegressor(penalty="l1", alpha=0.1, eta0=0.001, random_state=0)
+            )
+        return MultiOutputRegressor(Lasso(alpha=1.0))  # Adjust alpha
+
+    def _log_model_to_mlflow(self):
+        """Log and register the model with its scaler, features and metadata"""
+        # Log model and artifacts to S3
+        mlflow.sklearn.log_model(
+            self.model, "model", registered_model_name="pollution_predictor"
+        )
+
+        # Create temporary files for artifacts
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Save scaler
+            scaler_path = os.path.join(temp_dir, "scaler.pkl")
+            joblib.dump(self.scaler, scaler_path)
+            mlflow.log_artifact(scaler_path, "artifacts")
+
+            # Save features
+            features_path = os.path.join(temp_dir, "features.pkl")
+            joblib.dump(self.features_pollution, features_path)
+            mlflow.log_artifact(features_path, "artifacts")
+
+            # Save model metadata
+            metadata = {
+                "training_hours": self.training_hours,
+                "n_steps": self.n_steps,
+                "features_pollution": self.features_pollution,
+                "features_additional": self.features_additional,
+                "model_type": MODEL_TYPES[self.model_type],
+                "estimator": self.model_type,
+                "precision": self.precision,
+                "last_timestamp": (
+                    self.last_timestamp.isoformat()
+                    if self.last_timestamp is not None
+                    else None
+                ),
+                "created_at": datetime.now().isoformat(),
+            }
+
+            metadata_path = os.path.join(temp_dir, "model_metadata.json")
+
+            with open(metadata_path, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+            mlflow.log_artifact(metadata_path, "artifacts")
+
+    def supports_incremental(self):
+        """Whether the loaded model can be updated without a full refit"""
+        estimator = getattr(self.model, "estimator", None)
+        return hasattr(estimator, "partial_fit") and self.last_timestamp is not None
+
+    def _new_windows(self, df):
+        """Sequences whose targets include rows newer than the last update
+
+        Only the tail of *df* needed for those windows is featurized, so the
+        cost follows the amount of new data rather than the history length.
+        """
+        timestamps = pd.to_datetime(df["Timestamp"]).reset_index(drop=True)
+        first_new = 0
+        if self.last_timestamp is not None:
+            first_new = int(
+                np.searchsorted(timestamps.values, self._watermark(), "right")
+            )
+        if first_new >= len(df):
+            return None, None, self.last_timestamp
+
+        start = max(0, first_new - self.training_hours - self.n_steps + 1)
+        window = df.iloc[start:]
+
+        features = self.features_pollution
+        X, y = self.prepare_sequences(window)
+        new_features, self.features_pollution = self.features_pollution, features
+        if new_features != features:
+            raise ValueError(
+                "Pollution features changed since the last update, full retrain required"
+            )
+
+        # Row k is the window whose targets start at row training_hours + k
+        last_target = np.arange(len(X)) + self.training_hours + self.n_steps - 1
+        keep = last_target >= first_new - start
+        return X[keep], y[keep], timestamps.iloc[-1]
+
+    def _watermark(self):
+        return np.datetime64(pd.Timestamp(self.last_timestamp).tz_localize(None))
+
+    @traced("predictor.evaluate")
+    def evaluate(self, df):
+        """Score the loaded model on windows newer than its training data
+
+        Nothing is refitted. Models without a training watermark are scored
+        on every window of *df*.
+        """
+        if self.model is None:
+            raise ValueError(
+                "Model is not loaded. Please load the model first using load_model_from_mlflow()"
+            )
+
+        X, y, _ = self._new_windows(df)
+        if X is None or len(X) == 0:
+            return {"samples": 0}
+
+        X_scaled = self.scaler.transform(X)
+        y_pred = self.model.predict(X_scaled)
+        mse = mean_squared_error(y, y_pred)
+        metrics = {
+            "mae": float(mean_absolute_error(y, y_pred)),
+            "mse": float(mse),
+            "rmse": float(np.sqrt(mse)),
+            "samples": len(X),
+        }
+        if len(X) > 1:
+            metrics["r2_score"] = float(self.model.score(X_scaled, y))
+        return metrics
+
+    @traced("predictor.window_errors")
+    def window_errors(self, df):
+        """MAE and RMSE of each window newer than the training data
+
+        Indexed by the timestamp of the window's last target hour.
+        """
+        if self.model is None:
+            raise ValueError(
+                "Model is not loaded. Please load the model first using load_model_from_mlflow()"
+            )
+
+        X, y, _ = self._new_windows(df)
+        if X is None or len(X) == 0:
+            return pd.DataFrame(
+                {"mae": [], "rmse": []}, index=pd.DatetimeIndex([], name="Timestamp")
+            )
+
+        errors = self.model.predict(self.scaler.transform(X)) - y
+        # Kept windows are the last ones, which end on the last rows of df
+        timestamps = pd.to_datetime(df["Timestamp"]).iloc[-len(X) :]
+        return pd.DataFrame(
+            {
+                "mae": np.abs(errors).mean(axis=1),
+                "rmse": np.sqrt((errors**2).mean(axis=1)),
+            },
+            index=pd.DatetimeIndex(timestamps, name="Timestamp"),
+        )
+
+    @traced("predictor.update")
+    def update(self, df, drift_threshold=None):
+        """Update the loaded model with windows newer than the last training
+
+        The scaler statistics and model weights are updated with
+        partial_fit and a new model version is registered. New windows are
+        scored before the update (prequential evaluation). When the mean
+        standardized shift of the new inputs exceeds *drift_threshold*, the
+        model is left unchanged so that a full retrain can run instead.
+        """
+        if self.model is None:
+            raise ValueError(
+                "Model is not loaded. Please load the model first using load_model_from_mlflow()"
+            )
+        if not self.supports_incremental():
+            raise ValueError("Loaded model does not support incremental updates")
+
+        with span("update.sequences"):
+            X_new, y_new, last_timestamp = self._new_windows(df)
+        if X_new is None or len(X_new) == 0:
+            return {"updated": False, "reason": "no_new_data", "new_samples": 0}
+
+        X_scaled = self.scaler.transform(X_new)
+        y_pred = self.model.predict(X_scaled)
+        mse = mean_squared_error(y_new, y_pred)
+        metrics = {
+            "mae": float(mean_absolute_error(y_new, y_pred)),
+            "mse": float(mse),
+            "rmse": np.sqrt(mse),
+            "new_samples": len(X_new),
+            "drift_score": float(np.mean(np.abs(X_scaled.mean(axis=0)))),
+        }
+
+        if drift_threshold is not None and metrics["drift_score"] > drift_threshold:
+            print(
+                f"Drift score {metrics['drift_score']:.3f} above {drift_threshold}, "
+                "full retrain required"
+            )
+            return dict(metrics, updated=False, reason="drift")
+
+        parent_run_id = self.run_id
+        with mlflow.start_run() as run:
+            mlflow.set_tag("model_type", MODEL_TYPES[self.model_type])
+            mlflow.set_tag("training_mode", "incremental")
+            mlflow.log_param("training_hours", self.training_hours)
+            mlflow.log_param("n_steps", self.n_steps)
+            mlflow.log_param("parent_run_id", parent_run_id)
+
+            with span("update.fit", samples=len(X_new)):
+                self.scaler.partial_fit(X_new)
+                self.model.partial_fit(self.scaler.transform(X_new), y_new)
+            self.last_timestamp = last_timestamp
+
+            for name in ["mae", "mse", "rmse", "new_samples", "drift_score"]:
+                mlflow.log_metric(name, metrics[name])
+
+            with span("update.mlflow_log"):
+                self._log_model_to_mlflow()
+
+            self.run_id = run.info.run_id
+            metrics.update(
+                updated=True,
+                mlflow_run_id=self.run_id,
+                mlflow_experiment_id=run.info.experiment_id,
+                parent_run_id=parent_run_id,
+            )
+
+        print(
+            f"Model updated with {len(X_new)} new windows - "
+            f"prequential MAE: {metrics['mae']:.3f}"
+        )
+        return metrics
+
     def load_model_from_mlflow(self, run_id=None, model_version=None):
         """Load model from MLflow S3 artifact store"""
         try:
@@ -252,6 +649,7 @@ class PollutionPredictor:
             elif run_id:
                 model_uri = f"runs:/{run_id}/model"
                 self.model = mlflow.sklearn.load_model(model_uri)
+                model_version = None
             else:
                 client = MlflowClient()
                 latest_version = client.get_latest_versions(
@@ -300,6 +698,12 @@ class PollutionPredictor:
                         "features_additional",
                         ["hour_sin", "hour_cos", "day_sin", "day_cos"],
                     )
+                    self.model_type = metadata.get("estimator", "lasso")
+                    self.set_precision(metadata.get("precision", "float64"))
+                    last_timestamp = metadata.get("last_timestamp")
+                    self.last_timestamp = (
+                        pd.Timestamp(last_timestamp) if last_timestamp else None
+                    )
                     print("✓ Model metadata loaded successfully")
                 except (
                     json.JSONDecodeError,
@@ -308,6 +712,8 @@ class PollutionPredictor:
                 ) as metadata_error:
                     print(f"Warning: Could not load model metadata: {metadata_error}")
 
+            self.run_id = run_id
+            self.model_version = model_version
             print(f"✓ Model loaded from MLflow S3 artifacts: {model_uri}")
             print(f"✓ Run ID: {run_id}")
             return True
@@ -316,6 +722,7 @@ class PollutionPredictor:
             print(f"❌ Failed to load model from MLflow: {e}")
             return False
 
+    @traced("predictor.predict")
     def predict(self, df, target_timestamp=None):
         """Make predictions for the next 6 hours"""
 
@@ -327,95 +734,105 @@ class PollutionPredictor:
         if target_timestamp is None:
             target_timestamp = datetime.now()
 
-        df_features = self.create_features(df)
+        with stage_timer("feature_build"):
+            df_features = self.create_features(df)
 
-        # Get the latest available data for prediction
-        latest_data = df_features.tail(self.training_hours + self.n_steps)
+            # Get the latest available data for prediction
+            latest_data = df_features.tail(self.training_hours + self.n_steps)
 
-        set_pollution_additional = np.array(
-            latest_data[self.features_additional].values
-        )
-        set_pollution_target = np.array(latest_data[self.features_pollution].values)
+            set_pollution_additional = np.array(
+                latest_data[self.features_additional].values
+            )
+            set_pollution_target = np.array(latest_data[self.features_pollution].values)
 
-        # Prepare input (last sequence)
-        X_input = set_pollution_target[-self.training_hours :].flatten()
-        X_additional_input = set_pollution_additional[-1]
-        X_combined = np.concatenate([X_input, X_additional_input]).reshape(1, -1)
+            # Prepare input (last sequence)
+            X_input = set_pollution_target[-self.training_hours :].flatten()
+            X_additional_input = set_pollution_additional[-1]
+            X_combined = np.concatenate([X_input, X_additional_input]).reshape(1, -1)
 
         # Scale and predict
-        X_scaled = self.scaler.transform(X_combined)
-        prediction = self.model.predict(X_scaled)
-
-        # Reshape prediction
-        prediction = prediction.reshape(self.n_steps, len(self.features_pollution))
-        historical_data = set_pollution_target[-self.training_hours :]
-        historical_timestamps = latest_data["Timestamp"].values[-self.training_hours :]
-
-        # Default station name (this should match your actual station data)
-        # You may want to pass this as a parameter or detect it from the data
-        # Note: Station names are already included in feature names, so we don't need to add them again
-
-        # Format results
-        results = {
-            "prediction_timestamp": target_timestamp.isoformat(),
-            "predictions": {},
-            "historical_data": {},
-        }
+        with stage_timer("scale"):
+            X_scaled = self.scaler.transform(X_combined)
+        with stage_timer("model_predict"):
+            prediction = self.model.predict(X_scaled)
+
+        with stage_timer("serialize"):
+            # Reshape prediction
+            prediction = prediction.reshape(self.n_steps, len(self.features_pollution))
+            historical_data = set_pollution_target[-self.training_hours :]
+            historical_timestamps = latest_data["Timestamp"].values[
+                -self.training_hours :
+            ]
+
+            # Default station name (this should match your actual station data)
+            # You may want to pass this as a parameter or detect it from the data
+            # Note: Station names are already included in feature names, so we don't need to add them again
+
+            # Format results
+            results = {
+                "prediction_timestamp": target_timestamp.isoformat(),
+                "predictions": {},
+                "historical_data": {},
+            }
 
-        for i, feature in enumerate(self.features_pollution):
-            # Extract pollutant and station from feature name (e.g., "Nitrogen dioxide_Helsinki Kallio 2")
-            if "_" in feature:
-                parts = feature.split("_", 1)  # Split only on first underscore
-                pollutant = (
-                    parts[0].replace("Particulate matter < ", "PM").replace(" µm", "")
-                )
-                station = parts[1]
-                pollutant_station_key = f"{pollutant}_{station}"
-            else:
-                # Fallback if no underscore found
-                pollutant_station_key = feature.replace(
-                    "Particulate matter < ", "PM"
-                ).replace(" µm", "")
-
-            results["predictions"][pollutant_station_key] = {
-                f"hour_{j+1}": {
-                    "value": float(prediction[j, i]),
-                    "timestamp": (
-                        target_timestamp + timedelta(hours=j + 1)
-                    ).isoformat(),
+            for i, feature in enumerate(self.features_pollution):
+                # Extract pollutant and station from feature name (e.g., "Nitrogen dioxide_Helsinki Kallio 2")
+                if "_" in feature:
+                    parts = feature.split("_", 1)  # Split only on first underscore
+                    pollutant = (
+                        parts[0]
+                        .replace("Particulate matter < ", "PM")
+                        .replace(" µm", "")
+                    )
+                    station = parts[1]
+                    pollutant_station_key = f"{pollutant}_{station}"
+                else:
+                    # Fallback if no underscore found
+                    pollutant_station_key = feature.replace(
+                        "Particulate matter < ", "PM"
+                    ).replace(" µm", "")
+
+                results["predictions"][pollutant_station_key] = {
+                    f"hour_{j+1}": {
+                        "value": float(prediction[j, i]),
+                        "timestamp": (
+                            target_timestamp + timedelta(hours=j + 1)
+                        ).isoformat(),
+                    }
+                    for j in range(self.n_steps)
                 }
-                for j in range(self.n_steps)
-            }
 
-        for i, feature in enumerate(self.features_pollution):
-            # Extract pollutant and station from feature name (e.g., "Nitrogen dioxide_Helsinki Kallio 2")
-            if "_" in feature:
-                parts = feature.split("_", 1)  # Split only on first underscore
-                pollutant = (
-                    parts[0].replace("Particulate matter < ", "PM").replace(" µm", "")
-                )
-                station = parts[1]
-                pollutant_station_key = f"{pollutant}_{station}"
-            else:
-                # Fallback if no underscore found
-                pollutant_station_key = feature.replace(
-                    "Particulate matter < ", "PM"
-                ).replace(" µm", "")
-
-            results["historical_data"][pollutant_station_key] = []
-
-            try:
-                for j in range(self.training_hours):
-                    ts = historical_timestamps[j]
-                    value = historical_data[j, i]
-                    results["historical_data"][pollutant_station_key].append(
-                        {
-                            "timestamp": pd.to_datetime(ts).isoformat(),
-                            "value": float(value),
-                        }
+            for i, feature in enumerate(self.features_pollution):
+                # Extract pollutant and station from feature name (e.g., "Nitrogen dioxide_Helsinki Kallio 2")
+                if "_" in feature:
+                    parts = feature.split("_", 1)  # Split only on first underscore
+                    pollutant = (
+                        parts[0]
+                        .replace("Particulate matter < ", "PM")
+                        .replace(" µm", "")
                     )
-            except (IndexError, KeyError, ValueError):
-                # If there's an error with historical data for this feature, skip it
+                    station = parts[1]
+                    pollutant_station_key = f"{pollutant}_{station}"
+                else:
+                    # Fallback if no underscore found
+                    pollutant_station_key = feature.replace(
+                        "Particulate matter < ", "PM"
+                    ).replace(" µm", "")
+
                 results["historical_data"][pollutant_station_key] = []
 
+                try:
+                    for j in range(self.training_hours):
+                        ts = historical_timestamps[j]
+                        value = historical_data[j, i]
+                        results["historical_data"][pollutant_station_key].append(
+                            {
+                                "timestamp": pd.to_datetime(ts).isoformat(),
+                                "value": float(value),
+                            }
+                        )
+                except (IndexError, KeyError, ValueError):
+                    # If there's an error with historical data for this feature, skip it
+                    results["historical_data"][pollutant_station_key] = []
+
         return results
@@ -1,83 +1,258 @@
-# from datetime import datetime
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
 
 import boto3
 
-# from typing import Any, Dict
+# PutMetricData accepts up to 1000 datums per request
+MAX_DATUMS_PER_REQUEST = 1000
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+DEFAULT_MAX_BUFFER = 20000
 
+logger = logging.getLogger(__name__)
+
+
+class CloudWatchSink:
+    """Sends metric batches to CloudWatch"""
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client("cloudwatch")
+        return self._client
+
+    def put_metric_data(self, namespace, metric_data):
+        self.client.put_metric_data(Namespace=namespace, MetricData=metric_data)
+
+
+class InMemorySink:
+    """Keeps published batches in memory, for tests and local runs"""
 
-class CloudWatchMetrics:
     def __init__(self):
-        self.cloudwatch = boto3.client("cloudwatch")
-        self.namespace = "PollutionPrediction"
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def put_metric_data(self, namespace, metric_data):
+        with self._lock:
+            self.batches.append((namespace, list(metric_data)))
+
+    @property
+    def datums(self):
+        with self._lock:
+            return [datum for _, batch in self.batches for datum in batch]
+
+
+class MetricPublisher:
+    """Buffers metric datums and publishes them in batches from a thread
+
+    put() only appends to an in-memory buffer, so callers never wait on
+    CloudWatch. A daemon thread flushes every *flush_interval* seconds, or
+    sooner once a full batch is waiting. When the buffer is full the
+    oldest datums are dropped and counted in ``dropped``.
+    """
+
+    def __init__(
+        self,
+        namespace="PollutionPrediction",
+        sink=None,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        max_batch_size=MAX_DATUMS_PER_REQUEST,
+        max_buffer=DEFAULT_MAX_BUFFER,
+    ):
+        self.namespace = namespace
+        self.sink = sink if sink is not None else CloudWatchSink()
+        self.flush_interval = flush_interval
+        self.max_batch_size = min(max_batch_size, MAX_DATUMS_PER_REQUEST)
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self.failed = 0
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def put(
+        self,
+        name,
+        value,
+        unit="None",
+        dimensions=None,
+        timestamp=None,
+        high_resolution=False,
+    ):
+        """Queue a single value"""
+        datum = self._datum(name, unit, dimensions, timestamp, high_resolution)
+        datum["Value"] = float(value)
+        self.put_datum(datum)
+
+    def put_statistics(
+        self,
+        name,
+        values,
+        unit="None",
+        dimensions=None,
+        timestamp=None,
+        high_resolution=False,
+    ):
+        """Queue many observations of one metric as a single statistic set"""
+        values = list(values)
+        if not values:
+            return
+        datum = self._datum(name, unit, dimensions, timestamp, high_resolution)
+        datum["StatisticValues"] = {
+            "SampleCount": float(len(values)),
+            "Sum": float(sum(values)),
+            "Minimum": float(min(values)),
+            "Maximum": float(max(values)),
+        }
+        self.put_datum(datum)
+
+    def put_datum(self, datum):
+        """Queue a datum in PutMetricData format"""
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(datum)
+            pending = len(self._buffer)
+        self._ensure_thread()
+        if pending >= self.max_batch_size:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Publish everything buffered so far, blocking until sent"""
+        with self._send_lock:
+            while True:
+                with self._lock:
+                    batch = [
+                        self._buffer.popleft()
+                        for _ in range(min(self.max_batch_size, len(self._buffer)))
+                    ]
+                if not batch:
+                    return
+                try:
+                    self.sink.put_metric_data(self.namespace, batch)
+                except Exception as e:
+                    # Metrics are best effort, never fail the caller
+                    self.failed += len(batch)
+                    logger.warning(f"Failed to publish {len(batch)} metrics: {e}")
+
+    def close(self):
+        """Stop the background thread and publish what is left"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="cloudwatch-publisher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    @staticmethod
+    def _datum(name, unit, dimensions, timestamp, high_resolution):
+        datum = {
+            "MetricName": name,
+            "Unit": unit,
+            "Timestamp": timestamp or datetime.now(timezone.utc),
+            "StorageResolution": 1 if high_resolution else 60,
+        }
+        if dimensions:
+            datum["Dimensions"] = [
+                {"Name": key, "Value": str(value)} for key, value in dimensions.items()
+            ]
+        return datum
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    """Process-wide publisher, flushed on interpreter exit"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = MetricPublisher()
+            atexit.register(_publisher.close)
+        return _publisher
+
+
+class CloudWatchMetrics:
+    def __init__(self, publisher=None):
+        self.publisher = publisher if publisher is not None else get_publisher()
+        self.namespace = self.publisher.namespace
+
+    def flush(self):
+        """Block until buffered metrics are published"""
+        self.publisher.flush()
 
     def put_prediction_metrics(self, mae: float, rmse: float, model_version: str):
         """Send model performance metrics to CloudWatch"""
-
-        metrics = [
-            {
-                "MetricName": "ModelMAE",
-                "Value": mae,
-                "Unit": "None",
-                "Dimensions": [{"Name": "ModelVersion", "Value": model_version}],
-            },
-            {
-                "MetricName": "ModelRMSE",
-                "Value": rmse,
-                "Unit": "None",
-                "Dimensions": [{"Name": "ModelVersion", "Value": model_version}],
-            },
-        ]
-
-        self.cloudwatch.put_metric_data(Namespace=self.namespace, MetricData=metrics)
+        dimensions = {"ModelVersion": model_version}
+        self.publisher.put("ModelMAE", mae, dimensions=dimensions)
+        self.publisher.put("ModelRMSE", rmse, dimensions=dimensions)
 
     def put_prediction_count(self, count: int, model_version: str):
         """Log number of predictions made"""
-        self.cloudwatch.put_metric_data(
-            Namespace=self.namespace,
-            MetricData=[
-                {
-                    "MetricName": "PredictionCount",
-                    "Value": count,
-                    "Unit": "Count",
-                    "Dimensions": [{"Name": "ModelVersion", "Value": model_version}],
-                }
-            ],
+        self.publisher.put(
+            "PredictionCount",
+            count,
+            unit="Count",
+            dimensions={"ModelVersion": model_version},
         )
 
     def put_flow_execution_metrics(self, flow_name: str, status: str, duration: float):
         """Log flow execution metrics"""
-        self.cloudwatch.put_metric_data(
-            Namespace=self.namespace,
-            MetricData=[
-                {
-                    "MetricName": "FlowExecution",
-                    "Value": 1 if status == "success" else 0,
-                    "Unit": "Count",
-                    "Dimensions": [
-                        {"Name": "FlowName", "Value": flow_name},
-                        {"Name": "Status", "Value": status},
-                    ],
-                },
-                {
-                    "MetricName": "FlowDuration",
-                    "Value": duration,
-                    "Unit": "Seconds",
-                    "Dimensions": [{"Name": "FlowName", "Value": flow_name}],
-                },
-            ],
+        self.publisher.put(
+            "FlowExecution",
+            1 if status == "success" else 0,
+            unit="Count",
+            dimensions={"FlowName": flow_name, "Status": status},
+        )
+        self.publisher.put(
+            "FlowDuration",
+            duration,
+            unit="Seconds",
+            dimensions={"FlowName": flow_name},
         )
 
     def put_data_quality_metrics(self, data_shape: tuple, missing_values: int):
         """Log data quality metrics"""
-        self.cloudwatch.put_metric_data(
-            Namespace=self.namespace,
-            MetricData=[
-                {"MetricName": "DataRows", "Value": data_shape[0], "Unit": "Count"},
-                {"MetricName": "DataColumns", "Value": data_shape[1], "Unit": "Count"},
-                {
-                    "MetricName": "MissingValues",
-                    "Value": missing_values,
-                    "Unit": "Count",
-                },
-            ],
+        self.publisher.put("DataRows", data_shape[0], unit="Count")
+        self.publisher.put("DataColumns", data_shape[1], unit="Count")
+        self.publisher.put("MissingValues", missing_values, unit="Count")
+
+    def put_latency_metrics(self, name: str, seconds, dimensions=None):
+        """Log many latency observations as one high-resolution statistic set"""
+        self.publisher.put_statistics(
+            name,
+            seconds,
+            unit="Seconds",
+            dimensions=dimensions,
+            high_resolution=True,
         )
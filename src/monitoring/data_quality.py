@@ -0,0 +1,202 @@
+"""
+Vectorized data-quality profiling of hourly pollution datasets
+
+DataQualityProfiler consumes a dataset in chunks, in timestamp order, and
+keeps only per-column counters and the last row between chunks. Each
+chunk is checked with a handful of numpy operations over all columns at
+once:
+
+- nulls per column
+- values outside the plausible range of their pollutant
+- flat lines: runs of identical consecutive values, which usually mean a
+  stuck sensor
+- gaps in the hourly index, duplicate and out-of-order timestamps
+
+profile_frame() profiles a DataFrame, profile_parquet() a Parquet file
+batch by batch without loading it whole.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+HOUR_NS = 3600 * 10**9
+FLAT_LINE_HOURS = 6
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Plausibility bounds in µg/m³, by column prefix
+VALUE_RANGES = {
+    "Nitrogen dioxide": (0.0, 500.0),
+    "Particulate matter < 10 µm": (0.0, 1000.0),
+    "Particulate matter < 2.5 µm": (0.0, 1000.0),
+}
+
+
+def value_range(column):
+    for prefix, bounds in VALUE_RANGES.items():
+        if column.startswith(prefix):
+            return bounds
+    return (-np.inf, np.inf)
+
+
+def _timestamps(chunk):
+    if "Timestamp" in chunk:
+        return pd.to_datetime(chunk["Timestamp"]).to_numpy("datetime64[ns]")
+    if isinstance(chunk.index, pd.DatetimeIndex):
+        return chunk.index.to_numpy("datetime64[ns]")
+    return None
+
+
+class DataQualityProfiler:
+    """Accumulates a data-quality report over chunks of one dataset"""
+
+    def __init__(self, flat_line_hours=FLAT_LINE_HOURS):
+        self.flat_line_hours = flat_line_hours
+        self.columns = None
+        self.total_columns = 0
+        self.rows = 0
+
+    def _start(self, chunk):
+        self.columns = [
+            column
+            for column in chunk.select_dtypes(include="number").columns
+            if column != "Timestamp"
+        ]
+        self.total_columns = len(chunk.columns)
+        n = len(self.columns)
+        bounds = np.array([value_range(column) for column in self.columns])
+        self._low = bounds[:, 0] if n else np.empty(0)
+        self._high = bounds[:, 1] if n else np.empty(0)
+        self._nulls = np.zeros(n, dtype=np.int64)
+        self._out_of_range = np.zeros(n, dtype=np.int64)
+        self._max_flat = np.zeros(n, dtype=np.int64)
+        self._flat_runs = np.zeros(n, dtype=np.int64)
+        # Carried between chunks: last row and the open run of repeats
+        self._last_row = None
+        self._run = np.zeros(n, dtype=np.int64)
+
+        self._has_time = None
+        self._first_ts = None
+        self._last_ts = None
+        self._duplicates = 0
+        self._out_of_order = 0
+        self._gaps = 0
+        self._missing_hours = 0
+        self._longest_gap = 0
+
+    def update(self, chunk):
+        """Add the next chunk of rows"""
+        if self.columns is None:
+            self._start(chunk)
+        if chunk.empty:
+            return self
+        self.rows += len(chunk)
+
+        values = chunk.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        self._update_values(values)
+
+        timestamps = _timestamps(chunk)
+        if self._has_time is None:
+            self._has_time = timestamps is not None
+        if self._has_time and timestamps is not None:
+            self._update_index(timestamps.astype(np.int64))
+        return self
+
+    def _update_values(self, values):
+        nulls = np.isnan(values)
+        self._nulls += nulls.sum(axis=0)
+        # NaN compares False, so nulls never count as out of range
+        self._out_of_range += ((values < self._low) | (values > self._high)).sum(axis=0)
+
+        if self._last_row is None:
+            # The first row of the dataset has no predecessor
+            first = np.zeros((1, values.shape[1]), dtype=bool)
+            same = np.vstack([first, values[1:] == values[:-1]])
+        else:
+            same = values == np.vstack([self._last_row, values[:-1]])
+
+        # Length of the run of repeats ending at each row, continuing the
+        # run left open by the previous chunk
+        counts = np.cumsum(same, axis=0) + self._run
+        resets = np.maximum.accumulate(np.where(same, 0, counts), axis=0)
+        runs = counts - resets
+        flat = runs + 1
+
+        self._max_flat = np.maximum(self._max_flat, flat.max(axis=0))
+        # Each run is counted once, on the row where it reaches the threshold
+        self._flat_runs += (flat == self.flat_line_hours).sum(axis=0)
+        self._run = runs[-1]
+        self._last_row = values[-1]
+
+    def _update_index(self, ts):
+        if self._last_ts is not None:
+            diffs = np.diff(ts, prepend=self._last_ts)
+        else:
+            self._first_ts = ts[0]
+            diffs = np.diff(ts)
+        self._duplicates += int((diffs == 0).sum())
+        self._out_of_order += int((diffs < 0).sum())
+
+        gaps = diffs[diffs > HOUR_NS]
+        if gaps.size:
+            missing = gaps // HOUR_NS - 1
+            self._gaps += int((missing > 0).sum())
+            self._missing_hours += int(missing.sum())
+            self._longest_gap = max(self._longest_gap, int(missing.max()))
+        latest = ts.max()
+        if self._last_ts is None or latest > self._last_ts:
+            self._last_ts = latest
+
+    def report(self):
+        """Structured report of everything seen so far"""
+        if self.columns is None:
+            return {"rows": 0, "columns": {}}
+        rows = max(self.rows, 1)
+        cells = self.rows * len(self.columns)
+        nulls = int(self._nulls.sum())
+        report = {
+            "rows": self.rows,
+            "total_columns": self.total_columns,
+            "cells": cells,
+            "nulls": nulls,
+            "null_rate": nulls / cells if cells else 0.0,
+            "out_of_range": int(self._out_of_range.sum()),
+            "flat_line_runs": int(self._flat_runs.sum()),
+            "columns": {
+                column: {
+                    "nulls": int(self._nulls[i]),
+                    "null_rate": float(self._nulls[i]) / rows,
+                    "out_of_range": int(self._out_of_range[i]),
+                    "max_flat_run": int(self._max_flat[i]),
+                    "flat_line_runs": int(self._flat_runs[i]),
+                }
+                for i, column in enumerate(self.columns)
+            },
+        }
+        if self._has_time and self._first_ts is not None:
+            report["index"] = {
+                "start": pd.Timestamp(self._first_ts).isoformat(),
+                "end": pd.Timestamp(self._last_ts).isoformat(),
+                "duplicate_timestamps": self._duplicates,
+                "out_of_order": self._out_of_order,
+                "gaps": self._gaps,
+                "missing_hours": self._missing_hours,
+                "longest_gap_hours": self._longest_gap,
+            }
+        return report
+
+
+def profile_frame(df, chunk_rows=DEFAULT_CHUNK_ROWS, **kwargs):
+    """Data-quality report of a DataFrame, profiled chunk_rows at a time"""
+    profiler = DataQualityProfiler(**kwargs)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        profiler.update(df.iloc[start : start + chunk_rows])
+    return profiler.report()
+
+
+def profile_parquet(path, batch_size=DEFAULT_CHUNK_ROWS, **kwargs):
+    """Data-quality report of a Parquet file, read one batch at a time"""
+    profiler = DataQualityProfiler(**kwargs)
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        profiler.update(batch.to_pandas())
+    return profiler.report()
@@ -0,0 +1,172 @@
+"""
+Streaming drift statistics from per-feature histograms
+
+The reference window is summarized once as a histogram per feature, with
+bin edges at the reference deciles. Every later batch is binned against
+those edges and kept in a ring of the last *window_batches* batches, so
+an update costs the same whatever the size of the reference or of the
+history, and a drift check only touches features x bins counts.
+
+For each feature the check computes the population stability index (PSI)
+and a binned Kolmogorov-Smirnov distance. A feature drifts when its PSI
+exceeds *psi_threshold* and its KS distance is significant at alpha 0.05.
+The dataset drifts when at least *drift_share* of the features drift.
+"""
+
+from collections import deque
+
+import numpy as np
+
+DEFAULT_BINS = 10
+DEFAULT_WINDOW_BATCHES = 24 * 7
+PSI_THRESHOLD = 0.2
+DRIFT_SHARE = 0.5
+MIN_SAMPLES = 24
+# Proportions are floored so empty bins do not make the PSI infinite
+MIN_PROPORTION = 1e-4
+KS_ALPHA_FACTOR = 1.358  # c(alpha) for alpha = 0.05
+
+
+def _feature_columns(df):
+    return [
+        column
+        for column in df.select_dtypes(include="number").columns
+        if column != "Timestamp"
+    ]
+
+
+class StreamingDriftDetector:
+    """Reference histograms plus a sliding window of current batch counts"""
+
+    def __init__(
+        self,
+        columns,
+        edges,
+        reference,
+        window_batches=DEFAULT_WINDOW_BATCHES,
+        psi_threshold=PSI_THRESHOLD,
+        drift_share=DRIFT_SHARE,
+        min_samples=MIN_SAMPLES,
+    ):
+        self.columns = list(columns)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.reference = np.asarray(reference, dtype=np.int64)
+        self.window_batches = window_batches
+        self.psi_threshold = psi_threshold
+        self.drift_share = drift_share
+        self.min_samples = min_samples
+        self.window = deque()
+        self.current = np.zeros_like(self.reference)
+
+    @classmethod
+    def fit(cls, reference_df, bins=DEFAULT_BINS, **kwargs):
+        """Detector with reference histograms built from *reference_df*"""
+        columns = _feature_columns(reference_df)
+        values = reference_df[columns].to_numpy(dtype=np.float64)
+        quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+        if len(values):
+            edges = np.nanquantile(values, quantiles, axis=0).T
+        else:
+            edges = np.full((len(columns), bins - 1), np.nan)
+        # Features without reference data get edges that put
+        # everything in one bin
+        edges = np.where(np.isnan(edges), np.inf, edges)
+        detector = cls(columns, edges, np.zeros((len(columns), bins)), **kwargs)
+        detector.reference = detector._counts(values)
+        return detector
+
+    def _counts(self, values):
+        """Histogram counts per feature, shape (features, bins)"""
+        bins = self.edges.shape[1] + 1
+        counts = np.zeros((len(self.columns), bins), dtype=np.int64)
+        if not len(values):
+            return counts
+        # Bin i holds values in (edge[i-1], edge[i]]
+        index = (values[:, :, None] > self.edges[None, :, :]).sum(axis=2)
+        valid = ~np.isnan(values)
+        features = np.broadcast_to(np.arange(len(self.columns)), values.shape)
+        np.add.at(counts, (features[valid], index[valid]), 1)
+        return counts
+
+    def update(self, batch):
+        """Add one batch of current data, evicting the oldest past the window
+
+        *batch* is a DataFrame, or a 2-D array with the detector's columns
+        in order.
+        """
+        if hasattr(batch, "reindex"):
+            values = batch.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+        else:
+            values = np.asarray(batch, dtype=np.float64)
+        counts = self._counts(values)
+        self.window.append(counts)
+        self.current += counts
+        while len(self.window) > self.window_batches:
+            self.current -= self.window.popleft()
+        return self
+
+    def check(self):
+        """PSI and KS per feature and the dataset drift verdict"""
+        ref_n = self.reference.sum(axis=1)
+        cur_n = self.current.sum(axis=1)
+        ref_p = self.reference / np.maximum(ref_n, 1)[:, None]
+        cur_p = self.current / np.maximum(cur_n, 1)[:, None]
+
+        ref_s = np.maximum(ref_p, MIN_PROPORTION)
+        cur_s = np.maximum(cur_p, MIN_PROPORTION)
+        psi = ((cur_s - ref_s) * np.log(cur_s / ref_s)).sum(axis=1)
+        ks = np.abs(np.cumsum(cur_p, axis=1) - np.cumsum(ref_p, axis=1)).max(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ks_critical = KS_ALPHA_FACTOR * np.sqrt((ref_n + cur_n) / (ref_n * cur_n))
+
+        evaluated = (cur_n >= self.min_samples) & (ref_n > 0)
+        drifted = evaluated & (psi > self.psi_threshold) & (ks > ks_critical)
+
+        n_evaluated = int(evaluated.sum())
+        share = float(drifted.sum()) / n_evaluated if n_evaluated else 0.0
+        return {
+            "dataset_drift": bool(n_evaluated and share >= self.drift_share),
+            "drift_share": share,
+            "drifted_features": int(drifted.sum()),
+            "evaluated_features": n_evaluated,
+            "current_samples": int(cur_n.max()) if len(cur_n) else 0,
+            "features": {
+                column: {
+                    "psi": float(psi[i]),
+                    "ks": float(ks[i]),
+                    "ks_critical": float(ks_critical[i]) if evaluated[i] else None,
+                    "drifted": bool(drifted[i]),
+                }
+                for i, column in enumerate(self.columns)
+            },
+        }
+
+    def to_dict(self):
+        """JSON serializable state, restored by from_dict()"""
+        return {
+            "columns": self.columns,
+            "edges": self.edges.tolist(),
+            "reference": self.reference.tolist(),
+            "window": [counts.tolist() for counts in self.window],
+            "window_batches": self.window_batches,
+            "psi_threshold": self.psi_threshold,
+            "drift_share": self.drift_share,
+            "min_samples": self.min_samples,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        detector = cls(
+            state["columns"],
+            state["edges"],
+            state["reference"],
+            window_batches=state["window_batches"],
+            psi_threshold=state["psi_threshold"],
+            drift_share=state["drift_share"],
+            min_samples=state["min_samples"],
+        )
+        for counts in state["window"]:
+            counts = np.asarray(counts, dtype=np.int64)
+            detector.window.append(counts)
+            detector.current += counts
+        return detector
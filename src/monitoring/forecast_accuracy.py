@@ -0,0 +1,192 @@
+"""
+Online forecast accuracy from predictions and the observations that follow
+
+Forecasts wait in a table of outstanding targets keyed by station,
+pollutant and target hour, one row per horizon. Each ingestion joins the
+newly arrived observations against that table with a single merge.
+Matched forecasts move to a sliding window of errors, from which MAE and
+RMSE per horizon and station are computed. Forecasts that are never
+matched are dropped once they are *max_pending_hours* older than the
+newest observation.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.data.prediction_archive import prediction_frame, split_key
+
+KEY_COLUMNS = ["station", "pollutant", "target"]
+FORECAST_COLUMNS = KEY_COLUMNS + ["horizon", "value", "issued"]
+ERROR_COLUMNS = KEY_COLUMNS + ["horizon", "error"]
+DEFAULT_WINDOW_HOURS = 24 * 7
+MAX_PENDING_HOURS = 48
+
+
+def _hours(values):
+    """Naive UTC timestamps floored to the hour"""
+    timestamps = pd.to_datetime(pd.Series(values))
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    return timestamps.dt.floor("h").to_numpy()
+
+
+DTYPES = {
+    "station": object,
+    "pollutant": object,
+    "target": "datetime64[ns]",
+    "horizon": np.int64,
+    "value": np.float64,
+    "issued": object,
+    "error": np.float64,
+}
+
+
+def _empty(columns):
+    return pd.DataFrame({column: pd.Series(dtype=DTYPES[column]) for column in columns})
+
+
+class ForecastAccuracyTracker:
+    """Outstanding forecasts plus a window of matched forecast errors"""
+
+    def __init__(
+        self, window_hours=DEFAULT_WINDOW_HOURS, max_pending_hours=MAX_PENDING_HOURS
+    ):
+        self.window_hours = window_hours
+        self.max_pending_hours = max_pending_hours
+        self.pending = _empty(FORECAST_COLUMNS)
+        self.errors = _empty(ERROR_COLUMNS)
+        self.last_observed = None
+
+    def add_forecast(self, prediction):
+        """Add the output of PollutionPredictor.predict(), returns rows added"""
+        forecasts = prediction_frame(prediction).rename(
+            columns={"target_time": "target"}
+        )
+        if forecasts.empty:
+            return 0
+        forecasts["target"] = _hours(forecasts["target"])
+        forecasts["horizon"] = forecasts["horizon"].astype(np.int64)
+        forecasts["issued"] = prediction.get("prediction_timestamp")
+        forecasts = forecasts[FORECAST_COLUMNS]
+        # A repeated forecast for the same target and horizon replaces the old one
+        self.pending = (
+            pd.concat([self.pending, forecasts], ignore_index=True)
+            .drop_duplicates(KEY_COLUMNS + ["horizon"], keep="last")
+            .reset_index(drop=True)
+        )
+        return len(forecasts)
+
+    def observe(self, df):
+        """Score outstanding forecasts against observed hours, returns matches"""
+        if df.empty:
+            return 0
+        timestamps = _hours(df["Timestamp"])
+        latest = timestamps.max()
+        if self.last_observed is None or latest > self.last_observed:
+            self.last_observed = latest
+
+        matched = 0
+        if not self.pending.empty:
+            observed = self._observations(df, timestamps)
+            joined = self.pending.merge(observed, on=KEY_COLUMNS, how="left")
+            hit = joined["actual"].notna().to_numpy()
+            if hit.any():
+                errors = joined.loc[hit, KEY_COLUMNS + ["horizon"]]
+                errors["error"] = (joined["value"] - joined["actual"])[hit]
+                self.errors = pd.concat([self.errors, errors], ignore_index=True)
+                matched = int(hit.sum())
+            self.pending = joined.loc[~hit, FORECAST_COLUMNS].reset_index(drop=True)
+
+        self._expire()
+        return matched
+
+    def _observations(self, df, timestamps):
+        """Long frame of station, pollutant, target, actual for pending targets"""
+        columns = [column for column in df.columns if "_" in column]
+        keep = timestamps >= self.pending["target"].min()
+        values = df.loc[keep, columns].to_numpy(dtype=np.float64)
+        keys = [split_key(column) for column in columns]
+        observed = pd.DataFrame(
+            {
+                "station": np.tile([station for _, station in keys], len(values)),
+                "pollutant": np.tile([pollutant for pollutant, _ in keys], len(values)),
+                "target": np.repeat(timestamps[keep], len(columns)),
+                "actual": values.ravel(),
+            }
+        ).dropna(subset=["actual"])
+        return observed.drop_duplicates(KEY_COLUMNS, keep="last")
+
+    def _expire(self):
+        if self.last_observed is None:
+            return
+        latest = pd.Timestamp(self.last_observed)
+        cutoff = latest - pd.Timedelta(hours=self.max_pending_hours)
+        self.pending = self.pending[self.pending["target"] >= cutoff].reset_index(
+            drop=True
+        )
+        start = latest - pd.Timedelta(hours=self.window_hours)
+        self.errors = self.errors[self.errors["target"] > start].reset_index(drop=True)
+
+    def accuracy(self, by=("horizon", "station", "pollutant")):
+        """MAE, RMSE and count of the errors in the window, grouped by *by*"""
+        errors = self.errors.assign(
+            abs_error=self.errors["error"].abs(),
+            squared_error=self.errors["error"] ** 2,
+        )
+        grouped = errors.groupby(list(by)).agg(
+            mae=("abs_error", "mean"),
+            squared_error=("squared_error", "mean"),
+            count=("error", "size"),
+        )
+        grouped["rmse"] = np.sqrt(grouped.pop("squared_error"))
+        return grouped[["mae", "rmse", "count"]]
+
+    def summary(self):
+        """JSON serializable accuracy per horizon"""
+        by_horizon = self.accuracy(by=("horizon",))
+        return {
+            "pending_forecasts": len(self.pending),
+            "scored_forecasts": len(self.errors),
+            "by_horizon": {
+                f"hour_{int(horizon)}": {
+                    "mae": float(row["mae"]),
+                    "rmse": float(row["rmse"]),
+                    "count": int(row["count"]),
+                }
+                for horizon, row in by_horizon.iterrows()
+            },
+        }
+
+    def to_dict(self):
+        """JSON serializable state, restored by from_dict()"""
+
+        def records(frame):
+            frame = frame.copy()
+            frame["target"] = frame["target"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+            return frame.to_dict(orient="list")
+
+        return {
+            "window_hours": self.window_hours,
+            "max_pending_hours": self.max_pending_hours,
+            "last_observed": (
+                pd.Timestamp(self.last_observed).isoformat()
+                if self.last_observed is not None
+                else None
+            ),
+            "pending": records(self.pending),
+            "errors": records(self.errors),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        tracker = cls(
+            window_hours=state["window_hours"],
+            max_pending_hours=state["max_pending_hours"],
+        )
+        if state.get("last_observed"):
+            tracker.last_observed = np.datetime64(state["last_observed"], "ns")
+        for name, columns in (("pending", FORECAST_COLUMNS), ("errors", ERROR_COLUMNS)):
+            frame = pd.DataFrame(state[name], columns=columns)
+            frame["target"] = pd.to_datetime(frame["target"])
+            setattr(tracker, name, frame.astype({c: DTYPES[c] for c in columns}))
+        return tracker
@@ -0,0 +1,102 @@
+"""
+In-process sampling profiler
+
+A daemon thread samples the stacks of all other threads with
+sys._current_frames() at a fixed interval and counts identical stacks.
+The result is written in the collapsed ("folded") format read by
+flamegraph.pl, inferno and speedscope. Nothing runs until a profile is
+started.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from src.config import PROJ_ROOT, REPORTS_DIR
+
+PROFILE_DIR = REPORTS_DIR / "profiles"
+DEFAULT_INTERVAL = 0.005  # seconds
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(str(PROJ_ROOT)):
+        filename = os.path.relpath(filename, PROJ_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, thread_name=None):
+    """Render a frame and its callers as root;...;leaf"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    if thread_name:
+        labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.samples[collapse_stack(frame, names.get(ident))] += 1
+            self.sample_count += 1
+            self._stopped.wait(self.interval)
+
+    def collapsed(self):
+        """Samples in collapsed stack format, one stack per line"""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def save(self, name=None, directory=None):
+        """Write the collapsed profile and return its filename"""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        if name is None:
+            name = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        filename = f"{name}.folded"
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return filename
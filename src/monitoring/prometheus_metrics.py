@@ -0,0 +1,96 @@
+"""
+Prometheus metrics for the API
+
+Metrics live in the default prometheus_client registry and are exposed by
+the /metrics endpoint. Observations are in-process, so nothing here
+blocks on the network.
+"""
+
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from prometheus_client import Gauge, Histogram
+
+from src.monitoring.tracing import span
+
+# Buckets cover sub-millisecond status endpoints up to slow predictions
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+PREDICT_STAGE_LATENCY = Histogram(
+    "predict_stage_duration_seconds",
+    "Time spent in each stage of a prediction request",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_VERSION = Gauge(
+    "model_version", "Registered version of the loaded model (0 if unknown)"
+)
+DATASET_ROWS = Gauge("dataset_rows", "Rows in the loaded dataset", ["data_type"])
+DATASET_AGE = Gauge(
+    "dataset_age_seconds",
+    "Seconds since the newest observation in the loaded dataset",
+    ["data_type"],
+)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a block as one stage of a prediction, traced as predict.<stage>"""
+    start = time.perf_counter()
+    try:
+        with span(f"predict.{stage}"):
+            yield
+    finally:
+        PREDICT_STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def observe_request(method, route, status, seconds):
+    REQUEST_LATENCY.labels(method=method, route=route, status=str(status)).observe(
+        seconds
+    )
+
+
+def observe_dataset(data_type, df):
+    """Record size and freshness of a dataset that was just loaded"""
+    DATASET_ROWS.labels(data_type=data_type).set(len(df))
+    if "Timestamp" not in df or df.empty:
+        return
+    latest = pd.Timestamp(df["Timestamp"].max())
+    if latest.tzinfo is None:
+        latest = latest.tz_localize("UTC")
+    newest = latest.timestamp()
+    # Evaluated on scrape so the age keeps growing between loads
+    DATASET_AGE.labels(data_type=data_type).set_function(lambda: time.time() - newest)
+
+
+def track_model_version(predictor):
+    """Report the version of whichever model *predictor* has loaded"""
+
+    def version():
+        try:
+            return float(predictor.model_version or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    MODEL_VERSION.set_function(version)
@@ -0,0 +1,189 @@
+"""
+Opt-in OpenTelemetry tracing for the ingestion, training and prediction paths
+
+Tracing is off unless TRACE_EXPORTER is set:
+
+- file: one JSON span per line in TRACE_FILE (default reports/traces.jsonl)
+- otlp: OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (needs
+  opentelemetry-exporter-otlp-proto-http)
+- console: print spans to stdout
+
+When tracing is off, or opentelemetry is not installed, span() is a no-op.
+Trace context crosses thread and background task boundaries as a W3C
+traceparent carrier dict (see inject_context / attach_context). Root spans
+of a process started with a TRACEPARENT environment variable, such as a
+flow run launched from a traced request, join that trace.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from src.config import REPORTS_DIR
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace
+    from opentelemetry.propagate import extract, inject
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SpanExporter,
+        SpanExportResult,
+    )
+except ImportError:  # pragma: no cover - tracing is optional
+    trace = None
+    SpanExporter = object
+
+SERVICE_NAME = "air-pollution-prediction"
+logger = logging.getLogger(__name__)
+
+_provider = None
+_tracer = None
+_configured = False
+_lock = threading.Lock()
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Append finished spans to a local JSON lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, spans):
+        lines = [json.dumps(json.loads(span.to_json())) + "\n" for span in spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _build_exporter(name):
+    if name == "file":
+        path = os.getenv("TRACE_FILE", os.path.join(REPORTS_DIR, "traces.jsonl"))
+        return JsonLinesSpanExporter(path)
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            logger.warning(
+                "TRACE_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http"
+            )
+            return None
+        return OTLPSpanExporter()
+    logger.warning(f"Unknown TRACE_EXPORTER: {name}")
+    return None
+
+
+def configure_tracing(exporter=None):
+    """Set up the tracer, from TRACE_EXPORTER unless an exporter is given
+
+    Returns the tracer, or None when tracing stays disabled.
+    """
+    global _provider, _tracer, _configured
+    with _lock:
+        if trace is None:
+            _configured = True
+            return None
+        if exporter is None:
+            name = os.getenv("TRACE_EXPORTER", "").strip().lower()
+            exporter = _build_exporter(name) if name else None
+        if _provider is not None:
+            _provider.shutdown()
+        if exporter is None:
+            _provider = _tracer = None
+        else:
+            _provider = TracerProvider(
+                resource=Resource.create({"service.name": SERVICE_NAME})
+            )
+            _provider.add_span_processor(BatchSpanProcessor(exporter))
+            _tracer = _provider.get_tracer(__name__)
+        _configured = True
+        return _tracer
+
+
+def get_tracer():
+    if not _configured:
+        configure_tracing()
+    return _tracer
+
+
+@contextmanager
+def span(name, **attributes):
+    """Trace a block as a span; yields the span, or None when disabled"""
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    parent = None
+    if not trace.get_current_span().get_span_context().is_valid:
+        # Root spans join the trace of the process that started us, if any
+        parent = _environment_context()
+    with tracer.start_as_current_span(name, context=parent) as current:
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, value)
+        yield current
+
+
+def traced(name=None):
+    """Decorator that runs a function inside a span"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inject_context():
+    """Carrier dict for the current trace context, empty when disabled"""
+    carrier = {}
+    if get_tracer() is not None:
+        inject(carrier)
+    return carrier
+
+
+@contextmanager
+def attach_context(carrier):
+    """Continue the trace described by *carrier* inside this block"""
+    if get_tracer() is None or not carrier:
+        yield
+        return
+    token = otel_context.attach(extract(carrier))
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
+
+
+def _environment_context():
+    traceparent = os.getenv("TRACEPARENT")
+    if not traceparent:
+        return None
+    return extract({"traceparent": traceparent})
+
+
+def flush_tracing():
+    """Export spans that are still buffered"""
+    if _provider is not None:
+        _provider.force_flush()
@@ -0,0 +1,111 @@
+"""
+Tests for content-addressed task caching
+"""
+
+import uuid
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+from prefect import flow
+
+from flows import caching
+from flows.tasks import check_data_quality_task
+from src.data import data_loader
+from src.data.data_loader import DataLoader, file_digest, total_dataset_filename
+
+
+@pytest.fixture
+def interim_dir(tmp_path, monkeypatch):
+    """Point the data loader at an empty interim directory"""
+    monkeypatch.setattr(data_loader, "INTERIM_DATA_DIR", tmp_path)
+    return tmp_path
+
+
+def _write_dataset(directory, data_type="training", rows=24):
+    # Unique values so results cached by earlier test runs never match
+    marker = uuid.uuid4().int % 1000
+    df = pd.DataFrame(
+        {
+            "Timestamp": pd.date_range("2024-01-01", periods=rows, freq="H"),
+            "Nitrogen dioxide_Helsinki Kallio 2": [marker + i for i in range(rows)],
+        }
+    )
+    df.to_parquet(directory / total_dataset_filename(data_type))
+    return df
+
+
+def _context(name="check_data_quality"):
+    context = Mock()
+    context.task.name = name
+    return context
+
+
+class TestCacheKeys:
+    def test_file_digest_follows_content(self, tmp_path):
+        """Test file digests are stable and change with the content"""
+        path = str(tmp_path / "data.bin")
+        with open(path, "wb") as f:
+            f.write(b"first")
+        first = file_digest(path)
+
+        assert file_digest(path) == first
+        with open(path, "wb") as f:
+            f.write(b"second!")
+        assert file_digest(path) != first
+        assert file_digest(str(tmp_path / "missing.bin")) is None
+
+    def test_dataset_key_tracks_content_and_parameters(self, interim_dir):
+        """Test dataset keys change with the data and with parameters"""
+        assert caching.dataset_cache_key(_context(), {"data_type": "training"}) is None
+
+        _write_dataset(interim_dir)
+        key = caching.dataset_cache_key(_context(), {"data_type": "training"})
+        assert key == caching.dataset_cache_key(_context(), {"data_type": "training"})
+        assert key != caching.dataset_cache_key(
+            _context("other"), {"data_type": "training"}
+        )
+
+        _write_dataset(interim_dir)
+        assert key != caching.dataset_cache_key(_context(), {"data_type": "training"})
+
+    @patch("flows.caching.latest_model_version")
+    def test_model_key_requires_registered_model(self, mock_version, interim_dir):
+        """Test model keys follow the registered version"""
+        _write_dataset(interim_dir, data_type="predicting")
+        key_fn = caching.input_cache_key("predicting", model=True)
+
+        mock_version.return_value = (None, None)
+        assert key_fn(_context("validate_model"), {}) is None
+
+        mock_version.return_value = ("3", "run")
+        key = key_fn(_context("validate_model"), {})
+        mock_version.return_value = ("4", "run")
+        assert key_fn(_context("validate_model"), {}) != key
+
+    def test_disabled_without_expiration(self, interim_dir, monkeypatch):
+        """Test TASK_CACHE_MINUTES=0 turns caching off"""
+        _write_dataset(interim_dir)
+        monkeypatch.setattr(caching, "TASK_CACHE_EXPIRATION", None)
+
+        assert caching.dataset_cache_key(_context(), {"data_type": "training"}) is None
+
+
+class TestCachedTasks:
+    def test_quality_check_reuses_result_for_same_data(self, interim_dir):
+        """Test repeated quality checks load the dataset only once"""
+        _write_dataset(interim_dir)
+
+        @flow
+        def check_twice():
+            return [check_data_quality_task(data_type="training") for _ in range(2)]
+
+        load = DataLoader.load_train_dataset
+        with patch.object(
+            DataLoader, "load_train_dataset", autospec=True, side_effect=load
+        ) as mock_load:
+            first, second = check_twice()
+
+        assert first == second
+        assert first["total_rows"] == 24
+        assert mock_load.call_count == 1
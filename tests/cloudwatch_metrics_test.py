@@ -0,0 +1,140 @@
+"""
+Tests for the buffered CloudWatch metric publisher
+"""
+
+import time
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.monitoring.cloudwatch_metrics import (
+    CloudWatchMetrics,
+    CloudWatchSink,
+    InMemorySink,
+    MetricPublisher,
+)
+
+
+class TestMetricPublisher:
+    def test_put_is_buffered_until_flush(self):
+        """Test that put only buffers and flush publishes"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=60)
+
+        publisher.put("Latency", 0.5, unit="Seconds", dimensions={"Route": "/x"})
+
+        assert sink.batches == []
+        assert publisher.pending() == 1
+
+        publisher.flush()
+
+        namespace, batch = sink.batches[0]
+        assert namespace == "PollutionPrediction"
+        assert batch[0]["MetricName"] == "Latency"
+        assert batch[0]["Value"] == 0.5
+        assert batch[0]["StorageResolution"] == 60
+        assert batch[0]["Dimensions"] == [{"Name": "Route", "Value": "/x"}]
+        publisher.close()
+
+    def test_flush_splits_batches(self):
+        """Test batches never exceed the configured size"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=60, max_batch_size=10)
+
+        for i in range(25):
+            publisher.put_datum({"MetricName": "Count", "Value": i})
+        publisher.close()
+
+        assert [len(batch) for _, batch in sink.batches] == [10, 10, 5]
+        assert [d["Value"] for d in sink.datums] == list(range(25))
+
+    def test_background_thread_flushes(self):
+        """Test that buffered datums are published without an explicit flush"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=0.05)
+
+        publisher.put("Count", 1)
+
+        deadline = time.monotonic() + 2
+        while not sink.datums and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(sink.datums) == 1
+        publisher.close()
+
+    def test_statistic_set_and_high_resolution(self):
+        """Test statistic sets aggregate values into one datum"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=60)
+
+        publisher.put_statistics("Latency", [0.1, 0.3, 0.2], high_resolution=True)
+        publisher.close()
+
+        datum = sink.datums[0]
+        assert datum["StorageResolution"] == 1
+        assert datum["StatisticValues"] == {
+            "SampleCount": 3.0,
+            "Sum": 0.6000000000000001,
+            "Minimum": 0.1,
+            "Maximum": 0.3,
+        }
+
+    def test_full_buffer_drops_oldest(self):
+        """Test that a full buffer drops the oldest datums instead of blocking"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=60, max_buffer=3)
+
+        for i in range(5):
+            publisher.put_datum({"MetricName": "Count", "Value": i})
+        publisher.close()
+
+        assert publisher.dropped == 2
+        assert [d["Value"] for d in sink.datums] == [2, 3, 4]
+
+    def test_sink_errors_are_swallowed(self):
+        """Test that publishing failures never reach the caller"""
+        sink = Mock()
+        sink.put_metric_data.side_effect = Exception("throttled")
+        publisher = MetricPublisher(sink=sink, flush_interval=60)
+
+        publisher.put("Count", 1)
+        publisher.close()
+
+        assert publisher.failed == 1
+
+    def test_cloudwatch_sink(self):
+        """Test the CloudWatch sink forwards batches to put_metric_data"""
+        client = Mock()
+        CloudWatchSink(client).put_metric_data("ns", [{"MetricName": "A"}])
+
+        client.put_metric_data.assert_called_once_with(
+            Namespace="ns", MetricData=[{"MetricName": "A"}]
+        )
+
+
+class TestCloudWatchMetrics:
+    def test_put_data_quality_metrics(self):
+        """Test data quality metrics are queued with plain float values"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=60)
+        metrics = CloudWatchMetrics(publisher)
+
+        metrics.put_data_quality_metrics((10, 4), np.int64(3))
+        metrics.flush()
+
+        values = {d["MetricName"]: d["Value"] for d in sink.datums}
+        assert values == {"DataRows": 10.0, "DataColumns": 4.0, "MissingValues": 3.0}
+        assert all(type(v) is float for v in values.values())
+        publisher.close()
+
+    def test_put_flow_execution_metrics(self):
+        """Test flow execution metrics dimensions"""
+        sink = InMemorySink()
+        publisher = MetricPublisher(sink=sink, flush_interval=60)
+
+        CloudWatchMetrics(publisher).put_flow_execution_metrics("flow", "success", 1.5)
+        publisher.close()
+
+        execution, duration = sink.datums
+        assert execution["Value"] == 1.0
+        assert {"Name": "Status", "Value": "success"} in execution["Dimensions"]
+        assert duration["Unit"] == "Seconds"
@@ -4,7 +4,10 @@ Tests for DataIngestion - only tests that use existing methods
 
 from unittest.mock import patch
 
+import pandas as pd
+
 from src.data.data_ingestion import DataIngestion
+from src.data.station_registry import StationRegistry
 
 # Removed unused import
 
@@ -51,3 +54,140 @@ class TestDataIngestion:
         assert hasattr(
             ingestion, "fetch_pollution_data"
         ), "fetch_pollution_data method should exist"
+
+    def test_save_station_frames_local(self, tmp_path):
+        """Test that every station file is written to the raw data dir"""
+        ingestion = DataIngestion(use_s3=False, max_workers=4)
+        frames = {
+            f"Station {i}": pd.DataFrame(
+                {"Timestamp": pd.date_range("2024-01-01", periods=3, freq="h")}
+            )
+            for i in range(5)
+        }
+
+        with patch("src.data.data_ingestion.RAW_DATA_DIR", tmp_path):
+            saved = ingestion._save_station_frames(frames, "training")
+
+        assert len(saved) == 5
+        assert (tmp_path / "Station_3_air_pollution_data_training.parquet").exists()
+
+    def test_save_station_frames_s3_shares_client(self):
+        """Test that parallel S3 uploads reuse a single client"""
+        with patch("src.data.data_ingestion.boto3.client") as mock_client:
+            ingestion = DataIngestion(use_s3=True, max_workers=4)
+            frames = {
+                f"Station {i}": pd.DataFrame({"Timestamp": [1, 2]}) for i in range(6)
+            }
+            saved = ingestion._save_station_frames(frames, "training")
+
+        assert mock_client.call_count == 1
+        assert mock_client.return_value.upload_fileobj.call_count == 6
+        assert "training_data/Station_0_air_pollution_data_training.parquet" in saved
+
+    def test_region_totals_are_partitioned(self, tmp_path):
+        """Test that each region gets its own total file"""
+        ingestion = DataIngestion(
+            regions={
+                "helsinki": {"latitude": 60.17, "longitude": 24.94},
+                "oulu": {"latitude": 65.01, "longitude": 25.47},
+            }
+        )
+        frame = pd.DataFrame(
+            {
+                "Timestamp": pd.date_range("2024-01-01", periods=3, freq="h"),
+                "Nitrogen dioxide": [1.0, 2.0, 3.0],
+                "Particulate matter < 10 µm": [1.0, 2.0, 3.0],
+                "Particulate matter < 2.5 µm": [1.0, 2.0, 3.0],
+            }
+        )
+        total = ingestion._merge_station_frames({"A": frame, "B": frame})
+        assert "Nitrogen dioxide_B" in total.columns
+
+        with patch("src.data.data_ingestion.INTERIM_DATA_DIR", tmp_path):
+            ingestion._save_total_frame(total, "training", "helsinki")
+            ingestion._save_total_frame(total, "training", "oulu")
+
+        assert (tmp_path / "air_pollution_data_training_total.parquet").exists()
+        assert (tmp_path / "air_pollution_data_training_total_oulu.parquet").exists()
+
+    def test_station_missing_an_indicator(self):
+        """Test a station without some indicators gets empty columns for them"""
+        ingestion = DataIngestion(
+            regions={
+                "oulu": {
+                    "latitude": 65.01,
+                    "longitude": 25.47,
+                    "stations": ["Oulu Keskusta"],
+                }
+            }
+        )
+        observations = [
+            {ts: {"Nitrogen dioxide": {"value": value}}}
+            for ts, value in [
+                ("2024-01-01T00:00:00", 1.0),
+                ("2024-01-01T01:00:00", 2.0),
+            ]
+        ]
+
+        frames = ingestion._build_station_frames(
+            "oulu", {"Oulu Keskusta": observations}
+        )
+
+        frame = frames["Oulu Keskusta"]
+        assert list(frame.columns) == ["Timestamp"] + ingestion.air_pollution_indicators
+        assert frame["Nitrogen dioxide"].tolist() == [1.0, 2.0]
+        assert frame["Particulate matter < 10 µm"].isna().all()
+
+    def test_fetch_keeps_configured_regions(self, tmp_path):
+        """Test a run updates the saved multi-region registry instead of replacing it"""
+        registry_file = str(tmp_path / "station_registry.json")
+        StationRegistry(
+            {
+                "helsinki": {"latitude": 60.17, "longitude": 24.94},
+                "oulu": {"latitude": 65.01, "longitude": 25.47},
+            }
+        ).save(registry_file)
+
+        def download(ingestion, region, *args, **kwargs):
+            if region == "oulu":
+                ingestion.registry.update_from_metadata(
+                    "oulu",
+                    {
+                        "Oulu Keskusta": {
+                            "fmisid": 5,
+                            "latitude": 65.01,
+                            "longitude": 25.47,
+                        }
+                    },
+                )
+            return {}
+
+        with patch(
+            "src.data.data_ingestion.REGISTRY_FILE", registry_file
+        ), patch.multiple(
+            DataIngestion,
+            _download_region=download,
+            _build_station_frames=lambda self, region, observations: {},
+            _merge_station_frames=lambda self, frames: pd.DataFrame(),
+            _save_station_frames=lambda self, frames, data_type: [],
+            _save_total_frame=lambda self, df, data_type, region: None,
+        ):
+            ingestion = DataIngestion()
+            totals = ingestion.fetch_pollution_data(week_number=1)
+
+        saved = StationRegistry.load(registry_file)
+        assert list(totals) == ["helsinki", "oulu"]
+        assert ingestion.address is None
+        assert saved.region_names() == ["helsinki", "oulu"]
+        assert saved.stations("oulu") == ["Oulu Keskusta"]
+
+    def test_address_run_leaves_registry_file(self, tmp_path):
+        """Test an explicit address ingests that region without saving the registry"""
+        registry_file = tmp_path / "station_registry.json"
+
+        with patch("src.data.data_ingestion.REGISTRY_FILE", str(registry_file)):
+            ingestion = DataIngestion(address="Tampere")
+
+        assert ingestion.registry.region_names() == ["tampere"]
+        assert ingestion.registry_file is None
+        assert not registry_file.exists()
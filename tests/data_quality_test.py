@@ -0,0 +1,80 @@
+"""
+Tests for the data-quality profiler
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.data_quality import profile_frame, profile_parquet
+
+NO2 = "Nitrogen dioxide_Helsinki Kallio 2"
+PM10 = "Particulate matter < 10 µm_Helsinki Kallio 2"
+
+
+@pytest.fixture
+def hourly_frame():
+    """Two days of hourly data with known defects"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "Timestamp": pd.date_range("2024-01-01", periods=48, freq="H"),
+            NO2: rng.uniform(10, 30, 48),
+            PM10: rng.uniform(10, 30, 48),
+        }
+    )
+    df.loc[5:12, NO2] = 17.0  # stuck sensor for 8 hours
+    df.loc[20:22, PM10] = np.nan
+    df.loc[30, PM10] = -4.0
+    df.loc[31, NO2] = 900.0
+    df = df.drop(index=[40, 41, 42])  # three missing hours
+    return pd.concat([df, df.iloc[[10]]]).sort_values("Timestamp")
+
+
+class TestDataQualityProfiler:
+    def test_detects_known_defects(self, hourly_frame):
+        """Test nulls, ranges, flat lines and index defects are reported"""
+        report = profile_frame(hourly_frame)
+
+        assert report["rows"] == 46
+        assert report["columns"][PM10]["nulls"] == 3
+        assert report["columns"][PM10]["out_of_range"] == 1
+        assert report["columns"][NO2]["out_of_range"] == 1
+        # The duplicated row extends the stuck run by one
+        assert report["columns"][NO2]["max_flat_run"] == 9
+        assert report["columns"][NO2]["flat_line_runs"] == 1
+        assert report["columns"][PM10]["flat_line_runs"] == 0
+        assert report["index"]["duplicate_timestamps"] == 1
+        assert report["index"]["gaps"] == 1
+        assert report["index"]["missing_hours"] == 3
+        assert report["index"]["longest_gap_hours"] == 3
+
+    @pytest.mark.parametrize("chunk_rows", [1, 4, 7, 1000])
+    def test_chunking_does_not_change_the_report(self, hourly_frame, chunk_rows):
+        """Test runs and gaps that span chunk boundaries are kept"""
+        assert profile_frame(hourly_frame, chunk_rows=chunk_rows) == profile_frame(
+            hourly_frame
+        )
+
+    def test_parquet_batches_match_frame(self, hourly_frame, tmp_path):
+        """Test profiling a file batch by batch matches the in-memory report"""
+        path = tmp_path / "data.parquet"
+        hourly_frame.to_parquet(path, index=False)
+
+        assert profile_parquet(path, batch_size=5) == profile_frame(
+            hourly_frame.reset_index(drop=True)
+        )
+
+    def test_datetime_index_without_timestamp_column(self):
+        """Test the hourly index is checked when timestamps are the index"""
+        df = pd.DataFrame(
+            {"NO2": [1.0, 2.0, 3.0]},
+            index=pd.to_datetime(
+                ["2024-01-01 00:00", "2024-01-01 01:00", "2024-01-01 05:00"]
+            ),
+        )
+
+        report = profile_frame(df)
+
+        assert report["total_columns"] == 1
+        assert report["index"]["missing_hours"] == 3
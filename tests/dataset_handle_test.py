@@ -0,0 +1,175 @@
+"""
+Tests for datasets shared between flow tasks
+"""
+
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+
+from src.data import data_loader, dataset_handle
+from src.data.data_loader import total_dataset_filename
+from src.data.dataset_handle import DatasetHandle, open_dataset, register_dataset
+
+
+@pytest.fixture
+def interim_dir(tmp_path, monkeypatch):
+    """Empty interim directory and dataset registry"""
+    monkeypatch.setattr(data_loader, "INTERIM_DATA_DIR", tmp_path)
+    dataset_handle.clear_datasets()
+    yield tmp_path
+    dataset_handle.clear_datasets()
+
+
+def _frame(rows=24, offset=0):
+    return pd.DataFrame(
+        {
+            "Timestamp": pd.date_range("2024-01-01", periods=rows, freq="H"),
+            "Nitrogen dioxide_Helsinki Kallio 2": [offset + i for i in range(rows)],
+        }
+    )
+
+
+def _write(directory, df, data_type="training"):
+    df.to_parquet(directory / total_dataset_filename(data_type), index=False)
+
+
+def _counting_reads():
+    return patch.object(
+        dataset_handle.pd, "read_parquet", wraps=dataset_handle.pd.read_parquet
+    )
+
+
+class TestDatasetHandle:
+    def test_missing_dataset(self, interim_dir):
+        """Test there is no handle for a dataset that was never written"""
+        assert open_dataset("training") is None
+
+    def test_handles_share_one_read(self, interim_dir):
+        """Test every handle to the same data reads the file once"""
+        _write(interim_dir, _frame())
+
+        with _counting_reads() as mock_read:
+            first = open_dataset("training").load()
+            second = open_dataset("training").load()
+
+        assert first is second
+        assert len(first) == 24
+        assert mock_read.call_count == 1
+
+    def test_concurrent_loads_read_once(self, interim_dir):
+        """Test concurrent tasks wait for a single read"""
+        _write(interim_dir, _frame())
+        handle = open_dataset("training")
+        frames = []
+
+        with _counting_reads() as mock_read:
+            threads = [
+                threading.Thread(target=lambda: frames.append(handle.load()))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert mock_read.call_count == 1
+        assert all(frame is frames[0] for frame in frames)
+
+    def test_registered_frame_is_not_read_back(self, interim_dir):
+        """Test a just written frame is shared without reading the file"""
+        df = _frame().set_index(pd.RangeIndex(100, 124))
+        _write(interim_dir, df)
+
+        with _counting_reads() as mock_read:
+            handle = register_dataset(df, "training")
+            frame = handle.load()
+
+        assert mock_read.call_count == 0
+        assert list(frame.index) == list(range(24))
+        assert handle == open_dataset("training")
+
+    def test_changed_file_is_not_loaded_under_old_handle(self, interim_dir):
+        """Test a handle refuses data that changed after it was opened"""
+        _write(interim_dir, _frame())
+        handle = open_dataset("training")
+        _write(interim_dir, _frame(offset=50))
+
+        with pytest.raises(ValueError, match="changed since it was opened"):
+            handle.load()
+        assert open_dataset("training") != handle
+
+    def test_evicted_frame_is_read_again(self, interim_dir, monkeypatch):
+        """Test frames beyond the registry size are reread from disk"""
+        monkeypatch.setattr(dataset_handle, "MAX_FRAMES", 1)
+        _write(interim_dir, _frame(), data_type="training")
+        _write(interim_dir, _frame(offset=5), data_type="predicting")
+
+        with _counting_reads() as mock_read:
+            open_dataset("training").load()
+            open_dataset("predicting").load()
+            open_dataset("training").load()
+
+        assert mock_read.call_count == 3
+
+    def test_chunks_stream_the_file(self, interim_dir):
+        """Test chunks read the dataset in order without loading it"""
+        _write(interim_dir, _frame(rows=50))
+        handle = open_dataset("training")
+
+        with _counting_reads() as mock_read:
+            chunks = handle.chunks(chunk_rows=20)
+            first, second = list(chunks), list(chunks)
+
+        assert mock_read.call_count == 0
+        assert chunks.rows == 50
+        assert [len(chunk) for chunk in first] == [20, 20, 10]
+        pd.testing.assert_frame_equal(
+            pd.concat(second, ignore_index=True), handle.load()
+        )
+
+
+@pytest.fixture
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_handle, "SPILL_DIR", tmp_path / "spill")
+    dataset_handle.clear_datasets()
+    yield tmp_path / "spill"
+    dataset_handle.clear_datasets()
+
+
+class TestS3Spill:
+    @patch("src.data.dataset_handle.DataLoader")
+    def test_download_is_pinned_to_the_handle_version(self, mock_loader, spill_dir):
+        """Test a changed S3 object is not cached under the old digest"""
+        client = mock_loader.return_value.s3_client
+        client.download_file.side_effect = ClientError(
+            {"Error": {"Code": "PreconditionFailed"}}, "GetObject"
+        )
+        handle = DatasetHandle("training", "old", "training_data/x.parquet", True)
+
+        with pytest.raises(ValueError, match="changed since it was opened"):
+            handle.load()
+
+        assert client.download_file.call_args.kwargs["ExtraArgs"] == {
+            "IfMatch": '"old"'
+        }
+        assert list(spill_dir.iterdir()) == []
+
+    def test_spill_of_a_live_handle_is_kept(self, spill_dir):
+        """Test registering a new version keeps files older handles still use"""
+        older = DatasetHandle("training", "v1", "training_data/x.parquet", True)
+        older._spill(_frame())
+        stale = DatasetHandle("training", "v0", "training_data/x.parquet", True)
+        stale._spill(_frame())
+        del stale
+
+        DatasetHandle("training", "v2", "training_data/x.parquet", True)._spill(
+            _frame(offset=5)
+        )
+
+        assert sorted(path.name for path in spill_dir.iterdir()) == [
+            "training_v1.parquet",
+            "training_v2.parquet",
+        ]
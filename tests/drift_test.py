@@ -0,0 +1,107 @@
+"""
+Tests for streaming drift detection
+"""
+
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flows.tasks import check_drift_task
+from src.monitoring.drift import StreamingDriftDetector
+from src.monitoring.evidently_monitoring import ModelMonitor
+
+COLUMNS = [f"Nitrogen dioxide_Station {i}" for i in range(4)]
+
+
+def _frame(rows, mean=20.0, seed=0, start="2024-01-01"):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(mean, 5, (rows, len(COLUMNS))), columns=COLUMNS)
+    df.insert(0, "Timestamp", pd.date_range(start, periods=rows, freq="H"))
+    return df
+
+
+def _stream(detector, df):
+    for i in range(len(df)):
+        detector.update(df.iloc[[i]])
+    return detector
+
+
+class TestStreamingDriftDetector:
+    def test_no_drift_on_same_distribution(self):
+        """Test hourly batches from the reference distribution do not drift"""
+        detector = StreamingDriftDetector.fit(_frame(2000))
+
+        result = _stream(detector, _frame(168, seed=1)).check()
+
+        assert result["dataset_drift"] is False
+        assert result["evaluated_features"] == len(COLUMNS)
+
+    def test_drift_on_shifted_distribution(self):
+        """Test a shifted window drifts and is forgotten once it leaves"""
+        detector = StreamingDriftDetector.fit(_frame(2000), window_batches=48)
+
+        _stream(detector, _frame(48, mean=30, seed=1))
+        drifted = detector.check()
+        _stream(detector, _frame(48, seed=2))
+        recovered = detector.check()
+
+        assert drifted["dataset_drift"] is True
+        assert drifted["features"][COLUMNS[0]]["psi"] > 0.2
+        assert recovered["dataset_drift"] is False
+        assert len(detector.window) == 48
+        assert detector.current.sum() == 48 * len(COLUMNS)
+
+    def test_too_few_samples_are_not_evaluated(self):
+        """Test nothing drifts before min_samples rows arrived"""
+        detector = StreamingDriftDetector.fit(_frame(2000))
+
+        result = _stream(detector, _frame(5, mean=50)).check()
+
+        assert result["evaluated_features"] == 0
+        assert result["dataset_drift"] is False
+
+    def test_state_round_trips_through_json(self):
+        """Test a restored detector continues where the saved one stopped"""
+        detector = _stream(StreamingDriftDetector.fit(_frame(500)), _frame(30))
+
+        restored = StreamingDriftDetector.from_dict(
+            json.loads(json.dumps(detector.to_dict()))
+        )
+
+        assert restored.check() == detector.check()
+
+    def test_model_monitor_runs_without_evidently(self):
+        """Test ModelMonitor.check_drift uses the sketches"""
+        monitor = ModelMonitor()
+
+        assert monitor.check_drift(_frame(500), _frame(100, mean=40)) is True
+        assert monitor.check_drift(_frame(500), _frame(100, seed=3)) is False
+
+
+class TestCheckDriftTask:
+    @pytest.fixture
+    def state_file(self, tmp_path):
+        with patch("flows.tasks.DRIFT_STATE_FILE", tmp_path / "drift.json"):
+            yield tmp_path / "drift.json"
+
+    @patch("flows.tasks.DataLoader")
+    def test_adds_only_new_hours(self, mock_data_loader, state_file):
+        """Test each run adds the rows newer than the previous run"""
+        loader = mock_data_loader.return_value
+        loader.dataset_digest.return_value = "reference"
+        loader.load_train_dataset.return_value = _frame(500)
+        loader.load_predicting_dataset.return_value = _frame(30, start="2024-03-01")
+
+        first = check_drift_task.fn()
+        loader.load_predicting_dataset.return_value = _frame(32, start="2024-03-01")
+        second = check_drift_task.fn()
+
+        assert first["new_rows"] == 30
+        assert second["new_rows"] == 2
+        assert second["current_samples"] == 32
+        # The reference is built once while the training data is unchanged
+        loader.load_train_dataset.assert_called_once()
+        assert json.loads(state_file.read_text())["reference_digest"] == "reference"
@@ -0,0 +1,108 @@
+"""
+Tests for the memory-mapped feature matrix store
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.feature_store import FeatureStore
+from src.models.pollution_predictor import PollutionPredictor
+
+
+def _hourly_data(periods, start="2024-01-01"):
+    dates = pd.date_range(start=start, periods=periods, freq="h")
+    hours = np.arange(periods)
+    return pd.DataFrame(
+        {
+            "Timestamp": dates,
+            "Nitrogen dioxide_Helsinki Kallio 2": 20 + 5 * np.sin(hours / 4),
+            "Particulate matter < 10 µm_Helsinki Kallio 2": 25 + 3 * np.cos(hours / 6),
+            "Particulate matter < 2.5 µm_Helsinki Kallio 2": 12 + np.sin(hours / 3),
+        }
+    )
+
+
+@pytest.fixture
+def predictor():
+    return PollutionPredictor()
+
+
+class TestFeatureStore:
+    def test_matrices_match_prepare_sequences(self, predictor, tmp_path):
+        """Test stored windows are the ones prepare_sequences builds"""
+        data = _hourly_data(200)
+        expected_X, expected_y = predictor.prepare_sequences(data)
+
+        with patch("src.models.feature_store.CHUNK_ROWS", 16):
+            X, y = FeatureStore(root=tmp_path).matrices(predictor, data)
+
+        assert isinstance(X, np.memmap)
+        np.testing.assert_array_equal(X, expected_X)
+        np.testing.assert_array_equal(y, expected_y)
+
+    def test_built_once_per_dataset_and_window(self, predictor, tmp_path):
+        """Test a second call reuses the entry and a new config builds one"""
+        store = FeatureStore(root=tmp_path)
+        data = _hourly_data(100)
+        store.matrices(predictor, data, digest="v1")
+
+        with patch("src.models.feature_store.write_windows") as mock_write:
+            store.matrices(predictor, data, digest="v1")
+            mock_write.assert_not_called()
+
+        store.matrices(PollutionPredictor(training_hours=12), data, digest="v1")
+        store.matrices(predictor, data, digest="v2")
+        assert len(list(tmp_path.iterdir())) == 3
+
+    def test_float32_halves_the_footprint(self, predictor, tmp_path):
+        """Test float32 entries hold the same windows in half the bytes"""
+        data = _hourly_data(100)
+        X64, _ = FeatureStore(root=tmp_path).matrices(predictor, data)
+        X32, _ = FeatureStore(root=tmp_path, dtype="float32").matrices(predictor, data)
+
+        assert X32.dtype == np.float32
+        assert X32.nbytes * 2 == X64.nbytes
+        np.testing.assert_allclose(X32, X64, rtol=1e-6)
+
+    def test_follows_predictor_precision(self, tmp_path):
+        """Test entries use the predictor's dtype unless one is configured"""
+        data = _hourly_data(100)
+        predictor = PollutionPredictor(precision="float32")
+
+        X, y = FeatureStore(root=tmp_path).matrices(predictor, data)
+        X64, _ = FeatureStore(root=tmp_path, dtype="float64").matrices(predictor, data)
+
+        assert X.dtype == np.float32 and y.dtype == np.float32
+        assert X64.dtype == np.float64
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_least_recently_used_entries_are_pruned(self, predictor, tmp_path):
+        """Test only max_entries entries stay on disk"""
+        store = FeatureStore(root=tmp_path, max_entries=2)
+        data = _hourly_data(60)
+        for version in ["v1", "v2", "v3"]:
+            store.matrices(predictor, data, digest=version)
+
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_too_little_data(self, predictor, tmp_path):
+        """Test a dataset shorter than one window is rejected"""
+        with pytest.raises(ValueError, match="Not enough data"):
+            FeatureStore(root=tmp_path).matrices(predictor, _hourly_data(20))
+        assert list(tmp_path.iterdir()) == []
+
+    @patch("mlflow.start_run")
+    def test_training_from_the_store(self, mock_start_run, mock_mlflow, tmp_path):
+        """Test training on stored matrices gives the in-memory result"""
+        data = _hourly_data(300)
+
+        in_memory = PollutionPredictor().train(data)
+        stored = PollutionPredictor().train(
+            data, feature_store=FeatureStore(root=tmp_path), dataset_digest="v1"
+        )
+
+        assert stored["mae"] == pytest.approx(in_memory["mae"])
+        assert stored["training_samples"] == in_memory["training_samples"]
@@ -11,6 +11,7 @@ import pytest
 # Mock Prefect imports to avoid dependency issues in testing
 try:
     from flows.main_flows import (
+        full_mlops_pipeline_flow,
         monitoring_pipeline_flow,
         prediction_pipeline_flow,
         training_pipeline_flow,
@@ -19,6 +20,9 @@ try:
         check_data_quality_task,
         collect_prediction_data_task,
         collect_training_data_task,
+        evaluate_model_task,
+        load_monitoring_state,
+        save_monitoring_state,
         train_model_task,
         validate_model_task,
     )
@@ -28,30 +32,39 @@ except ImportError:
     PREFECT_AVAILABLE = False
 
 
+def _submitted(mock_task):
+    """Result accessor of the futures returned by a mocked task's submit()"""
+    return mock_task.submit.return_value.result
+
+
 @pytest.mark.skipif(not PREFECT_AVAILABLE, reason="Prefect not available")
 class TestPrefectTasks:
+    @patch("flows.tasks.register_dataset")
     @patch("flows.tasks.DataIngestion")
     @patch("flows.tasks.DataLoader")
     def test_collect_training_data_task_success(
-        self, mock_data_loader, mock_data_ingestion
+        self, mock_data_loader, mock_data_ingestion, mock_register
     ):
         """Test successful training data collection task"""
         # Mock data ingestion
         mock_ingestion_instance = Mock()
-        mock_data_ingestion.return_value = mock_ingestion_instance
-
-        # Mock data loader
-        mock_loader_instance = Mock()
+        mock_ingestion_instance.registry.default_region = "helsinki"
         sample_df = pd.DataFrame({"test": [1, 2, 3]})
-        mock_loader_instance.load_train_dataset.return_value = sample_df
-        mock_data_loader.return_value = mock_loader_instance
+        mock_ingestion_instance.fetch_pollution_data.return_value = {
+            "helsinki": sample_df
+        }
+        mock_data_ingestion.return_value = mock_ingestion_instance
 
         result = collect_training_data_task.fn(chunk_size_hours=168, week_number=2)
 
         assert result["status"] == "success"
         assert result["records_collected"] == 3
+        assert result["dataset"] == mock_register.return_value
         assert "timestamp" in result
         mock_ingestion_instance.fetch_pollution_data.assert_called_once()
+        # The collected frame is handed on, not read back from storage
+        mock_register.assert_called_once_with(sample_df, "training", use_s3=False)
+        mock_data_loader.return_value.load_train_dataset.assert_not_called()
 
     @patch("flows.tasks.DataIngestion")
     @patch("flows.tasks.DataLoader")
@@ -69,28 +82,30 @@ class TestPrefectTasks:
         with pytest.raises(Exception, match="API Error"):
             collect_training_data_task.fn(chunk_size_hours=168, week_number=2)
 
+    @patch("flows.tasks.register_dataset")
     @patch("flows.tasks.DataIngestion")
-    @patch("flows.tasks.DataLoader")
     def test_collect_prediction_data_task_success(
-        self, mock_data_loader, mock_data_ingestion
+        self, mock_data_ingestion, mock_register
     ):
         """Test successful prediction data collection task"""
         # Mock data ingestion
         mock_ingestion_instance = Mock()
-        mock_data_ingestion.return_value = mock_ingestion_instance
-
-        # Mock data loader
-        mock_loader_instance = Mock()
+        mock_ingestion_instance.registry.default_region = "helsinki"
         sample_df = pd.DataFrame({"test": [1, 2, 3, 4, 5]})
-        mock_loader_instance.load_predicting_dataset.return_value = sample_df
-        mock_data_loader.return_value = mock_loader_instance
+        mock_ingestion_instance.fetch_pollution_data.return_value = {
+            "helsinki": sample_df
+        }
+        mock_data_ingestion.return_value = mock_ingestion_instance
 
         result = collect_prediction_data_task.fn(chunk_size_hours=48, week_number=1)
 
         assert result["status"] == "success"
         assert result["records_collected"] == 5
         assert "timestamp" in result
-        mock_ingestion_instance.fetch_pollution_data.assert_called_once()
+        mock_ingestion_instance.fetch_pollution_data.assert_called_once_with(
+            data_type="predicting", chunk_size_hours=48, week_number=1
+        )
+        mock_register.assert_called_once_with(sample_df, "predicting", use_s3=False)
 
     @patch("flows.tasks.PollutionPredictor")
     @patch("flows.tasks.DataLoader")
@@ -113,6 +128,24 @@ class TestPrefectTasks:
         assert result == mock_metrics
         mock_predictor_instance.train.assert_called_once_with(sample_df)
 
+    @patch("flows.tasks.TRAIN_CHUNK_ROWS", 2160)
+    @patch("flows.tasks.PollutionPredictor")
+    @patch("flows.tasks.DataLoader")
+    def test_train_model_task_out_of_core(self, mock_data_loader, mock_predictor):
+        """Test a chunk size streams the dataset instead of loading it"""
+        dataset = Mock()
+        mock_predictor.return_value.train_chunked.return_value = {"mae": 1.0}
+
+        result = train_model_task.fn(dataset=dataset)
+
+        assert result == {"mae": 1.0}
+        dataset.chunks.assert_called_once_with(2160)
+        dataset.load.assert_not_called()
+        mock_predictor.return_value.train_chunked.assert_called_once_with(
+            dataset.chunks.return_value
+        )
+        mock_data_loader.return_value.load_train_dataset.assert_not_called()
+
     @patch("flows.tasks.DataLoader")
     def test_train_model_task_no_data(self, mock_data_loader):
         """Test model training task with no data"""
@@ -147,6 +180,31 @@ class TestPrefectTasks:
         assert result["status"] == "success"
         assert "timestamp" in result
 
+    @patch("flows.tasks.MlflowClient")
+    @patch("flows.tasks.PollutionPredictor")
+    @patch("flows.tasks.DataLoader")
+    def test_evaluate_model_task_scores_prediction_data(
+        self, mock_data_loader, mock_predictor, mock_client
+    ):
+        """Test the model is scored on prediction data after its training data"""
+        hours = pd.date_range("2024-01-01", periods=130, freq="h")
+        training = pd.DataFrame({"Timestamp": hours[:100], "NO": 1.0})
+        predicting = pd.DataFrame({"Timestamp": hours[90:], "NO": 2.0})
+        mock_data_loader.return_value.load_train_dataset.return_value = training
+        mock_data_loader.return_value.load_predicting_dataset.return_value = predicting
+        predictor = mock_predictor.return_value
+        predictor.load_model_from_mlflow.return_value = True
+        predictor.evaluate.return_value = {"mae": 4.0, "samples": 30}
+        mock_client.return_value.get_run.return_value.data.metrics = {"mae": 2.0}
+
+        result = evaluate_model_task.fn()
+
+        history = predictor.evaluate.call_args.args[0]
+        assert history["Timestamp"].tolist() == list(hours)
+        assert (history["NO"].iloc[90:] == 2.0).all()
+        predictor.predict.assert_called_once_with(predicting)
+        assert result["degraded"] is True
+
     @patch("flows.tasks.DataLoader")
     def test_check_data_quality_task_training(self, mock_data_loader):
         """Test data quality check for training data"""
@@ -198,6 +256,31 @@ class TestPrefectTasks:
         assert result["passed"] is True  # Still passes with 10% missing
         assert result["quality_score"] == 100  # Threshold is 10%, so still 100
 
+    @patch("flows.tasks.DataLoader")
+    def test_check_data_quality_task_read_error(self, mock_data_loader):
+        """Test read errors are raised for a retry instead of cached as a verdict"""
+        mock_data_loader.return_value.load_train_dataset.side_effect = OSError(
+            "Connection reset"
+        )
+
+        with pytest.raises(OSError, match="Connection reset"):
+            check_data_quality_task.fn(data_type="training")
+
+    def test_failed_state_save_keeps_previous_state(self, tmp_path):
+        """Test state files are replaced whole, never left partly written"""
+        state_file = tmp_path / "state.json"
+        broken = {"fingerprint": {}}
+        broken["fingerprint"]["loop"] = broken
+
+        with patch("flows.tasks.MONITORING_STATE_FILE", state_file):
+            save_monitoring_state({"fingerprint": {"model_version": "3"}})
+            with pytest.raises(ValueError):
+                save_monitoring_state(broken)
+            state = load_monitoring_state()
+
+        assert state == {"fingerprint": {"model_version": "3"}}
+        assert [path.name for path in tmp_path.iterdir()] == ["state.json"]
+
 
 @pytest.mark.skipif(not PREFECT_AVAILABLE, reason="Prefect not available")
 class TestPrefectFlows:
@@ -227,10 +310,127 @@ class TestPrefectFlows:
         mock_collect.assert_called_once_with(
             chunk_size_hours=168, week_number=2, force_refresh=True
         )
-        mock_quality.assert_called_once_with(data_type="training")
-        mock_train.assert_called_once()
+        mock_quality.assert_called_once_with(data_type="training", dataset=None)
+        mock_train.assert_called_once_with(model_type="lasso", dataset=None)
         mock_validate.assert_called_once()
 
+    @patch("flows.main_flows.collect_training_data_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.main_flows.update_model_task")
+    @patch("flows.main_flows.train_model_task")
+    @patch("flows.main_flows.validate_model_task")
+    def test_training_pipeline_flow_registers_sgd_model(
+        self, mock_validate, mock_train, mock_update, mock_quality, mock_collect
+    ):
+        """Test a full training can register an updatable SGD model"""
+        mock_collect.return_value = {"status": "success"}
+        mock_quality.return_value = {"passed": True}
+        mock_validate.return_value = {"model_loaded": True}
+
+        training_pipeline_flow(model_type="sgd")
+
+        mock_train.assert_called_once_with(model_type="sgd", dataset=None)
+        mock_update.assert_not_called()
+
+    @patch("flows.main_flows.collect_training_data_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.main_flows.update_model_task")
+    @patch("flows.main_flows.train_model_task")
+    @patch("flows.main_flows.validate_model_task")
+    def test_training_pipeline_flow_incremental(
+        self, mock_validate, mock_train, mock_update, mock_quality, mock_collect
+    ):
+        """Test incremental training updates instead of refitting"""
+        mock_collect.return_value = {"status": "success"}
+        mock_quality.return_value = {"passed": True}
+        mock_update.return_value = {"updated": True, "new_samples": 24}
+        mock_validate.return_value = {"model_loaded": True}
+
+        result = training_pipeline_flow(incremental=True)
+
+        assert result["training"] == {"updated": True, "new_samples": 24}
+        mock_update.assert_called_once_with(drift_threshold=1.0, dataset=None)
+        mock_train.assert_not_called()
+
+    @patch("flows.main_flows.collect_training_data_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.main_flows.update_model_task")
+    @patch("flows.main_flows.train_model_task")
+    @patch("flows.main_flows.validate_model_task")
+    def test_training_pipeline_flow_incremental_refit_on_drift(
+        self, mock_validate, mock_train, mock_update, mock_quality, mock_collect
+    ):
+        """Test incremental training falls back to a full refit on drift"""
+        mock_collect.return_value = {"status": "success"}
+        mock_quality.return_value = {"passed": True}
+        mock_update.return_value = {
+            "updated": False,
+            "reason": "drift",
+            "model_type": "sgd",
+        }
+        mock_train.return_value = {"r2_score": 0.8}
+        mock_validate.return_value = {"model_loaded": True}
+
+        result = training_pipeline_flow(incremental=True)
+
+        assert result["training"] == {"r2_score": 0.8}
+        mock_train.assert_called_once_with(model_type="sgd", dataset=None)
+
+    @patch("flows.main_flows.collect_training_data_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.main_flows.update_model_task")
+    @patch("flows.main_flows.train_model_task")
+    @patch("flows.main_flows.validate_model_task")
+    def test_training_pipeline_flow_incremental_without_new_data(
+        self, mock_validate, mock_train, mock_update, mock_quality, mock_collect
+    ):
+        """Test incremental training keeps the model when nothing is new"""
+        mock_collect.return_value = {"status": "success"}
+        mock_quality.return_value = {"passed": True}
+        no_new_data = {
+            "updated": False,
+            "reason": "no_new_data",
+            "new_samples": 0,
+            "model_type": "sgd",
+        }
+        mock_update.return_value = no_new_data
+        mock_validate.return_value = {"model_loaded": True}
+
+        result = training_pipeline_flow(incremental=True)
+
+        assert result["pipeline_status"] == "success"
+        assert result["training"] == no_new_data
+        mock_train.assert_not_called()
+
+    @patch("flows.main_flows.collect_training_data_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.main_flows.update_model_task")
+    @patch("flows.main_flows.train_model_task")
+    @patch("flows.main_flows.validate_model_task")
+    def test_training_pipeline_flow_incremental_keeps_model_type(
+        self, mock_validate, mock_train, mock_update, mock_quality, mock_collect
+    ):
+        """Test a Lasso model is refit as Lasso, and a first model as SGD"""
+        mock_collect.return_value = {"status": "success"}
+        mock_quality.return_value = {"passed": True}
+        mock_update.side_effect = [
+            {
+                "updated": False,
+                "reason": "model_not_incremental",
+                "model_type": "lasso",
+            },
+            {"updated": False, "reason": "no_model"},
+        ]
+        mock_validate.return_value = {"model_loaded": True}
+
+        training_pipeline_flow(incremental=True)
+        training_pipeline_flow(incremental=True)
+
+        assert [c.kwargs["model_type"] for c in mock_train.call_args_list] == [
+            "lasso",
+            "sgd",
+        ]
+
     @patch("flows.main_flows.collect_training_data_task")
     @patch("flows.main_flows.check_data_quality_task")
     def test_training_pipeline_flow_quality_failure(self, mock_quality, mock_collect):
@@ -249,18 +449,166 @@ class TestPrefectFlows:
 
     @patch("flows.main_flows.collect_prediction_data_task")
     @patch("flows.main_flows.check_data_quality_task")
-    def test_prediction_pipeline_flow_success(self, mock_quality, mock_collect):
+    @patch("flows.main_flows.track_forecast_accuracy_task")
+    @patch("flows.main_flows.compact_prediction_archive_task")
+    def test_prediction_pipeline_flow_success(
+        self, mock_compact, mock_accuracy, mock_quality, mock_collect
+    ):
         """Test successful prediction pipeline flow"""
         # Mock task results
         mock_collect.return_value = {"status": "success", "records": 48}
         mock_quality.return_value = {"passed": True, "quality_score": 90}
+        mock_accuracy.return_value = {"matched": 18, "status": "success"}
 
         result = prediction_pipeline_flow(chunk_size_hours=48, week_number=1)
 
         assert result["pipeline_status"] == "success"
         assert "data_collection" in result
         assert "quality_check" in result
+        assert result["forecast_accuracy"]["matched"] == 18
 
         # Verify task calls
         mock_collect.assert_called_once_with(chunk_size_hours=48, week_number=1)
-        mock_quality.assert_called_once_with(data_type="predicting")
+        mock_quality.assert_called_once_with(data_type="predicting", dataset=None)
+        mock_accuracy.assert_called_once_with(dataset=None)
+        mock_compact.assert_called_once_with()
+
+    @patch("flows.main_flows.training_pipeline_flow")
+    @patch("flows.main_flows.evaluate_model_task")
+    @patch("flows.main_flows.fingerprint_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    def test_monitoring_pipeline_flow_skips_when_unchanged(
+        self, mock_quality, mock_fingerprint, mock_evaluate, mock_training, tmp_path
+    ):
+        """Test monitoring reuses the last evaluation when nothing changed"""
+        _submitted(mock_quality).return_value = {"passed": True, "quality_score": 90}
+        _submitted(mock_fingerprint).return_value = {
+            "training_data": "abc",
+            "model_version": "3",
+            "model_run_id": "run",
+        }
+        evaluation = {
+            "model_loaded": True,
+            "evaluation": {"mae": 1.0, "samples": 10},
+            "degraded": False,
+        }
+        _submitted(mock_evaluate).return_value = evaluation
+
+        with patch("flows.tasks.MONITORING_STATE_FILE", tmp_path / "state.json"):
+            first = monitoring_pipeline_flow()
+            second = monitoring_pipeline_flow()
+
+        assert first["unchanged"] is False
+        assert second["unchanged"] is True
+        assert second["model_validation"] == evaluation
+        mock_evaluate.submit.assert_called_once()
+        mock_training.assert_not_called()
+
+    @patch("flows.main_flows.training_pipeline_flow")
+    @patch("flows.main_flows.evaluate_model_task")
+    @patch("flows.main_flows.fingerprint_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    def test_monitoring_pipeline_flow_retrains_when_degraded(
+        self, mock_quality, mock_fingerprint, mock_evaluate, mock_training, tmp_path
+    ):
+        """Test monitoring retrains only when the model degraded on new data"""
+        _submitted(mock_quality).return_value = {"passed": True, "quality_score": 90}
+        _submitted(mock_fingerprint).side_effect = [
+            {"training_data": "abc", "model_version": "3", "model_run_id": "run"},
+            {"training_data": "def", "model_version": "3", "model_run_id": "run"},
+        ]
+        _submitted(mock_evaluate).side_effect = [
+            {"model_loaded": True, "evaluation": {"mae": 1.0}, "degraded": False},
+            {"model_loaded": True, "evaluation": {"mae": 9.0}, "degraded": True},
+        ]
+        mock_training.return_value = {"pipeline_status": "success"}
+
+        with patch("flows.tasks.MONITORING_STATE_FILE", tmp_path / "state.json"):
+            first = monitoring_pipeline_flow()
+            second = monitoring_pipeline_flow()
+
+        assert first["retrain_needed"] is False
+        assert second["unchanged"] is False
+        assert second["retrain_reasons"] == ["Model performance degraded on new data"]
+        assert mock_evaluate.submit.call_count == 2
+        mock_training.assert_called_once()
+
+    @patch("flows.main_flows.training_pipeline_flow")
+    @patch("flows.main_flows.evaluate_model_task")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.tasks.latest_model_version", return_value=("3", "run"))
+    @patch("flows.tasks.DataLoader")
+    def test_monitoring_pipeline_flow_evaluates_new_prediction_data(
+        self,
+        mock_data_loader,
+        mock_version,
+        mock_quality,
+        mock_evaluate,
+        mock_training,
+        tmp_path,
+    ):
+        """Test new prediction data is evaluated while training data is unchanged"""
+        digests = {"training": "abc", "predicting": "p1"}
+        mock_data_loader.return_value.dataset_digest.side_effect = digests.get
+        _submitted(mock_quality).return_value = {"passed": True, "quality_score": 90}
+        _submitted(mock_evaluate).side_effect = [
+            {"model_loaded": True, "evaluation": {"mae": 1.0}, "degraded": False},
+            {"model_loaded": True, "evaluation": {"mae": 9.0}, "degraded": True},
+        ]
+        mock_training.return_value = {"pipeline_status": "success"}
+
+        with patch("flows.tasks.MONITORING_STATE_FILE", tmp_path / "state.json"):
+            first = monitoring_pipeline_flow()
+            unchanged = monitoring_pipeline_flow()
+            digests["predicting"] = "p2"
+            refreshed = monitoring_pipeline_flow()
+
+        assert first["retrain_needed"] is False
+        assert unchanged["unchanged"] is True
+        assert refreshed["unchanged"] is False
+        assert refreshed["fingerprint"]["training_data"] == "abc"
+        assert refreshed["retrain_reasons"] == [
+            "Model performance degraded on new data"
+        ]
+        assert mock_evaluate.submit.call_count == 2
+        mock_training.assert_called_once()
+
+    @patch("flows.main_flows.compact_prediction_archive_task")
+    @patch("flows.main_flows.track_forecast_accuracy_task")
+    @patch("flows.main_flows.training_pipeline_flow")
+    @patch("flows.main_flows.monitoring_pipeline_flow")
+    @patch("flows.main_flows.check_data_quality_task")
+    @patch("flows.main_flows.collect_prediction_data_task")
+    def test_full_pipeline_refreshes_prediction_data_after_monitoring(
+        self,
+        mock_collect,
+        mock_quality,
+        mock_monitoring,
+        mock_training,
+        mock_accuracy,
+        mock_compact,
+    ):
+        """Test the prediction refresh runs alongside training, not monitoring"""
+        calls = []
+        dataset = Mock()
+        collection = mock_collect.submit.return_value
+        collection.result.return_value = {"status": "success", "dataset": dataset}
+        mock_collect.submit.side_effect = lambda **kwargs: (
+            calls.append("collect") or collection
+        )
+        mock_monitoring.side_effect = lambda: calls.append("monitoring") or {}
+        mock_training.side_effect = lambda **kwargs: (
+            calls.append("training") or {"pipeline_status": "success"}
+        )
+        mock_quality.return_value = {"passed": True}
+        mock_accuracy.return_value = {"matched": 18}
+
+        result = full_mlops_pipeline_flow()
+
+        assert calls == ["monitoring", "collect", "training"]
+        mock_quality.assert_called_once_with(data_type="predicting", dataset=dataset)
+        mock_accuracy.assert_called_once_with(dataset=dataset)
+        mock_compact.assert_called_once_with()
+        assert result["prediction_data"]["pipeline_status"] == "success"
+        assert result["prediction_data"]["forecast_accuracy"] == {"matched": 18}
+        assert result["training"] == {"pipeline_status": "success"}
@@ -0,0 +1,144 @@
+"""
+Tests for online forecast accuracy tracking
+"""
+
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flows.tasks import track_forecast_accuracy_task
+from src.data.prediction_archive import PredictionArchive
+from src.monitoring.forecast_accuracy import ForecastAccuracyTracker
+
+COLUMNS = [
+    "Nitrogen dioxide_Station A",
+    "Particulate matter < 10 µm_Station A",
+    "Nitrogen dioxide_Station B",
+]
+
+
+def _observations(rows, start="2024-01-01"):
+    df = pd.DataFrame(
+        np.arange(rows * len(COLUMNS), dtype=float).reshape(rows, len(COLUMNS)),
+        columns=COLUMNS,
+    )
+    df.insert(0, "Timestamp", pd.date_range(start, periods=rows, freq="h"))
+    return df
+
+
+def _forecast(issued, value=0.0, n_steps=6):
+    """Prediction in the format returned by PollutionPredictor.predict()"""
+    issued = pd.Timestamp(issued)
+    return {
+        "prediction_timestamp": issued.isoformat(),
+        "predictions": {
+            column.replace("Particulate matter < ", "PM").replace(" µm", ""): {
+                f"hour_{j}": {
+                    "value": value,
+                    "timestamp": (issued + pd.Timedelta(hours=j)).isoformat(),
+                }
+                for j in range(1, n_steps + 1)
+            }
+            for column in COLUMNS
+        },
+    }
+
+
+class TestForecastAccuracyTracker:
+    def test_scores_forecasts_as_observations_arrive(self):
+        """Test forecasts are matched only once their target hour is observed"""
+        df = _observations(30)
+        tracker = ForecastAccuracyTracker()
+        assert tracker.add_forecast(_forecast(df["Timestamp"][9])) == 18
+
+        assert tracker.observe(df.iloc[:12]) == 6
+        assert len(tracker.pending) == 12
+        assert tracker.observe(df) == 12
+        assert tracker.pending.empty
+
+        accuracy = tracker.accuracy()
+        # Forecasts of 0 miss by the observed value
+        expected = df.loc[10, COLUMNS[0]]
+        assert accuracy.loc[(1, "Station A", "Nitrogen dioxide"), "mae"] == expected
+        assert accuracy.loc[(6, "Station B", "Nitrogen dioxide"), "count"] == 1
+        assert set(accuracy.index.get_level_values("pollutant")) == {
+            "Nitrogen dioxide",
+            "PM10",
+        }
+
+    def test_rolling_window_and_expiry(self):
+        """Test old errors leave the window and unmatched forecasts expire"""
+        tracker = ForecastAccuracyTracker(window_hours=24, max_pending_hours=12)
+        tracker.add_forecast(_forecast("2024-01-01 05:00"))
+        tracker.observe(_observations(8))
+        assert len(tracker.errors) == 6
+
+        # Forecast for hours that never get observed
+        tracker.add_forecast(_forecast("2024-01-01 20:00"))
+        tracker.observe(_observations(10, start="2024-01-02 20:00"))
+
+        assert tracker.errors.empty
+        assert tracker.pending.empty
+
+    def test_repeated_forecast_replaces_outstanding_one(self):
+        """Test issuing the same forecast twice keeps one row per horizon"""
+        tracker = ForecastAccuracyTracker()
+        tracker.add_forecast(_forecast("2024-01-01 05:00"))
+        tracker.add_forecast(_forecast("2024-01-01 05:00", value=1.0))
+
+        assert len(tracker.pending) == 18
+        assert (tracker.pending["value"] == 1.0).all()
+
+    def test_state_round_trips_through_json(self):
+        """Test a restored tracker continues where the saved one stopped"""
+        tracker = ForecastAccuracyTracker()
+        tracker.add_forecast(_forecast("2024-01-01 09:00"))
+        tracker.observe(_observations(12))
+
+        restored = ForecastAccuracyTracker.from_dict(
+            json.loads(json.dumps(tracker.to_dict()))
+        )
+
+        assert restored.summary() == tracker.summary()
+        assert restored.observe(_observations(30)) == 12
+        assert restored.summary()["by_horizon"]["hour_6"]["count"] == 3
+
+
+class TestTrackForecastAccuracyTask:
+    @pytest.fixture
+    def state_file(self, tmp_path):
+        archive_dir = str(tmp_path / "archive")
+        with patch(
+            "flows.tasks.FORECAST_STATE_FILE", tmp_path / "forecast.json"
+        ), patch("src.data.prediction_archive.PREDICTION_ARCHIVE_DIR", archive_dir):
+            yield tmp_path / "forecast.json"
+
+    @patch("flows.tasks.PollutionPredictor")
+    @patch("flows.tasks.DataLoader")
+    def test_scores_previous_run_forecasts(
+        self, mock_data_loader, mock_predictor, state_file
+    ):
+        """Test a run scores the forecast issued by the previous run"""
+        loader = mock_data_loader.return_value
+        predictor = mock_predictor.return_value
+        predictor.load_model_from_mlflow.return_value = True
+        predictor.predict.side_effect = lambda df, target_timestamp: _forecast(
+            target_timestamp
+        )
+
+        loader.load_predicting_dataset.return_value = _observations(24)
+        first = track_forecast_accuracy_task.fn()
+        loader.load_predicting_dataset.return_value = _observations(30)
+        second = track_forecast_accuracy_task.fn()
+
+        assert first["matched"] == 0
+        assert first["issued"] == 18
+        assert second["matched"] == 18
+        assert second["by_horizon"]["hour_1"]["count"] == 3
+        assert state_file.exists()
+        # Both issued forecasts are archived
+        archived = PredictionArchive(root=state_file.parent / "archive").read()
+        assert archived["run_time"].nunique() == 2
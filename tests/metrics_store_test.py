@@ -0,0 +1,162 @@
+"""
+Tests for the monitoring metrics store and per-hour batch metrics
+"""
+
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flows.tasks import record_batch_metrics_task
+from src.monitoring.batch_metrics import hourly_metrics
+from src.monitoring.metrics_store import MetricsStore
+
+COLUMNS = [f"Nitrogen dioxide_Station {i}" for i in range(3)]
+
+
+def _frame(rows, mean=20.0, seed=0, start="2024-01-01"):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(mean, 5, (rows, len(COLUMNS))), columns=COLUMNS)
+    df.insert(0, "Timestamp", pd.date_range(start, periods=rows, freq="H"))
+    return df
+
+
+def _metrics(hours, value=1.0, version="1"):
+    timestamps = pd.date_range("2024-01-01", periods=hours, freq="H", tz="UTC")
+    return pd.DataFrame(
+        {
+            "timestamp": np.repeat(timestamps, 2),
+            "metric": ["drift_share", "max_psi"] * hours,
+            "value": value,
+            "model_version": version,
+        }
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(f"sqlite:///{tmp_path / 'metrics.db'}")
+
+
+class TestMetricsStore:
+    def test_write_and_read(self, store):
+        """Test written metrics are read back in time order"""
+        assert store.write(_metrics(48), batch_size=7) == 96
+
+        df = store.read(metric="drift_share")
+
+        assert len(df) == 48
+        assert df["timestamp"].is_monotonic_increasing
+        assert str(df["timestamp"].dt.tz) == "UTC"
+        assert store.last_timestamp() == pd.Timestamp("2024-01-02 23:00", tz="UTC")
+
+    def test_rewriting_an_hour_replaces_it(self, store):
+        """Test the (timestamp, metric) key upserts instead of duplicating"""
+        store.write(_metrics(24))
+        store.write(_metrics(2, value=5.0, version="2"))
+
+        df = store.read()
+
+        assert len(df) == 48
+        first = df[df["timestamp"] == pd.Timestamp("2024-01-01", tz="UTC")]
+        assert first["value"].tolist() == [5.0, 5.0]
+        assert first["model_version"].tolist() == ["2", "2"]
+
+    def test_time_range_filter(self, store):
+        """Test start and end bound the hours returned"""
+        store.write(_metrics(24))
+
+        df = store.read(start="2024-01-01 05:00", end="2024-01-01 09:00")
+
+        assert df["timestamp"].nunique() == 5
+
+    def test_empty_store(self, store):
+        """Test an empty store has no last timestamp"""
+        assert store.last_timestamp() is None
+        assert store.write(_metrics(0)) == 0
+
+    @patch.object(MetricsStore, "_create_table")
+    def test_postgres_timestamps_carry_utc_offset(self, mock_create_table):
+        """Test Postgres rows are UTC with an explicit offset, SQLite rows plain"""
+        metrics = _metrics(1)
+        metrics["timestamp"] = metrics["timestamp"].dt.tz_convert("Europe/Helsinki")
+
+        postgres = MetricsStore("postgresql://localhost/metrics")
+        sqlite = MetricsStore("sqlite:///metrics.db")
+
+        assert postgres._rows(metrics)[0][0] == "2024-01-01 00:00:00+00"
+        assert sqlite._rows(metrics)[0][0] == "2024-01-01 00:00:00"
+
+    def test_unsupported_url(self):
+        """Test unknown database URLs are rejected"""
+        with pytest.raises(ValueError):
+            MetricsStore("mysql://localhost/metrics")
+
+
+class TestHourlyMetrics:
+    def test_one_set_of_metrics_per_hour(self):
+        """Test every hour gets drift and missing-value metrics"""
+        current = _frame(30, start="2024-03-01")
+        current.loc[3, COLUMNS[0]] = np.nan
+
+        metrics = hourly_metrics(current, _frame(500))
+        wide = metrics.pivot(index="timestamp", columns="metric", values="value")
+
+        assert len(wide) == 30
+        assert wide["share_missing_values"].iloc[3] == pytest.approx(1 / 3)
+        # PSI is only reported once the window holds enough samples
+        assert wide["max_psi"].notna().sum() == 30 - 23
+
+    def test_incremental_run_matches_backfill(self):
+        """Test hours after since get the values a full backfill gives them"""
+        current = _frame(60, mean=25, start="2024-03-01")
+        since = pd.Timestamp("2024-03-02 11:00", tz="UTC")
+
+        backfill = hourly_metrics(current, _frame(500), window_batches=24)
+        incremental = hourly_metrics(
+            current, _frame(500), since=since, window_batches=24
+        )
+
+        expected = backfill[backfill["timestamp"] > since].reset_index(drop=True)
+        pd.testing.assert_frame_equal(incremental, expected)
+        assert hourly_metrics(current, _frame(500), since="2024-03-10").empty
+
+    def test_prediction_errors_by_window_end(self):
+        """Test forecast errors are recorded at the hour their window ends"""
+        current = _frame(10, start="2024-03-01")
+        predictor = Mock(model_version="3")
+        predictor.window_errors.return_value = pd.DataFrame(
+            {"mae": [1.0, 2.0], "rmse": [1.5, 2.5]},
+            index=pd.DatetimeIndex(current["Timestamp"].iloc[-2:], name="Timestamp"),
+        )
+
+        metrics = hourly_metrics(current, _frame(500), predictor=predictor)
+        mae = metrics[metrics["metric"] == "prediction_mae"]
+
+        assert mae["value"].tolist() == [1.0, 2.0]
+        assert mae["timestamp"].iloc[-1] == pd.Timestamp("2024-03-01 09:00", tz="UTC")
+        assert set(metrics["model_version"]) == {"3"}
+
+
+class TestRecordBatchMetricsTask:
+    @patch("flows.tasks.PollutionPredictor")
+    @patch("flows.tasks.DataLoader")
+    def test_writes_only_new_hours(self, mock_data_loader, mock_predictor, tmp_path):
+        """Test a second run only adds the hours that arrived since the first"""
+        loader = mock_data_loader.return_value
+        loader.load_train_dataset.return_value = _frame(500)
+        loader.load_predicting_dataset.return_value = _frame(30, start="2024-03-01")
+        mock_predictor.return_value.load_model_from_mlflow.return_value = False
+        url = f"sqlite:///{tmp_path / 'metrics.db'}"
+
+        with patch("src.monitoring.metrics_store.MONITORING_DB_URL", url):
+            first = record_batch_metrics_task.fn()
+            loader.load_predicting_dataset.return_value = _frame(32, start="2024-03-01")
+            second = record_batch_metrics_task.fn()
+            backfill = record_batch_metrics_task.fn(backfill=True)
+
+        assert first["hours"] == 530
+        assert second["hours"] == 2
+        assert backfill["hours"] == 532
+        assert MetricsStore(url).read()["timestamp"].nunique() == 532
@@ -0,0 +1,72 @@
+"""
+Tests for the FMI multipointcoverage parser
+"""
+
+import datetime as dt
+
+import numpy as np
+
+from scripts.multipoint import MultiPoint, _parse_times
+from scripts.replay import build_multipointcoverage
+
+QUERY_ID = "urban::observations::airquality::hourly::multipointcoverage"
+
+STATIONS = [
+    ("Helsinki Kallio 2", 100662, 60.18739, 24.95058),
+    ("Espoo Luukki", 100723, 60.31383, 24.68881),
+]
+FIELDS = [("NO2", "Nitrogen dioxide", "ug/m3"), ("PM10", "Particulate matter", "ug/m3")]
+
+
+def _coverage_xml(epochs):
+    return build_multipointcoverage(STATIONS, epochs, FIELDS)
+
+
+EPOCHS = [1704067200, 1704070800, 1704074400]  # 2024-01-01 00:00..02:00 UTC
+
+
+class TestMultiPoint:
+    def test_parse_times_is_datetime64(self):
+        """Test that epoch positions become a datetime64[s] array"""
+        positions = np.array([60.0, 24.0, EPOCHS[0], 60.0, 24.0, EPOCHS[1]])
+
+        times = _parse_times(None, positions)
+
+        assert times.dtype == np.dtype("datetime64[s]")
+        assert times[1] == np.datetime64("2024-01-01T01:00:00")
+
+    def test_non_timeseries(self):
+        """Test grouping of observations by time and station"""
+        obs = MultiPoint(_coverage_xml(EPOCHS), QUERY_ID)
+
+        assert list(obs.data) == [
+            dt.datetime(2024, 1, 1, 0),
+            dt.datetime(2024, 1, 1, 1),
+            dt.datetime(2024, 1, 1, 2),
+        ]
+        step = obs.data[dt.datetime(2024, 1, 1, 2)]
+        assert list(step) == ["Helsinki Kallio 2", "Espoo Luukki"]
+        assert step["Espoo Luukki"]["Nitrogen dioxide"] == {
+            "value": 5.0,
+            "units": "ug/m3",
+        }
+        assert step["Helsinki Kallio 2"]["Particulate matter"]["value"] == 2.1
+        assert obs.location_metadata["Espoo Luukki"]["fmisid"] == 100723
+
+    def test_timeseries(self):
+        """Test that timeseries mode returns one array series per station"""
+        obs = MultiPoint(_coverage_xml(EPOCHS), QUERY_ID, timeseries=True)
+
+        assert list(obs.data) == ["Helsinki Kallio 2", "Espoo Luukki"]
+        series = obs.data["Espoo Luukki"]
+        np.testing.assert_array_equal(
+            series["times"], np.array(EPOCHS, dtype="datetime64[s]")
+        )
+        np.testing.assert_array_equal(
+            series["Nitrogen dioxide"]["values"], [3.0, 4.0, 5.0]
+        )
+        assert series["Particulate matter"]["unit"] == "ug/m3"
+        np.testing.assert_array_equal(
+            obs.data["Helsinki Kallio 2"]["Particulate matter"]["values"],
+            [0.1, 1.1, 2.1],
+        )
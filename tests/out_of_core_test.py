@@ -0,0 +1,53 @@
+"""
+Tests for Lasso fitted from streamed sufficient statistics
+"""
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Lasso
+from sklearn.preprocessing import StandardScaler
+
+from src.models.out_of_core import GramAccumulator, fitted_lasso, lasso_from_gram
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = 50 + rng.normal(scale=[1, 5, 10, 20], size=(400, 4))
+    y = X @ np.array([[0.5, 0.0], [0.1, 1.0], [0.0, -0.2], [0.05, 0.0]])
+    return X, y + rng.normal(size=y.shape)
+
+
+class TestOutOfCoreLasso:
+    def test_chunked_statistics_match_full_batch(self, data):
+        """Test statistics summed over chunks equal those of the whole set"""
+        X, y = data
+        gram = GramAccumulator()
+        for start in range(0, len(X), 64):
+            gram.update(X[start : start + 64], y[start : start + 64])
+
+        scale = X.std(axis=0)
+        matrix, xy = gram.standardized(scale)
+        X_scaled = (X - X.mean(axis=0)) / scale
+
+        np.testing.assert_allclose(gram.mean_x, X.mean(axis=0))
+        np.testing.assert_allclose(matrix, X_scaled.T @ X_scaled)
+        np.testing.assert_allclose(xy, X_scaled.T @ (y - y.mean(axis=0)))
+
+    def test_matches_sklearn_lasso(self, data):
+        """Test coordinate descent on the Gram matrix gives sklearn's fit"""
+        X, y = data
+        X_scaled = StandardScaler().fit_transform(X)
+        gram = GramAccumulator()
+        gram.update(X_scaled, y)
+        matrix, xy = gram.standardized(np.ones(X.shape[1]))
+
+        coef, n_iter = lasso_from_gram(matrix, xy, len(X), alpha=0.1, tol=1e-8)
+        model = fitted_lasso(coef, gram.mean_y, 0.1, n_iter)
+
+        expected = Lasso(alpha=0.1, tol=1e-8).fit(X_scaled, y)
+        np.testing.assert_allclose(coef.T, expected.coef_, atol=1e-5)
+        np.testing.assert_allclose(
+            model.predict(X_scaled), expected.predict(X_scaled), atol=1e-4
+        )
+        assert coef[3, 1] == 0
@@ -0,0 +1,92 @@
+"""
+Tests for the partitioned prediction archive
+"""
+
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.data.prediction_archive import PredictionArchive, prediction_frame
+
+KEYS = ["Nitrogen dioxide_Station A", "PM10_Station A", "PM2.5_Station B"]
+
+
+def _prediction(issued, n_steps=6):
+    """Prediction in the format returned by PollutionPredictor.predict()"""
+    issued = pd.Timestamp(issued)
+    return {
+        "prediction_timestamp": issued.isoformat(),
+        "predictions": {
+            key: {
+                f"hour_{j}": {
+                    "value": float(j),
+                    "timestamp": (issued + pd.Timedelta(hours=j)).isoformat(),
+                }
+                for j in range(1, n_steps + 1)
+            }
+            for key in KEYS
+        },
+        "historical_data": {key: [] for key in KEYS},
+    }
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = PredictionArchive(root=tmp_path / "archive")
+    for hour in range(72):
+        run_time = pd.Timestamp("2024-01-01") + pd.Timedelta(hours=hour)
+        archive.append(_prediction(run_time), model_version=3)
+    return archive
+
+
+class TestPredictionArchive:
+    def test_prediction_frame(self):
+        """Test a prediction becomes one row per horizon, station and pollutant"""
+        frame = prediction_frame(_prediction("2024-01-01 05:00"), model_version=2)
+
+        assert len(frame) == 18
+        row = frame[(frame["pollutant"] == "PM2.5") & (frame["horizon"] == 6)]
+        assert row["station"].item() == "Station B"
+        assert row["target_time"].item() == pd.Timestamp("2024-01-01 11:00")
+        assert set(frame["model_version"]) == {"2"}
+
+    def test_runs_are_partitioned_by_day(self, archive):
+        """Test each run is one file in the partition of its run date"""
+        assert archive.partitions() == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert len(archive._files("2024-01-02")) == 24
+        assert len(archive.read()) == 72 * 18
+
+    def test_read_time_range(self, archive):
+        """Test start and end select runs by run time"""
+        df = archive.read(start="2024-01-02 05:00", end="2024-01-02 06:00")
+
+        assert df["run_time"].nunique() == 2
+        assert list(archive.read(columns=["value"]).columns) == ["value"]
+
+    def test_compaction_keeps_rows(self, archive):
+        """Test finished days are merged into one file without losing rows"""
+        before = archive.read()
+
+        assert archive.compact(before="2024-01-03") == 46
+        assert [len(archive._files(day)) for day in archive.partitions()] == [1, 1, 24]
+        pd.testing.assert_frame_equal(archive.read(), before)
+        assert archive.compact(before="2024-01-03") == 0
+
+    def test_empty_archive(self, tmp_path):
+        """Test reading and compacting an archive that was never written"""
+        archive = PredictionArchive(root=tmp_path / "missing")
+
+        assert archive.read().empty
+        assert archive.compact() == 0
+
+    @patch("src.data.prediction_archive.fsspec.filesystem")
+    def test_s3_archive_uses_the_predictions_bucket(self, mock_filesystem, monkeypatch):
+        """Test the S3 archive stays in the bucket predictions were saved to"""
+        monkeypatch.delenv("S3_BUCKET", raising=False)
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "air-pollution-data")
+
+        assert PredictionArchive(use_s3=True).root == (
+            "air-pollution-models/predictions/archive"
+        )
+        mock_filesystem.assert_called_once_with("s3")
@@ -2,14 +2,17 @@
 Tests for pollution predictor model
 """
 
+import json
 from unittest.mock import Mock, patch
 
 # Removed unused import
+import numpy as np
 import pandas as pd
 import pytest
-from sklearn.linear_model import Lasso
+from sklearn.linear_model import Lasso, SGDRegressor
 from sklearn.multioutput import MultiOutputRegressor
 
+from src.data.data_loader import ParquetChunks
 from src.models.pollution_predictor import PollutionPredictor
 
 
@@ -273,3 +276,235 @@ class TestPollutionPredictor:
         assert "day_sin" in features_df.columns
         assert "day_cos" in features_df.columns
         assert len(features_df) == len(sample_pollution_data)
+
+
+def _hourly_data(periods, start="2024-01-01"):
+    dates = pd.date_range(start=start, periods=periods, freq="H")
+    hours = np.arange(periods)
+    return pd.DataFrame(
+        {
+            "Timestamp": dates,
+            "Nitrogen dioxide_Helsinki Kallio 2": 20 + 5 * np.sin(hours / 4),
+            "Particulate matter < 10 µm_Helsinki Kallio 2": 25 + 3 * np.cos(hours / 6),
+            "Particulate matter < 2.5 µm_Helsinki Kallio 2": 12 + np.sin(hours / 3),
+        }
+    )
+
+
+@patch("mlflow.start_run")
+class TestIncrementalUpdate:
+    def _trained(self, data, model_type="sgd"):
+        predictor = PollutionPredictor(model_type=model_type)
+        predictor.train(data)
+        return predictor
+
+    def test_train_records_watermark(self, mock_start_run, mock_mlflow):
+        """Test training remembers the newest timestamp it has seen"""
+        data = _hourly_data(100)
+        predictor = self._trained(data)
+
+        assert predictor.last_timestamp == data["Timestamp"].max()
+        assert isinstance(predictor.model.estimator, SGDRegressor)
+        assert predictor.supports_incremental()
+
+    def test_update_uses_only_new_windows(self, mock_start_run, mock_mlflow):
+        """Test update fits exactly the windows with new target rows"""
+        data = _hourly_data(130)
+        predictor = self._trained(data.iloc[:100])
+        seen = predictor.scaler.n_samples_seen_
+
+        result = predictor.update(data)
+
+        assert result["updated"] is True
+        assert result["new_samples"] == 30
+        assert predictor.scaler.n_samples_seen_ == seen + 30
+        assert predictor.last_timestamp == data["Timestamp"].max()
+
+        again = predictor.update(data)
+        assert again == {"updated": False, "reason": "no_new_data", "new_samples": 0}
+
+    def test_update_skipped_on_drift(self, mock_start_run, mock_mlflow):
+        """Test that drifted data is left for a full retrain"""
+        data = _hourly_data(130)
+        predictor = self._trained(data.iloc[:100])
+        shifted = data.copy()
+        shifted.iloc[100:, 1:] += 500
+        coef = predictor.model.estimators_[0].coef_.copy()
+
+        result = predictor.update(shifted, drift_threshold=1.0)
+
+        assert result["updated"] is False
+        assert result["reason"] == "drift"
+        assert (predictor.model.estimators_[0].coef_ == coef).all()
+
+    def test_update_requires_same_features(self, mock_start_run, mock_mlflow):
+        """Test that changed station columns require a full retrain"""
+        data = _hourly_data(130)
+        predictor = self._trained(data.iloc[:100])
+        renamed = data.rename(
+            columns={"Nitrogen dioxide_Helsinki Kallio 2": "Nitrogen dioxide_Other"}
+        )
+
+        with pytest.raises(ValueError, match="full retrain required"):
+            predictor.update(renamed)
+
+    def test_lasso_is_not_incremental(self, mock_start_run, mock_mlflow):
+        """Test the default Lasso model cannot be updated in place"""
+        data = _hourly_data(130)
+        predictor = self._trained(data.iloc[:100], model_type="lasso")
+
+        assert not predictor.supports_incremental()
+        with pytest.raises(ValueError, match="does not support incremental"):
+            predictor.update(data)
+
+    def test_evaluate_scores_only_new_windows(self, mock_start_run, mock_mlflow):
+        """Test evaluate scores unseen windows without refitting"""
+        data = _hourly_data(130)
+        predictor = self._trained(data.iloc[:100])
+        coef = predictor.model.estimators_[0].coef_.copy()
+
+        result = predictor.evaluate(data)
+
+        assert result["samples"] == 30
+        assert result["mae"] >= 0
+        assert (predictor.model.estimators_[0].coef_ == coef).all()
+        assert predictor.evaluate(data.iloc[:100]) == {"samples": 0}
+
+    def test_window_errors_by_last_target_hour(self, mock_start_run, mock_mlflow):
+        """Test per-window errors are indexed by their last target hour"""
+        data = _hourly_data(130)
+        predictor = self._trained(data.iloc[:100])
+
+        errors = predictor.window_errors(data)
+
+        assert len(errors) == 30
+        assert errors.index[-1] == data["Timestamp"].iloc[-1]
+        assert errors["mae"].mean() == pytest.approx(predictor.evaluate(data)["mae"])
+        assert (errors["rmse"] >= errors["mae"]).all()
+        assert predictor.window_errors(data.iloc[:100]).empty
+
+
+# Each test trains twice, params must not reach a real run
+@patch("mlflow.log_param")
+@patch("mlflow.start_run")
+class TestPrecision:
+    def test_float32_end_to_end(self, mock_start_run, mock_log_param, mock_mlflow):
+        """Test float32 features, scaled inputs and coefficients"""
+        data = _hourly_data(300)
+        predictor = PollutionPredictor(precision="float32")
+
+        X, y = predictor.prepare_sequences(data)
+        metrics = predictor.train(data)
+
+        assert X.dtype == np.float32 and y.dtype == np.float32
+        assert predictor.scaler.transform(X).dtype == np.float32
+        assert predictor.model.estimators_[0].coef_.dtype == np.float32
+        assert isinstance(metrics["mae"], float)
+        float64 = PollutionPredictor().train(data)
+        assert metrics["mae"] == pytest.approx(float64["mae"], rel=1e-3)
+
+    def test_float32_predictions_close_to_float64(
+        self, mock_start_run, mock_log_param, mock_mlflow
+    ):
+        """Test float32 forecasts stay within sensor resolution of float64"""
+        data = _hourly_data(300)
+        forecasts = []
+        for precision in ["float64", "float32"]:
+            predictor = PollutionPredictor(precision=precision)
+            predictor.train(data)
+            result = predictor.predict(data.tail(30))
+            forecasts.append(
+                [
+                    hour["value"]
+                    for hours in result["predictions"].values()
+                    for hour in hours.values()
+                ]
+            )
+
+        np.testing.assert_allclose(forecasts[1], forecasts[0], atol=1e-3)
+
+    def test_float32_evaluation_metrics_are_floats(
+        self, mock_start_run, mock_log_param, mock_mlflow
+    ):
+        """Test float32 evaluation metrics are plain floats, not numpy scalars"""
+        data = _hourly_data(300)
+        predictor = PollutionPredictor(precision="float32")
+        predictor.train(data.iloc[:250])
+
+        result = predictor.evaluate(data)
+
+        for name in ["mae", "mse", "rmse", "r2_score"]:
+            assert type(result[name]) is float
+        assert json.loads(json.dumps(result, default=str)) == result
+
+    def test_unknown_precision(self, mock_start_run, mock_log_param, mock_mlflow):
+        """Test only float64 and float32 are accepted"""
+        with pytest.raises(ValueError, match="Unknown precision"):
+            PollutionPredictor(precision="float16")
+
+
+@pytest.fixture
+def parquet_chunks(tmp_path):
+    """ParquetChunks over a written dataset, chunk size chosen per test"""
+
+    def chunks(data, chunk_rows):
+        path = tmp_path / "training.parquet"
+        data.to_parquet(path, index=False)
+        return ParquetChunks(path, chunk_rows)
+
+    return chunks
+
+
+@patch("mlflow.log_param")
+@patch("mlflow.start_run")
+class TestOutOfCoreTraining:
+    @pytest.mark.parametrize("chunk_rows", [10, 64])
+    def test_lasso_matches_in_memory_training(
+        self, mock_start_run, mock_log_param, mock_mlflow, parquet_chunks, chunk_rows
+    ):
+        """Test chunked Lasso training gives the in-memory model and metrics"""
+        data = _hourly_data(300)
+        in_memory = PollutionPredictor()
+        expected = in_memory.train(data)
+
+        predictor = PollutionPredictor()
+        metrics = predictor.train_chunked(parquet_chunks(data, chunk_rows))
+
+        assert metrics["training_samples"] == expected["training_samples"]
+        assert metrics["validation_samples"] == expected["validation_samples"]
+        assert metrics["mae"] == pytest.approx(expected["mae"], rel=1e-3)
+        assert metrics["r2_score"] == pytest.approx(expected["r2_score"], abs=1e-3)
+        np.testing.assert_allclose(
+            predictor.scaler.mean_, in_memory.scaler.mean_, rtol=1e-9
+        )
+        assert predictor.last_timestamp == data["Timestamp"].max()
+        forecasts = [
+            [
+                hour["value"]
+                for hours in model.predict(data.tail(30))["predictions"].values()
+                for hour in hours.values()
+            ]
+            for model in (predictor, in_memory)
+        ]
+        np.testing.assert_allclose(forecasts[0], forecasts[1], atol=1e-2)
+
+    def test_sgd_is_fit_with_partial_fit(
+        self, mock_start_run, mock_log_param, mock_mlflow, parquet_chunks
+    ):
+        """Test SGD is fit chunk by chunk and can be updated afterwards"""
+        data = _hourly_data(300)
+        predictor = PollutionPredictor(model_type="sgd")
+
+        metrics = predictor.train_chunked(parquet_chunks(data, 50), epochs=2)
+
+        assert predictor.scaler.n_samples_seen_ == metrics["training_samples"]
+        assert isinstance(predictor.model.estimator, SGDRegressor)
+        assert predictor.supports_incremental()
+        assert np.isfinite(metrics["mae"])
+
+    def test_too_little_data(
+        self, mock_start_run, mock_log_param, mock_mlflow, parquet_chunks
+    ):
+        """Test a dataset without validation windows is rejected"""
+        with pytest.raises(ValueError, match="Not enough data"):
+            PollutionPredictor().train_chunked(parquet_chunks(_hourly_data(31), 10))
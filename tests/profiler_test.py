@@ -0,0 +1,87 @@
+"""
+Tests for the sampling profiler and its admin endpoints
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.routes import profiler_endpoint
+from src.monitoring.profiler import SamplingProfiler
+
+
+def busy_wait(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler:
+    def test_samples_other_threads(self, tmp_path):
+        """Test that stacks of running threads are collected and saved"""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_wait, args=(stop,), name="worker")
+        worker.start()
+        try:
+            with SamplingProfiler(interval=0.001) as profiler:
+                time.sleep(0.1)
+        finally:
+            stop.set()
+            worker.join()
+
+        assert profiler.sample_count > 0
+        stacks = [stack for stack in profiler.samples if stack.startswith("worker;")]
+        assert any("busy_wait (tests/profiler_test.py" in stack for stack in stacks)
+
+        filename = profiler.save("test", directory=tmp_path)
+        lines = (tmp_path / filename).read_text().splitlines()
+        assert filename == "test.folded"
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    def test_does_not_sample_itself(self):
+        """Test the sampler thread is excluded from its own profile"""
+        with SamplingProfiler(interval=0.001) as profiler:
+            time.sleep(0.02)
+
+        assert not any(
+            stack.startswith("sampling-profiler;") for stack in profiler.samples
+        )
+
+
+class TestProfilerEndpoint:
+    def test_requires_admin_token(self, monkeypatch):
+        """Test admin endpoints reject missing or wrong tokens"""
+        monkeypatch.setattr(profiler_endpoint, "PROFILER_TOKEN", "secret")
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(profiler_endpoint.require_admin("wrong"))
+        assert exc.value.status_code == 403
+        asyncio.run(profiler_endpoint.require_admin("secret"))
+
+    def test_no_token_configured_denies_all(self, monkeypatch):
+        """Test that profiling stays locked when no token is configured"""
+        monkeypatch.setattr(profiler_endpoint, "PROFILER_TOKEN", None)
+
+        assert not profiler_endpoint.is_admin(None)
+        assert not profiler_endpoint.is_admin("")
+
+    def test_profile_process(self, monkeypatch, tmp_path):
+        """Test a time-bounded profile is returned as collapsed stacks"""
+        monkeypatch.setattr("src.monitoring.profiler.PROFILE_DIR", tmp_path)
+
+        response = asyncio.run(
+            profiler_endpoint.profile_process(seconds=0.05, interval_ms=1)
+        )
+
+        assert response.status_code == 200
+        assert int(response.headers["X-Profile-Samples"]) > 0
+        assert "attachment" in response.headers["Content-Disposition"]
+        assert len(list(tmp_path.glob("*.folded"))) == 1
+
+    def test_get_profile_rejects_paths(self):
+        """Test profile downloads cannot escape the profile directory"""
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(profiler_endpoint.get_profile("../secrets.folded"))
+        assert exc.value.status_code == 400
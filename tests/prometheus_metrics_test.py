@@ -0,0 +1,84 @@
+"""
+Tests for Prometheus API metrics
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+from prometheus_client import REGISTRY
+
+from src.monitoring.prometheus_metrics import (
+    observe_dataset,
+    observe_request,
+    stage_timer,
+    track_model_version,
+)
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestPrometheusMetrics:
+    def test_stage_timer_observes_stage(self):
+        """Test that each timed block adds one observation to its stage"""
+        before = _sample("predict_stage_duration_seconds_count", stage="test_stage")
+
+        with stage_timer("test_stage"):
+            pass
+
+        after = _sample("predict_stage_duration_seconds_count", stage="test_stage")
+        assert after == before + 1
+
+    def test_stage_timer_observes_on_error(self):
+        """Test that failing stages are still timed"""
+        before = _sample("predict_stage_duration_seconds_count", stage="failing")
+
+        try:
+            with stage_timer("failing"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+        assert _sample("predict_stage_duration_seconds_count", stage="failing") == (
+            before + 1
+        )
+
+    def test_observe_request(self):
+        """Test request latency is recorded per route template"""
+        labels = {"method": "GET", "route": "/api/v1/test", "status": "200"}
+        before = _sample("api_request_duration_seconds_count", **labels)
+
+        observe_request("GET", "/api/v1/test", 200, 0.01)
+
+        assert _sample("api_request_duration_seconds_count", **labels) == before + 1
+
+    def test_observe_dataset(self):
+        """Test dataset rows and age gauges"""
+        latest = pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(hours=2)
+        df = pd.DataFrame({"Timestamp": pd.date_range(end=latest, periods=5, freq="h")})
+
+        observe_dataset("test", df)
+
+        assert _sample("dataset_rows", data_type="test") == 5
+        age = _sample("dataset_age_seconds", data_type="test")
+        assert 7100 < age < 7300
+
+    def test_track_model_version(self):
+        """Test model version gauge follows the predictor"""
+        predictor = SimpleNamespace(model_version=None)
+        track_model_version(predictor)
+        assert _sample("model_version") == 0
+
+        predictor.model_version = "3"
+        assert _sample("model_version") == 3
+
+    def test_metrics_endpoint(self):
+        """Test metrics endpoint returns the Prometheus text format"""
+        from src.api.routes.metrics_endpoint import metrics
+
+        response = asyncio.run(metrics())
+
+        assert response.media_type.startswith("text/plain")
+        assert b"api_request_duration_seconds" in response.body
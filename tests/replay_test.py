@@ -0,0 +1,79 @@
+"""
+Tests for the offline WFS replay harness
+"""
+
+import pytest
+
+from scripts import replay as replay_module
+from scripts.multipoint import stored_query_url
+from scripts.replay import ReplayStore, build_multipointcoverage, replay
+from scripts.wfs import download_stored_query
+
+QUERY_ID = "urban::observations::airquality::hourly::multipointcoverage"
+STATIONS = [("Helsinki Kallio 2", 100662, 60.18739, 24.95058)]
+FIELDS = [("PM10", "Particulate matter < 10 µm", "ug/m3")]
+ARGS = ["bbox=24,60,25,61", "starttime=2024-01-01T00:00:00Z"]
+
+
+def test_replay_serves_recorded_response(tmp_path):
+    """Test that download_stored_query reads recorded responses from disk"""
+    store = ReplayStore(str(tmp_path))
+    store.save(
+        stored_query_url(QUERY_ID, ARGS),
+        build_multipointcoverage(STATIONS, [1704067200, 1704070800], FIELDS),
+    )
+
+    with replay(str(tmp_path)):
+        obs = download_stored_query(QUERY_ID, args=list(ARGS))
+
+    assert len(obs.data) == 2
+    assert "Helsinki Kallio 2" in obs.location_metadata
+
+
+def test_replay_missing_response(tmp_path):
+    """Test that unrecorded requests fail instead of going online"""
+    with replay(str(tmp_path)):
+        with pytest.raises(FileNotFoundError):
+            download_stored_query(QUERY_ID, args=list(ARGS))
+
+
+def test_record_mode_uses_responder(tmp_path):
+    """Test that record mode stores responses from the responder once"""
+    calls = []
+
+    def responder(url):
+        calls.append(url)
+        return build_multipointcoverage(STATIONS, [1704067200], FIELDS)
+
+    for _ in range(2):
+        with replay(str(tmp_path), record=True, responder=responder):
+            download_stored_query(QUERY_ID, args=list(ARGS))
+
+    assert calls == [stored_query_url(QUERY_ID, ARGS)]
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_replay_from_environment(tmp_path, monkeypatch):
+    """Test that FMI_REPLAY_DIR activates a replay store"""
+    monkeypatch.setattr(replay_module, "_active_store", None)
+    monkeypatch.setenv("FMI_REPLAY_DIR", str(tmp_path))
+
+    store = replay_module.active_store()
+
+    assert store.directory == str(tmp_path)
+    assert store.record is False
+    monkeypatch.setattr(replay_module, "_active_store", None)
+
+
+def test_ingestion_benchmark_case(tmp_path):
+    """Test a minimal ingestion benchmark case end to end"""
+    from benchmarks.ingestion_benchmark import STAGES, run_case
+
+    case = run_case(weeks=1, n_stations=2, workdir=str(tmp_path))
+
+    assert case["rows"] == 168 * 2
+    assert set(case["stages"]) == set(STAGES)
+    assert case["peak_rss_mb"] > 0
+    assert (
+        tmp_path / "interim" / "air_pollution_data_benchmark_total.parquet"
+    ).exists()
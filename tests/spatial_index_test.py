@@ -0,0 +1,68 @@
+"""
+Tests for the station spatial index and observation filtering
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.data_from_stations import _filter_observations, _locations_in_bbox
+from scripts.spatial_index import StationIndex
+
+STATIONS = {
+    "Helsinki Kallio 2": {"fmisid": 1, "latitude": 60.1878, "longitude": 24.9508},
+    "Espoo Luukki": {"fmisid": 2, "latitude": 60.1625, "longitude": 24.6683},
+    "Turku Kauppatori": {"fmisid": 3, "latitude": 60.4518, "longitude": 22.2666},
+}
+
+
+class TestStationIndex:
+    def test_within_bbox(self):
+        """Test bbox queries against the KD-tree"""
+        index = StationIndex(STATIONS)
+
+        assert index.within_bbox(24.5, 60.0, 25.0, 60.3) == [
+            "Helsinki Kallio 2",
+            "Espoo Luukki",
+        ]
+        assert index.within_bbox(10.0, 50.0, 11.0, 51.0) == []
+
+    def test_nearest(self):
+        """Test nearest-station queries with great-circle distances"""
+        index = StationIndex(STATIONS)
+
+        nearest = index.nearest(60.1699, 24.9384, k=2)
+
+        assert [name for name, _ in nearest] == ["Helsinki Kallio 2", "Espoo Luukki"]
+        assert nearest[0][1] == pytest.approx(2.1, abs=0.2)
+        assert index.nearest(60.1699, 24.9384, k=3, max_distance_km=50) == nearest
+
+    def test_empty_index(self):
+        """Test that an empty index answers queries"""
+        index = StationIndex({})
+
+        assert len(index) == 0
+        assert index.within_bbox(0, 0, 1, 1) == []
+        assert index.nearest(60.0, 25.0) == []
+
+
+def test_filter_observations():
+    """Test that observations are grouped per selected station in time order"""
+    obs = SimpleNamespace(
+        location_metadata=STATIONS,
+        data={
+            "t1": {"Helsinki Kallio 2": {"a": 1}, "Turku Kauppatori": {"a": 2}},
+            "t2": {"Helsinki Kallio 2": {"a": 3}, "Espoo Luukki": {"a": 4}},
+        },
+    )
+
+    locations = _locations_in_bbox(obs, 24.5, 60.0, 25.0, 60.3)
+    filtered = _filter_observations(obs, locations)
+
+    assert set(locations) == {"Helsinki Kallio 2", "Espoo Luukki"}
+    assert filtered["Helsinki Kallio 2"] == [
+        {"t1": {"a": 1}},
+        {"t2": {"a": 3}},
+    ]
+    assert filtered["Espoo Luukki"] == [{"t2": {"a": 4}}]
+    assert "Turku Kauppatori" not in filtered
@@ -0,0 +1,99 @@
+"""
+Tests for the multi-region station registry
+"""
+
+from src.data.station_registry import DEFAULT_REGION, StationRegistry
+
+
+class TestStationRegistry:
+    def test_default_registry(self):
+        """Test that the default registry holds the Helsinki stations"""
+        registry = StationRegistry()
+
+        assert registry.region_names() == [DEFAULT_REGION]
+        assert len(registry.stations()) == 8
+        assert "Helsinki Kallio 2" in registry.coordinates()
+
+    def test_for_address_discovers_stations(self):
+        """Test that a custom address region registers stations in its bbox"""
+        registry = StationRegistry.for_address("Tampere")
+        assert registry.stations() == []
+
+        registry.set_center("tampere", 61.4978, 23.7610)
+        stations = registry.update_from_metadata(
+            "tampere",
+            {
+                "Tampere Linja-autoasema": {
+                    "fmisid": 1,
+                    "latitude": 61.4951,
+                    "longitude": 23.7679,
+                },
+                "Helsinki Kallio 2": {
+                    "fmisid": 2,
+                    "latitude": 60.1878,
+                    "longitude": 24.9508,
+                },
+            },
+        )
+
+        assert stations == ["Tampere Linja-autoasema"]
+        assert registry.station_metadata()["Tampere Linja-autoasema"]["fmisid"] == 1
+
+    def test_fixed_station_list_is_not_extended(self):
+        """Test that regions with explicit stations ignore other stations"""
+        registry = StationRegistry(
+            {
+                "espoo": {
+                    "latitude": 60.2,
+                    "longitude": 24.7,
+                    "stations": ["Espoo Luukki"],
+                }
+            }
+        )
+        registry.update_from_metadata(
+            "espoo",
+            {
+                "Espoo Luukki": {"fmisid": 3, "latitude": 60.16, "longitude": 24.67},
+                "Espoo Other": {"fmisid": 4, "latitude": 60.2, "longitude": 24.7},
+            },
+        )
+
+        assert registry.stations("espoo") == ["Espoo Luukki"]
+        assert registry.coordinates("espoo")["Espoo Luukki"]["lat"] == 60.16
+
+    def test_save_and_load(self, tmp_path):
+        """Test registry round trip through JSON"""
+        path = tmp_path / "registry.json"
+        registry = StationRegistry(
+            {
+                "helsinki": {"address": "Helsinki", "stations": ["Helsinki Kallio 2"]},
+                "oulu": {"latitude": 65.01, "longitude": 25.47, "square_side": 30},
+            }
+        )
+        registry.save(str(path))
+
+        loaded = StationRegistry.load(str(path))
+
+        assert loaded.region_names() == ["helsinki", "oulu"]
+        assert loaded.default_region == "helsinki"
+        assert loaded.regions["oulu"]["square_side"] == 30
+        assert loaded.regions["oulu"]["discover"] is True
+        assert [p.name for p in tmp_path.iterdir()] == ["registry.json"]
+
+    def test_corrupt_file_loads_defaults(self, tmp_path):
+        """Test an unreadable registry file falls back to the defaults"""
+        path = tmp_path / "registry.json"
+        path.write_text('{"helsinki": {"address"', encoding="utf-8")
+
+        assert StationRegistry.load(str(path)).region_names() == [DEFAULT_REGION]
+
+    def test_nearest_stations(self):
+        """Test nearest-station lookup over the registered stations"""
+        registry = StationRegistry()
+
+        nearest = registry.nearest(60.1699, 24.9384, k=2)
+
+        assert len(nearest) == 2
+        assert nearest[0]["name"] == "Helsinki Mannerheimintie"
+        assert nearest[0]["region"] == DEFAULT_REGION
+        assert nearest[0]["distance_km"] <= nearest[1]["distance_km"]
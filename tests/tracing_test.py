@@ -0,0 +1,104 @@
+"""
+Tests for opt-in tracing
+"""
+
+import json
+import threading
+
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from src.monitoring import tracing
+
+
+@pytest.fixture
+def exporter():
+    """Enable tracing into an in-memory exporter for one test"""
+    exporter = InMemorySpanExporter()
+    tracing.configure_tracing(exporter)
+    yield exporter
+    tracing.configure_tracing()
+
+
+def _finished(exporter):
+    tracing.flush_tracing()
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+class TestTracing:
+    def test_disabled_by_default(self, monkeypatch):
+        """Test spans are no-ops without TRACE_EXPORTER"""
+        monkeypatch.delenv("TRACE_EXPORTER", raising=False)
+        tracing.configure_tracing()
+
+        with tracing.span("noop") as current:
+            assert current is None
+        assert tracing.inject_context() == {}
+
+    def test_nested_spans(self, exporter):
+        """Test nested spans share a trace and keep attributes"""
+        with tracing.span("outer", region="helsinki"):
+            with tracing.span("inner", skipped=None):
+                pass
+
+        spans = _finished(exporter)
+        outer, inner = spans["outer"], spans["inner"]
+        assert inner.parent.span_id == outer.context.span_id
+        assert inner.context.trace_id == outer.context.trace_id
+        assert outer.attributes["region"] == "helsinki"
+        assert "skipped" not in inner.attributes
+
+    def test_traced_decorator(self, exporter):
+        """Test decorated functions run inside a span"""
+
+        @tracing.traced("work")
+        def work(x):
+            return x * 2
+
+        assert work(2) == 4
+        assert "work" in _finished(exporter)
+
+    def test_context_propagates_to_thread(self, exporter):
+        """Test a carrier continues the trace in another thread"""
+
+        def background(carrier):
+            with tracing.attach_context(carrier), tracing.span("background"):
+                pass
+
+        with tracing.span("request"):
+            thread = threading.Thread(
+                target=background, args=(tracing.inject_context(),)
+            )
+            thread.start()
+            thread.join()
+
+        spans = _finished(exporter)
+        assert spans["background"].parent.span_id == spans["request"].context.span_id
+
+    def test_root_span_joins_environment_trace(self, exporter, monkeypatch):
+        """Test TRACEPARENT makes root spans part of the parent process trace"""
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        monkeypatch.setenv("TRACEPARENT", f"00-{trace_id}-00f067aa0ba902b7-01")
+
+        with tracing.span("flow"):
+            pass
+
+        flow = _finished(exporter)["flow"]
+        assert format(flow.context.trace_id, "032x") == trace_id
+        assert format(flow.parent.span_id, "016x") == "00f067aa0ba902b7"
+
+    def test_json_lines_exporter(self, tmp_path):
+        """Test the file exporter writes one JSON span per line"""
+        path = tmp_path / "traces" / "spans.jsonl"
+        tracing.configure_tracing(tracing.JsonLinesSpanExporter(str(path)))
+        try:
+            with tracing.span("first"):
+                pass
+            with tracing.span("second"):
+                pass
+            tracing.flush_tracing()
+        finally:
+            tracing.configure_tracing()
+
+        names = [json.loads(line)["name"] for line in path.read_text().splitlines()]
+        assert names == ["first", "second"]